@@ -3,30 +3,95 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 import os
+import weakref
+from app.db_routing import RoutingSession
 
-db = SQLAlchemy()
+# Lesende Statements können über RoutingSession an Read-Replicas gehen (siehe app/db_routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 
-def create_app():
+def create_app(config_object='config.Config'):
     app = Flask(__name__, static_folder='../frontend/out', static_url_path='/')
     
     # Konfiguration laden
-    app.config.from_object('config.Config')
+    app.config.from_object(config_object)
+    
+    # Connection-Pool instrumentieren (und ggf. automatisch dimensionieren)
+    from app.pool_metrics import configure_pool, register_pool_metrics
+    configure_pool(app)
+    
+    # Read-Replicas als Binds eintragen
+    from app.db_routing import configure_replicas, register_replica_routing
+    configure_replicas(app)
     
     # Extensions initialisieren
     db.init_app(app)
     jwt.init_app(app)
-    
+    register_pool_metrics(app)
+    register_replica_routing(app, db)
+    register_fork_handler(app)
+
+    # Identische heiße Katalog-Abfragen zusammenfassen
+    from app.single_flight import register_single_flight
+    register_single_flight(app)
+
+    # Cache-Layer (Prozess-LRU, optional gemeinsam über /dev/shm oder Redis) mit Tag-Invalidierung
+    from app.cache import register_cache, register_cache_listeners
+    register_cache(app)
+    register_cache_listeners()
+
+    # Spaltenorientierter Katalog-Snapshot für Filterabfragen
+    from app.catalog_snapshot import register_catalog_snapshot, register_catalog_snapshot_listeners
+    register_catalog_snapshot(app)
+    register_catalog_snapshot_listeners()
+
+    # Gerenderte iCalendar-Feeds cachen
+    from app.ics_feed import register_feed_cache
+    register_feed_cache(app)
+
+    # Globale Zähler für Status/Dashboard periodisch statt pro Anfrage ermitteln
+    from app.status_counters import register_status_counters
+    register_status_counters(app)
+
+    # Einschreibungen pro Kurs einreihen statt auf Zeilensperren zu warten
+    from app.admission import register_admission_queue
+    register_admission_queue(app)
+
+    # Kompilierte Stundenpläne für die Termin-Expansion cachen
+    from app.occurrences import register_occurrence_cache
+    register_occurrence_cache(app)
+
+    # Globalen Raum-/Dozenten-Belegungsindex bei Katalogänderungen aktuell halten
+    from app.occupancy import register_occupancy_index, register_occupancy_listeners
+    register_occupancy_index(app)
+    register_occupancy_listeners()
+
+    # Änderungsprotokoll für den Delta-Sync (inkl. Tombstones) führen
+    from app.change_log import register_change_log_listeners
+    register_change_log_listeners()
+
+    # Abgesagte/verschobene Termine an alle Teilnehmer melden (ein INSERT ... SELECT pro Ereignis)
+    from app.broadcast import register_broadcast_listeners
+    register_broadcast_listeners()
+
     # CORS für React Frontend
     CORS(app, origins=app.config['CORS_ORIGINS'])
     
     # Upload-Verzeichnis erstellen
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
+    # Export-Cache auf der Festplatte anlegen
+    from app.export_cache import register_export_cache
+    register_export_cache(app)
+    
     # Error Handler und Middleware registrieren
     register_error_handlers(app)
     register_middleware(app)
     
+    # Große JSON-Antworten komprimieren
+    from app.json_stream import register_compression
+    register_compression(app)
+    
     # Blueprints registrieren
     register_blueprints(app)
     
@@ -60,61 +125,103 @@ def create_app():
                 'documentation': 'Siehe README.md für vollständige API-Dokumentation'
             })
     
-    # Datenbank-Tabellen erstellen
-    with app.app_context():
-        db.create_all()
-        print("✅ Datenbank-Tabellen erstellt/überprüft")
+    # Datenbank-Tabellen erstellen (Produktion: Schema per create_tables.py/Migration, nicht pro Worker)
+    if app.config['CREATE_TABLES_ON_STARTUP']:
+        with app.app_context():
+            db.create_all(bind_key=None)  # nur Primary, Replicas erhalten das Schema per Replikation
+            app.logger.info("✅ Datenbank-Tabellen erstellt/überprüft")
     
     return app
 
+def register_fork_handler(app):
+    """Nach fork() (gunicorn --preload) keine Verbindungen des Parent-Prozesses weiterverwenden"""
+    app_ref = weakref.ref(app)
+
+    def after_fork_in_child():
+        forked_app = app_ref()
+        if forked_app is None:
+            return
+        with forked_app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+        from app.pool_metrics import pool_metrics
+        from app.single_flight import register_single_flight
+        from app.catalog_snapshot import register_catalog_snapshot
+        from app.status_counters import register_status_counters
+        from app.cache import register_cache
+        from app.request_log import register_request_log
+        from app.admission import register_admission_queue
+        from app.occupancy import register_occupancy_index
+        pool_metrics.reset()
+        register_request_log(forked_app)
+        register_single_flight(forked_app)
+        register_cache(forked_app)
+        register_catalog_snapshot(forked_app)
+        register_status_counters(forked_app)
+        register_admission_queue(forked_app)
+        register_occupancy_index(forked_app)
+
+    os.register_at_fork(after_in_child=after_fork_in_child)
+
 def register_blueprints(app):
     """Alle Blueprints registrieren"""
     try:
         # Authentication
         from app.routes.auth import auth_bp
         app.register_blueprint(auth_bp, url_prefix='/api/auth')
-        print("✅ Auth Routes geladen")
+        app.logger.info("✅ Auth Routes geladen")
         
         # Timetable Management
         from app.routes.timetable import timetable_bp
         app.register_blueprint(timetable_bp, url_prefix='/api/timetable')
-        print("✅ Timetable Routes geladen")
+        app.logger.info("✅ Timetable Routes geladen")
         
         # Course Management (Legacy)
         from app.routes.courses import courses_bp
         app.register_blueprint(courses_bp, url_prefix='/api/courses')
-        print("✅ Course Routes geladen")
+        app.logger.info("✅ Course Routes geladen")
         
         # Course Catalog & Selection (NEW)
         from app.routes.course_catalog_routes import course_catalog_bp
         app.register_blueprint(course_catalog_bp, url_prefix='/api/course-catalog')
-        print("✅ Course Catalog Routes geladen")
+        app.logger.info("✅ Course Catalog Routes geladen")
         
         # Notifications
         from app.routes.notifications import notifications_bp
         app.register_blueprint(notifications_bp, url_prefix='/api/notifications')
-        print("✅ Notification Routes geladen")
+        app.logger.info("✅ Notification Routes geladen")
+        
+        # Startseite (aggregiert)
+        from app.routes.dashboard import dashboard_bp
+        app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+        app.logger.info("✅ Dashboard Routes geladen")
+        
+        # Delta-Sync
+        from app.routes.sync import sync_bp
+        app.register_blueprint(sync_bp, url_prefix='/api/sync')
+        app.logger.info("✅ Sync Routes geladen")
         
         # Import/Export
         from app.routes.export_import import export_import_bp
         app.register_blueprint(export_import_bp, url_prefix='/api/data')
-        print("✅ Import/Export Routes geladen")
+        app.logger.info("✅ Import/Export Routes geladen")
         
         # Health & API Routes
         from app.api_routes import api as api_blueprint
         app.register_blueprint(api_blueprint, url_prefix='/api')
-        print("✅ API Routes geladen")
+        app.logger.info("✅ API Routes geladen")
         
         # Optional: Bestehende routes (falls vorhanden)
         try:
             from app.routes import main as main_blueprint
             app.register_blueprint(main_blueprint)
-            print("✅ Main Routes geladen")
+            app.logger.info("✅ Main Routes geladen")
         except ImportError:
-            print("ℹ️  Main Routes übersprungen")
+            app.logger.info("ℹ️  Main Routes übersprungen")
             
     except ImportError as e:
-        print(f"⚠️  Route Import Fehler: {e}")
+        app.logger.warning(f"⚠️  Route Import Fehler: {e}")
         # Minimale Fallback-Routen
         @app.route('/api/health')
         def health():
@@ -172,18 +279,19 @@ def register_middleware(app):
     """Middleware registrieren"""
     from flask import request, g
     import time
+    from app.request_log import register_request_log
+    
+    # Request Logging: nur Eintrag in die Queue, geschrieben wird gebündelt im Hintergrund
+    register_request_log(app)
     
     @app.before_request
     def before_request():
         """Vor jeder Anfrage ausführen"""
-        g.start_time = time.time()
-        
-        # Request Logging
-        app.logger.info(f'{request.method} {request.path} - {request.remote_addr}')
+        g.start_time = time.perf_counter()
         
         # Content-Type Validierung für POST/PUT
         if request.method in ['POST', 'PUT', 'PATCH']:
-            if request.path.startswith('/api/') and not request.is_json and request.content_type != 'multipart/form-data':
+            if request.path.startswith('/api/') and not request.is_json and request.mimetype != 'multipart/form-data':
                 return jsonify({
                     'error': 'Content-Type muss application/json oder multipart/form-data sein'
                 }), 400
@@ -191,10 +299,17 @@ def register_middleware(app):
     @app.after_request
     def after_request(response):
         """Nach jeder Anfrage ausführen"""
-        # Response Zeit berechnen
-        if hasattr(g, 'start_time'):
-            response_time = time.time() - g.start_time
-            app.logger.info(f'Request completed in {response_time:.3f}s - Status: {response.status_code}')
+        # Response Zeit berechnen und protokollieren
+        if hasattr(g, 'start_time') and app.config['REQUEST_LOG_ENABLED']:
+            app.extensions['request_log'].record({
+                'ts': round(time.time(), 3),
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.start_time) * 1000, 1),
+                'remote_addr': request.remote_addr,
+                'bytes': response.content_length
+            })
         
         # Security Headers hinzufügen
         response.headers['X-Content-Type-Options'] = 'nosniff'
@@ -0,0 +1,317 @@
+"""
+Einschreibung mit Platzbegrenzung und Warteliste
+
+Korrektheit liegt in der Datenbank, nicht im Prozess:
+- Ein Unique-Constraint auf (user_id, course_id) verhindert doppelte Zeilen.
+- Ein Platz wird mit einem einzigen bedingten UPDATE auf courses.enrolled_count
+  vergeben (enrolled_count < capacity), ohne vorheriges Lesen.
+- Statuswechsel bestehender Belegungen laufen ebenfalls bedingt
+  (WHERE status = alter Status).
+Parallele Anfragen können sich so weder überbuchen noch doppelt einschreiben;
+der Verlierer einer Kollision rollt zurück und bekommt 409.
+
+Damit Anstürme auf einen Kurs nicht als Lock-Sturm auf einer Zeile landen,
+reiht die AdmissionQueue Schreiber pro Kurs und Worker ein: pro Kurs arbeitet
+immer nur eine Anfrage ihre (kurze) Transaktion ab, die übrigen warten im
+Prozess statt in der Datenbank. Locks werden nie über Anfragen hinweg gehalten;
+wer zu lange warten müsste, bekommt 503 mit Retry-After.
+
+Volle Kurse führen auf die Warteliste (status='waitlisted', Reihenfolge nach
+enrollment_date). Wird ein Platz frei, rücken Wartende in derselben
+Transaktion nach (SELECT ... FOR UPDATE SKIP LOCKED, wo unterstützt) und
+werden benachrichtigt.
+
+Die Kapazität setzen die Kurs-Routen und Importe (capacity_error prüft sie).
+Unter die belegten Plätze lässt sie sich nicht senken. Überholt eine
+parallele Einschreibung die Prüfung, bleiben die Belegungen bestehen und es
+wird nur niemand mehr zugelassen, bis wieder Plätze frei sind.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import func, inspect, or_, select, text, update
+
+ACTIVE = 'active'
+WAITLISTED = 'waitlisted'
+DROPPED = 'dropped'
+
+
+class AdmissionBusy(Exception):
+    """Zu viele Wartende oder Wartezeit überschritten; später erneut versuchen"""
+
+
+# =================== QUEUE ===================
+
+class AdmissionQueue:
+    """Serialisiert Schreiber pro Kurs innerhalb eines Worker-Prozesses"""
+
+    def __init__(self, wait_seconds=5.0, max_waiting=500):
+        self.wait_seconds = wait_seconds
+        self.max_waiting = max_waiting
+        self._lock = threading.Lock()
+        self._slots = {}  # course_id -> [Lock, Anzahl Wartende/Aktive]
+        self.admitted = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+    @contextmanager
+    def slot(self, course_id):
+        """Exklusiver Platz für course_id; AdmissionBusy bei voller Schlange oder Timeout"""
+        with self._lock:
+            entry = self._slots.setdefault(course_id, [threading.Lock(), 0])
+            if entry[1] >= self.max_waiting:
+                self.rejected += 1
+                raise AdmissionBusy(course_id)
+            entry[1] += 1
+            self.max_depth = max(self.max_depth, entry[1])
+        try:
+            if not entry[0].acquire(timeout=self.wait_seconds):
+                with self._lock:
+                    self.rejected += 1
+                raise AdmissionBusy(course_id)
+            try:
+                with self._lock:
+                    self.admitted += 1
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0 and self._slots.get(course_id) is entry:
+                    del self._slots[course_id]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'max_depth': self.max_depth,
+                'busy_courses': len(self._slots),
+                'waiting': sum(entry[1] for entry in self._slots.values()),
+            }
+
+
+def register_admission_queue(app):
+    """Eine Schlange pro App (und damit pro Worker-Prozess)"""
+    app.extensions['admission_queue'] = AdmissionQueue(
+        app.config['ADMISSION_WAIT_SECONDS'], app.config['ADMISSION_MAX_WAITING']
+    )
+
+
+# =================== SEATS ===================
+
+def capacity_error(capacity, enrolled_count=0):
+    """Fehlermeldung für eine ungültige Kapazität, sonst None (None = unbegrenzt)"""
+    if capacity is None:
+        return None
+    if isinstance(capacity, bool) or not isinstance(capacity, int) or capacity < 0:
+        return 'Kapazität muss eine ganze Zahl ab 0 sein (null = unbegrenzt)'
+    if capacity < enrolled_count:
+        return f'Kapazität ({capacity}) kleiner als die belegten Plätze ({enrolled_count})'
+    return None
+
+
+def take_seat(session, course_id):
+    """Einen Platz atomar belegen; False, wenn der Kurs voll ist"""
+    from app.models import Course
+    # Core-Statement auf die Tabelle: der Zähler ist keine Kursänderung für Sync/Änderungsprotokoll
+    courses = Course.__table__
+    result = session.execute(
+        update(courses)
+        .where(courses.c.id == course_id,
+               or_(courses.c.capacity.is_(None), courses.c.enrolled_count < courses.c.capacity))
+        .values(enrolled_count=courses.c.enrolled_count + 1)
+    )
+    return result.rowcount == 1
+
+
+def seat_counts(session, course_ids):
+    """{course_id: (capacity, enrolled_count)} in einer Abfrage (Platzangaben zu gecachten Katalogseiten)"""
+    from app.models import Course
+    if not course_ids:
+        return {}
+    rows = session.execute(
+        select(Course.id, Course.capacity, Course.enrolled_count).where(Course.id.in_(set(course_ids)))
+    ).all()
+    return {course_id: (capacity, enrolled) for course_id, capacity, enrolled in rows}
+
+
+def give_seat(session, course_id):
+    """Einen Platz zurückgeben (nie unter 0)"""
+    from app.models import Course
+    courses = Course.__table__
+    session.execute(
+        update(courses)
+        .where(courses.c.id == course_id, courses.c.enrolled_count > 0)
+        .values(enrolled_count=courses.c.enrolled_count - 1)
+    )
+
+
+def _change_status(session, enrollment_id, old_status, new_status, now):
+    """Bedingter Statuswechsel; False, wenn eine parallele Anfrage schneller war"""
+    from app.models import EnrolledCourse
+    result = session.execute(
+        update(EnrolledCourse)
+        .where(EnrolledCourse.id == enrollment_id, EnrolledCourse.status == old_status)
+        .values(status=new_status, enrollment_date=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def waitlist_position(session, enrollment):
+    """1-basierte Position auf der Warteliste (None, wenn nicht wartend)"""
+    from app.models import EnrolledCourse
+    if enrollment.status != WAITLISTED:
+        return None
+    return session.scalar(
+        select(func.count()).select_from(EnrolledCourse)
+        .where(EnrolledCourse.course_id == enrollment.course_id,
+               EnrolledCourse.status == WAITLISTED,
+               or_(EnrolledCourse.enrollment_date < enrollment.enrollment_date,
+                   (EnrolledCourse.enrollment_date == enrollment.enrollment_date)
+                   & (EnrolledCourse.id < enrollment.id)))
+    ) + 1
+
+
+# =================== ADMISSION ===================
+
+def admit(session, user_id, course_id, waitlist=True):
+    """
+    Benutzer einschreiben oder auf die Warteliste setzen.
+
+    Liefert (Belegung, Ergebnis) mit Ergebnis 'enrolled', 'waitlisted',
+    'exists' oder 'full' (voll und waitlist=False). Bei gleichzeitigem
+    Doppelversuch wirft der Flush IntegrityError; der Aufrufer rollt zurück.
+    Commit macht der Aufrufer.
+    """
+    from app.models import EnrolledCourse
+
+    existing = session.scalar(
+        select(EnrolledCourse).where(EnrolledCourse.user_id == user_id, EnrolledCourse.course_id == course_id)
+    )
+    if existing is not None and existing.status in (ACTIVE, WAITLISTED):
+        return existing, 'exists'
+
+    seated = take_seat(session, course_id)
+    if not seated and not waitlist:
+        return None, 'full'
+    status = ACTIVE if seated else WAITLISTED
+    now = datetime.utcnow()
+
+    if existing is None:
+        enrollment = EnrolledCourse(user_id=user_id, course_id=course_id, status=status, enrollment_date=now)
+        session.add(enrollment)
+        session.flush()
+    else:
+        if not _change_status(session, existing.id, existing.status, status, now):
+            if seated:
+                give_seat(session, course_id)
+            return session.get(EnrolledCourse, existing.id, populate_existing=True), 'exists'
+        enrollment = session.get(EnrolledCourse, existing.id, populate_existing=True)
+    return enrollment, 'enrolled' if seated else 'waitlisted'
+
+
+def release(session, enrollment):
+    """Belegung abmelden; ein freier Platz geht sofort an die Warteliste. Liefert die Nachrücker"""
+    was_active = enrollment.status == ACTIVE
+    if not _change_status(session, enrollment.id, enrollment.status, DROPPED, datetime.utcnow()):
+        return []
+    if not was_active:
+        return []
+    give_seat(session, enrollment.course_id)
+    return promote_waitlisted(session, enrollment.course_id)
+
+
+def promote_waitlisted(session, course_id):
+    """Wartende nachrücken lassen, solange Plätze frei sind (FIFO)"""
+    from app.models import Course, EnrolledCourse, Notification
+
+    promoted = []
+    skipped = []
+    while True:
+        statement = select(EnrolledCourse.id, EnrolledCourse.user_id).where(
+            EnrolledCourse.course_id == course_id, EnrolledCourse.status == WAITLISTED
+        )
+        if skipped:
+            statement = statement.where(EnrolledCourse.id.not_in(skipped))
+        candidate = session.execute(
+            statement.order_by(EnrolledCourse.enrollment_date, EnrolledCourse.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if candidate is None or not take_seat(session, course_id):
+            break
+        if not _change_status(session, candidate.id, WAITLISTED, ACTIVE, datetime.utcnow()):
+            give_seat(session, course_id)  # inzwischen abgemeldet: Platz zurückgeben, nächsten versuchen
+            skipped.append(candidate.id)
+            continue
+        promoted.append(candidate)
+
+    if promoted:
+        name = session.scalar(select(Course.name).where(Course.id == course_id))
+        now = datetime.now()  # notify_time ist Ortszeit
+        session.add_all([
+            Notification(user_id=candidate.user_id, course_id=course_id, notification_type='info',
+                         title='Platz frei geworden',
+                         message=f'Du bist von der Warteliste in "{name}" nachgerückt.', notify_time=now)
+            for candidate in promoted
+        ])
+        session.flush()
+    return [candidate.id for candidate in promoted]
+
+
+# =================== SCHEMA ===================
+
+def upgrade_schema(session):
+    """Spalten und Constraints der Platzvergabe in bestehenden Datenbanken nachrüsten
+
+    db.create_all() legt nur fehlende Tabellen an; bestehende courses- und
+    enrolled_courses-Tabellen erhalten capacity/enrolled_count, den
+    Unique-Constraint und den Status-Index erst hier. Doppelte Belegungen
+    müssen vorher bereinigt sein. Liefert die ausgeführten Statements;
+    danach recount_enrollments() aufrufen.
+    """
+    from app.models import EnrolledCourse
+    inspector = inspect(session.connection())
+    statements = []
+    
+    course_columns = {column['name'] for column in inspector.get_columns('courses')}
+    if 'capacity' not in course_columns:
+        statements.append('ALTER TABLE courses ADD COLUMN capacity INTEGER NULL')
+    if 'enrolled_count' not in course_columns:
+        statements.append('ALTER TABLE courses ADD COLUMN enrolled_count INTEGER NOT NULL DEFAULT 0')
+    
+    indexes = {index['name'] for index in inspector.get_indexes('enrolled_courses')}
+    indexes |= {constraint['name'] for constraint in inspector.get_unique_constraints('enrolled_courses')}
+    if 'uq_enrolled_courses_user_course' not in indexes:
+        duplicates = session.scalar(select(func.count()).select_from(
+            select(EnrolledCourse.user_id)
+            .group_by(EnrolledCourse.user_id, EnrolledCourse.course_id)
+            .having(func.count() > 1)
+            .subquery()
+        ))
+        if duplicates:
+            raise RuntimeError(f'{duplicates} doppelte Belegungen (user_id, course_id), vor dem Upgrade bereinigen')
+        statements.append('CREATE UNIQUE INDEX uq_enrolled_courses_user_course ON enrolled_courses (user_id, course_id)')
+    if 'ix_enrolled_courses_course_status' not in indexes:
+        statements.append('CREATE INDEX ix_enrolled_courses_course_status ON enrolled_courses (course_id, status)')
+    
+    for statement in statements:
+        session.execute(text(statement))
+    return statements
+
+
+def recount_enrollments(session):
+    """enrolled_count aus den aktiven Belegungen neu berechnen (nach Migration oder Reparatur)"""
+    from app.models import Course, EnrolledCourse
+    courses = Course.__table__
+    session.execute(update(courses).values(enrolled_count=(
+        select(func.count()).select_from(EnrolledCourse)
+        .where(EnrolledCourse.course_id == courses.c.id, EnrolledCourse.status == ACTIVE)
+        .scalar_subquery()
+    )))
@@ -1,5 +1,7 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import jwt_required
 from app import db
+from app.pool_metrics import pool_status
 from datetime import datetime
 
 api = Blueprint('api', __name__)
@@ -41,6 +43,39 @@ def ping():
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
+# =================== WORKER-STATISTIKEN ===================
+
+def pool_snapshot():
+    """Connection-Pool Metriken dieses Worker-Prozesses (inkl. Replica-Status)"""
+    stats = pool_status(db.engine)
+    router = current_app.extensions.get('db_router')
+    if router is not None and router.enabled:
+        stats['replicas'] = router.status()
+    return stats
+
+# Pfad -> (Quelle, Bezeichnung für Fehlermeldungen); Zähler einzelner Worker, nicht öffentlich
+STATS_ROUTES = {
+    'pool-stats': (pool_snapshot, 'Pool-Statistiken'),
+    'single-flight-stats': (lambda: current_app.extensions['single_flight'].snapshot(), 'Single-Flight-Statistiken'),
+    'cache-stats': (lambda: current_app.extensions['cache'].snapshot(), 'Cache-Statistiken'),
+    'request-log-stats': (lambda: current_app.extensions['request_log'].snapshot(), 'Request-Log-Statistiken'),
+    'admission-stats': (lambda: current_app.extensions['admission_queue'].snapshot(), 'Einschreibungs-Statistiken'),
+    'export-cache-stats': (lambda: current_app.extensions['export_cache'].stats(), 'Export-Cache-Statistiken'),
+}
+
+def register_stats_routes(blueprint):
+    """Statistik-Endpoints der Worker-Layer registrieren, alle nur mit gültigem JWT"""
+    for path, (snapshot, label) in STATS_ROUTES.items():
+        def stats_view(snapshot=snapshot, label=label):
+            try:
+                return jsonify(snapshot()), 200
+            except Exception as e:
+                return jsonify({'error': f'{label} konnten nicht geladen werden: {str(e)}'}), 500
+        
+        blueprint.add_url_rule(f'/{path}', endpoint=path.replace('-', '_'), view_func=jwt_required()(stats_view))
+
+register_stats_routes(api)
+
 # Basis API Info
 @api.route('/')
 def api_info():
@@ -228,22 +263,20 @@ def get_degree_programs():
 def system_status():
     """System Status und Statistiken"""
     try:
-        from app.models import User, Timetable, Course, Notification
-        
-        user_count = User.query.count()
-        timetable_count = Timetable.query.count()
-        course_count = Course.query.count()
-        notification_count = Notification.query.count()
+        # Zähler kommen aus app/status_counters.py (periodisch aktualisiert, kein COUNT pro Anfrage)
+        counts, age, exact = current_app.extensions['status_counters'].get(db.session)
         
         return jsonify({
             'system': 'operational',
             'timestamp': datetime.utcnow().isoformat(),
             'statistics': {
-                'users': user_count,
-                'timetables': timetable_count,
-                'courses': course_count,
-                'notifications': notification_count
+                'users': counts['users'],
+                'timetables': counts['timetables'],
+                'courses': counts['courses'],
+                'notifications': counts['notifications']
             },
+            'statistics_age_seconds': round(age, 1),
+            'statistics_exact': exact,
             'database': 'connected',
             'uptime': 'Available via /api/health'
         })
@@ -0,0 +1,235 @@
+"""
+Asynchroner Read-Path (ASGI)
+
+Bedient die meistgenutzten GET-Endpoints (aktiver Stundenplan, Kurskatalog,
+Benachrichtigungen) über die SQLAlchemy AsyncEngine (aiomysql/aiosqlite).
+Eine langsame Datenbankabfrage blockiert damit keinen ganzen Worker mehr,
+ein Prozess kann tausende offene Verbindungen halten. Pfade und Antworten
+entsprechen den Flask-Endpoints, Schreibzugriffe laufen weiterhin über Flask.
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import jwt as pyjwt
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, func, or_
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+from config import Config
+from app.models import Timetable, Course, Notification
+
+# Sync-Treiber -> Async-Treiber
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+async_engine = None
+AsyncSessionLocal = None
+
+
+class ApiError(Exception):
+    """Fehler mit Flask-kompatiblem JSON-Body"""
+
+    def __init__(self, status_code, payload):
+        super().__init__(payload.get('error'))
+        self.status_code = status_code
+        self.payload = payload
+
+
+def to_async_url(url):
+    """Datenbank-URL auf den passenden Async-Treiber umstellen"""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def init_async_engine(config=Config):
+    """AsyncEngine und Session-Factory anlegen"""
+    global async_engine, AsyncSessionLocal
+
+    url = to_async_url(config.SQLALCHEMY_ASYNC_DATABASE_URI or config.SQLALCHEMY_DATABASE_URI)
+    options = {'pool_pre_ping': True}
+    if url.get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=config.ASYNC_POOL_SIZE,
+            max_overflow=config.ASYNC_MAX_OVERFLOW,
+            pool_recycle=config.SQLALCHEMY_ENGINE_OPTIONS.get('pool_recycle', 300),
+            pool_timeout=config.SQLALCHEMY_ENGINE_OPTIONS.get('pool_timeout', 20),
+        )
+
+    async_engine = create_async_engine(url, **options)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    return async_engine
+
+
+async def dispose_async_engine():
+    """Verbindungen des Async-Pools schließen"""
+    global async_engine, AsyncSessionLocal
+    if async_engine is not None:
+        await async_engine.dispose()
+    async_engine = None
+    AsyncSessionLocal = None
+
+
+@asynccontextmanager
+async def async_lifespan(app):
+    """Lifespan-Handler für die ASGI-App"""
+    if async_engine is None:
+        init_async_engine()
+    yield
+    await dispose_async_engine()
+
+
+async def get_session():
+    """Async-Session pro Request"""
+    if AsyncSessionLocal is None:
+        init_async_engine()
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def current_user_id(request: Request):
+    """JWT wie Flask-JWT-Extended prüfen und Benutzer-ID liefern"""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        raise ApiError(401, {'error': 'token missing'})
+
+    try:
+        claims = pyjwt.decode(header[7:], Config.JWT_SECRET_KEY, algorithms=['HS256'])
+    except pyjwt.ExpiredSignatureError:
+        expired = pyjwt.decode(header[7:], Config.JWT_SECRET_KEY, algorithms=['HS256'],
+                               options={'verify_exp': False})
+        raise ApiError(401, {'error': 'token expired', 'message': f"expired at {expired.get('exp')}"})
+    except pyjwt.InvalidTokenError as e:
+        raise ApiError(422, {'error': 'invalid token', 'message': str(e)})
+
+    if claims.get('type') != 'access' or 'sub' not in claims:
+        raise ApiError(422, {'error': 'invalid token', 'message': 'Only access tokens are allowed'})
+
+    try:
+        return int(claims['sub'])
+    except (TypeError, ValueError):
+        raise ApiError(422, {'error': 'invalid token', 'message': 'Invalid subject'})
+
+
+router = APIRouter()
+
+# =================== TIMETABLE ===================
+
+@router.get('/api/timetable/active')
+async def get_active_timetable(user_id=Depends(current_user_id), session=Depends(get_session)):
+    """Aktiven Stundenplan abrufen (ohne aktiven: den ersten, nicht persistiert)"""
+    try:
+        result = await session.execute(
+            select(Timetable)
+            .options(selectinload(Timetable.courses))
+            .where(Timetable.user_id == user_id)
+            .order_by(Timetable.is_active.desc(), Timetable.id)
+            .limit(1)
+        )
+        timetable = result.scalars().first()
+
+        if not timetable:
+            return JSONResponse({'error': 'Kein Stundenplan gefunden'}, status_code=404)
+
+        return {'timetable': timetable.to_dict(include_courses=True)}
+
+    except Exception as e:
+        return JSONResponse({'error': f'Aktiver Stundenplan konnte nicht geladen werden: {str(e)}'}, status_code=500)
+
+# =================== COURSE CATALOG ===================
+
+@router.get('/api/course-catalog/courses')
+async def get_course_catalog(search: str = None, user_id=Depends(current_user_id), session=Depends(get_session)):
+    """Alle verfügbaren Kurse abrufen (Kurskatalog), Reihenfolge wie der Flask-Endpoint"""
+    try:
+        query = select(Course).options(selectinload(Course.course_sessions)).where(Course.is_active == True)
+
+        if search:
+            search_term = f"%{search}%"
+            query = query.where(or_(
+                Course.name.like(search_term),
+                Course.code.like(search_term),
+                Course.instructor.like(search_term)
+            ))
+
+        courses = (await session.execute(query.order_by(Course.name, Course.id))).scalars().all()
+
+        return {
+            'courses': [course.to_dict(include_sessions=True) for course in courses],
+            'count': len(courses)
+        }
+
+    except Exception as e:
+        return JSONResponse({'error': f'Kurskatalog konnte nicht geladen werden: {str(e)}'}, status_code=500)
+
+# =================== NOTIFICATIONS ===================
+
+@router.get('/api/notifications/')
+async def get_user_notifications(unread_only: str = 'false', limit: int = 50,
+                                 user_id=Depends(current_user_id), session=Depends(get_session)):
+    """Alle Benachrichtigungen des Benutzers abrufen"""
+    try:
+        query = select(Notification).where(Notification.user_id == user_id)
+        if unread_only.lower() == 'true':
+            query = query.where(Notification.is_read == False)
+
+        notifications = (await session.execute(
+            query.order_by(Notification.created_at.desc()).limit(limit)
+        )).scalars().all()
+
+        unread_count = (await session.execute(
+            select(func.count(Notification.id)).where(
+                Notification.user_id == user_id,
+                Notification.is_read == False
+            )
+        )).scalar_one()
+
+        return {
+            'notifications': [notification.to_dict() for notification in notifications],
+            'count': len(notifications),
+            'unread_count': unread_count
+        }
+
+    except Exception as e:
+        return JSONResponse({'error': f'Benachrichtigungen konnten nicht geladen werden: {str(e)}'}, status_code=500)
+
+
+@router.get('/api/notifications/upcoming')
+async def get_upcoming_notifications(user_id=Depends(current_user_id), session=Depends(get_session)):
+    """Kommende Benachrichtigungen abrufen"""
+    try:
+        now = datetime.now()
+        tomorrow = now + timedelta(days=1)
+
+        notifications = (await session.execute(
+            select(Notification).where(
+                Notification.user_id == user_id,
+                Notification.notify_time >= now,
+                Notification.notify_time <= tomorrow,
+                Notification.is_sent == False
+            ).order_by(Notification.notify_time)
+        )).scalars().all()
+
+        return {
+            'upcoming_notifications': [notification.to_dict() for notification in notifications],
+            'count': len(notifications)
+        }
+
+    except Exception as e:
+        return JSONResponse({'error': f'Kommende Benachrichtigungen konnten nicht geladen werden: {str(e)}'}, status_code=500)
+
+
+def register_async_api(app):
+    """Router und Fehlerbehandlung an einer FastAPI-App registrieren"""
+
+    @app.exception_handler(ApiError)
+    async def api_error_handler(request, exc):
+        return JSONResponse(exc.payload, status_code=exc.status_code)
+
+    app.include_router(router)
@@ -0,0 +1,33 @@
+"""
+Hilfsfunktionen für Batch-Endpoints (Kurse, Benachrichtigungen)
+"""
+from flask import current_app
+
+
+def parse_id_list(raw):
+    """
+    ID-Liste aus JSON-Array oder kommagetrenntem String lesen.
+
+    Liefert (IDs ohne Duplikate in Eingabereihenfolge, Fehlermeldung).
+    """
+    if raw is None:
+        return None, 'ids ist erforderlich'
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    if not isinstance(raw, list) or not raw:
+        return None, 'ids muss eine nicht-leere Liste sein'
+
+    limit = current_app.config['BATCH_MAX_ITEMS']
+    if len(raw) > limit:
+        return None, f'Maximal {limit} Einträge pro Batch erlaubt'
+
+    ids, seen = [], set()
+    for value in raw:
+        try:
+            item_id = int(value)
+        except (TypeError, ValueError):
+            return None, f'Ungültige ID: {value}'
+        if item_id not in seen:
+            seen.add(item_id)
+            ids.append(item_id)
+    return ids, None
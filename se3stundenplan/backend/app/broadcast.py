@@ -0,0 +1,154 @@
+"""
+Benachrichtigungen an alle Teilnehmer, wenn sich ein Termin ändert
+
+Wird eine CourseSession abgesagt (is_cancelled bzw. session_type
+'cancelled'), wieder angesetzt, verschoben (Datum/Zeit) oder in einen
+anderen Raum gelegt, bekommen alle aktiv eingeschriebenen Benutzer mit
+aktivierten Benachrichtigungen eine Notification.
+
+Der Fan-out ist ein einziges INSERT INTO notifications ... SELECT ... FROM
+enrolled_courses pro Ereignis, egal wie groß der Hörsaal ist. Jede Zeile
+trägt einen broadcast_key aus Session, Art und neuem Zustand. Verglichen
+wird nur mit der jüngsten Meldung zum Termin: derselbe Übergang zweimal
+(z.B. doppelt abgeschickte Absage) meldet nichts, absagen -> ansetzen ->
+absagen meldet dreimal. Gleichzeitige Änderungen derselben Session
+serialisiert die Zeilensperre auf course_sessions. (Kein Unique-Constraint:
+auf MySQL müsste er notify_time enthalten, sobald die Tabelle partitioniert
+ist, siehe app/retention.py.)
+
+Ausgelöst wird beim Flush (after_flush), also auf jedem Update-Pfad über die
+ORM-Session. Die Ergebnisse (Empfänger pro Ereignis) liegen bis zum Commit in
+session.info['broadcasts'].
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, event, func, insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+CANCELLED = 'cancelled'
+RESTORED = 'restored'
+CHANGED = 'changed'
+
+WATCHED = ('is_cancelled', 'session_type', 'session_date', 'start_time', 'end_time', 'room')
+
+
+def _cancelled(is_cancelled, session_type):
+    return bool(is_cancelled) or session_type == 'cancelled'
+
+
+def _before(course_session, name):
+    """Wert vor dem Flush (bzw. aktueller Wert, wenn unverändert)"""
+    history = get_history(course_session, name)
+    return history.deleted[0] if history.deleted else getattr(course_session, name)
+
+
+def session_change(course_session):
+    """Art der Änderung ('cancelled', 'restored', 'changed') oder None"""
+    if not any(get_history(course_session, name).has_changes() for name in WATCHED):
+        return None
+    was = _cancelled(_before(course_session, 'is_cancelled'), _before(course_session, 'session_type'))
+    now = _cancelled(course_session.is_cancelled, course_session.session_type)
+    if now and not was:
+        return CANCELLED
+    if was and not now:
+        return RESTORED
+    if now:
+        return None  # abgesagte Termine zu verschieben interessiert niemanden
+    if any(_before(course_session, name) != getattr(course_session, name)
+           for name in ('session_date', 'start_time', 'end_time', 'room')):
+        return CHANGED
+    return None
+
+
+def broadcast_key(course_session, kind):
+    """Art und neuer Zustand; gleicher Schlüssel wie die jüngste Meldung = schon gemeldet"""
+    state = (f'{course_session.session_date}|{course_session.start_time:%H:%M}|'
+             f'{course_session.end_time:%H:%M}|{course_session.room or ""}')
+    return f'session:{course_session.id}:{kind}:{state}'
+
+
+def latest_broadcast_key(session, session_id):
+    """broadcast_key der jüngsten Meldung zu einem Termin (oder None)"""
+    from app.models import Notification
+
+    # MAX(id) über den Präfix-Bereich von ix_notifications_broadcast, kein Rückwärts-Scan über den PK
+    latest = (select(func.max(Notification.id))
+              .where(Notification.broadcast_key.startswith(f'session:{session_id}:'))
+              .scalar_subquery())
+    return session.execute(select(Notification.broadcast_key).where(Notification.id == latest)).scalar()
+
+
+def compose(course_name, course_session, kind):
+    """(Titel, Text, notification_type) für eine Änderung"""
+    when = f'{course_session.session_date:%d.%m.%Y} {course_session.start_time:%H:%M}'
+    if kind == CANCELLED:
+        return f'Entfällt: {course_name}', f'Der Termin am {when} Uhr fällt aus.', 'warning'
+    where = f', Raum {course_session.room}' if course_session.room else ''
+    if kind == RESTORED:
+        return f'Findet statt: {course_name}', f'Der Termin am {when} Uhr findet doch statt{where}.', 'info'
+    return (f'Geändert: {course_name}',
+            f'Neuer Termin: {when}-{course_session.end_time:%H:%M} Uhr{where}.', 'info')
+
+
+def broadcast_session_change(session, course_session, kind):
+    """Ein INSERT ... SELECT für alle aktiven Teilnehmer; liefert die Anzahl neuer Empfänger"""
+    from app.models import Course, EnrolledCourse, Notification, User
+    from app.change_log import record_bulk_changes
+
+    key = broadcast_key(course_session, kind)
+    if latest_broadcast_key(session, course_session.id) == key:
+        return 0
+    course_name = session.execute(select(Course.name).where(Course.id == course_session.course_id)).scalar()
+    title, message, notification_type = compose(course_name, course_session, kind)
+    # notify_time ist wie bei generate_* Ortszeit, created_at UTC
+    notify_time, now = datetime.now(), datetime.utcnow()
+    # Frühere Meldungen mit gleichem Schlüssel (absagen -> ansetzen -> absagen) nicht erneut protokollieren
+    max_before = session.execute(select(func.max(Notification.id))).scalar() or 0
+
+    recipients = (
+        select(EnrolledCourse.user_id, literal(course_session.course_id), literal(title), literal(message),
+               literal(notification_type), literal(notify_time), literal(False), literal(False), literal(now),
+               literal(key))
+        .join(User, User.id == EnrolledCourse.user_id)
+        .where(EnrolledCourse.course_id == course_session.course_id,
+               EnrolledCourse.status == 'active',
+               User.notification_enabled == True)
+    )
+    statement = insert(Notification.__table__).from_select(
+        ['user_id', 'course_id', 'title', 'message', 'notification_type', 'notify_time',
+         'is_sent', 'is_read', 'created_at', 'broadcast_key'], recipients
+    )
+    count = session.connection().execute(statement).rowcount
+    if count:
+        # Core-INSERT läuft am Session-Hook vorbei: Delta-Sync und Caches der Empfänger nachziehen
+        record_bulk_changes(session, Notification,
+                            and_(Notification.broadcast_key == key, Notification.id > max_before))
+    return count
+
+
+# =================== SESSION EVENTS ===================
+
+def _broadcast_changes(session, flush_context):
+    from app.models import CourseSession
+
+    for obj in list(session.dirty):
+        if isinstance(obj, CourseSession) and obj.id is not None:
+            kind = session_change(obj)
+            if kind is not None:
+                recipients = broadcast_session_change(session, obj, kind)
+                session.info.setdefault('broadcasts', []).append(
+                    {'session_id': obj.id, 'kind': kind, 'recipients': recipients}
+                )
+
+
+def _discard_broadcasts(session, previous_transaction=None):
+    session.info.pop('broadcasts', None)
+
+
+def register_broadcast_listeners():
+    """Terminänderungen beim Flush an die Teilnehmer verteilen (einmal pro Prozess)"""
+    if not event.contains(Session, 'after_flush', _broadcast_changes):
+        event.listen(Session, 'after_flush', _broadcast_changes)
+        event.listen(Session, 'after_commit', _discard_broadcasts)
+        event.listen(Session, 'after_soft_rollback', _discard_broadcasts)
@@ -0,0 +1,220 @@
+"""
+Sammel-Einschreibung ganzer Kohorten (Admin)
+
+Ein Jahrgang wird über einen Selektor bestimmt (Benutzer-IDs,
+Matrikelnummern bzw. deren Präfix, Teilnehmer eines Kurses) und in eine
+Liste von Kursen eingeschrieben. Alles läuft mengenbasiert:
+
+- Zeitkonflikte aller ausgewählten Benutzer mit ihren aktiven Belegungen
+  ermittelt ein einziger Join (gleicher Wochentag, überlappende Zeiten).
+- Bestehende Belegungen werden mit einer Abfrage geladen; abgemeldete und
+  wartende werden per Bulk-UPDATE aktiviert, fehlende per Bulk-INSERT in
+  Blöcken angelegt. Die Platzzähler (courses.enrolled_count) steigen mit
+  einem UPDATE pro Kurs; Pflichtkurse einer Kohorte dürfen die Kapazität
+  überschreiten (siehe app/admission.py).
+- Das Änderungsprotokoll erfasst UPDATEs über den Session-Hook; die
+  eingefügten Zeilen (über ihre (user_id, course_id)-Paare) und die Kurse
+  mit geändertem Platzzähler werden gesammelt nachgetragen
+  (record_bulk_changes). Das invalidiert auch die Caches ('catalog').
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, insert, select, tuple_, update
+from sqlalchemy.orm import aliased
+
+from app.change_log import record_bulk_changes
+
+CONFLICT_POLICIES = ('skip_user', 'skip_course')
+INSERT_BATCH_SIZE = 5000
+REPORT_LIMIT = 1000  # Konflikte in der Antwort, die Zähler bleiben vollständig
+
+
+def user_selection(selector):
+    """SELECT users.id für einen Selektor; mehrere Angaben schränken gemeinsam ein"""
+    from app.models import User, EnrolledCourse
+
+    statement = select(User.id)
+    narrowed = False
+    if selector.get('user_ids') is not None:
+        statement = statement.where(User.id.in_([int(user_id) for user_id in selector['user_ids']]))
+        narrowed = True
+    if selector.get('student_ids') is not None:
+        statement = statement.where(User.student_id.in_([str(value) for value in selector['student_ids']]))
+        narrowed = True
+    if selector.get('student_id_prefix'):
+        statement = statement.where(User.student_id.startswith(str(selector['student_id_prefix']), autoescape=True))
+        narrowed = True
+    if selector.get('enrolled_in_course_id') is not None:
+        statement = statement.where(User.id.in_(
+            select(EnrolledCourse.user_id).where(EnrolledCourse.course_id == int(selector['enrolled_in_course_id']),
+                                                 EnrolledCourse.status == 'active')
+        ))
+        narrowed = True
+    if not narrowed:
+        raise ValueError('Selektor benötigt user_ids, student_ids, student_id_prefix oder enrolled_in_course_id')
+    return statement
+
+
+def target_courses(session, course_ids, session_ids):
+    """Aktive Zielkurse (Spaltenzeilen); Sessions zählen als ihr Kurs. Liefert (Kurse, unbekannte IDs)"""
+    from app.models import Course, CourseSession
+
+    course_ids = {int(course_id) for course_id in course_ids}
+    session_ids = {int(session_id) for session_id in session_ids}
+    session_courses = dict(session.execute(
+        select(CourseSession.id, CourseSession.course_id).where(CourseSession.id.in_(session_ids))
+    ).all()) if session_ids else {}
+    wanted = course_ids | set(session_courses.values())
+    courses = session.execute(
+        select(Course.id, Course.name, Course.day_of_week, Course.start_time, Course.end_time)
+        .where(Course.id.in_(wanted), Course.is_active == True)
+        .order_by(Course.id)
+    ).all() if wanted else []
+    found = {course.id for course in courses}
+    unknown = {
+        'courses': sorted(course_ids - found),
+        'sessions': sorted(session_id for session_id in session_ids
+                           if session_courses.get(session_id) not in found)
+    }
+    return courses, unknown
+
+
+def overlapping_targets(courses):
+    """Zielkurse, die sich untereinander zeitlich überschneiden (nur Hinweis, kein Abbruch)"""
+    return [
+        [first.id, second.id]
+        for index, first in enumerate(courses) for second in courses[index + 1:]
+        if first.day_of_week == second.day_of_week
+        and first.start_time < second.end_time and second.start_time < first.end_time
+    ]
+
+
+def find_conflicts(session, users, target_ids):
+    """(user_id, Zielkurs, belegter Kurs) für alle Benutzer der Auswahl mit einem Join"""
+    from app.models import Course, EnrolledCourse
+
+    target = aliased(Course)
+    existing = aliased(Course)
+    return session.execute(
+        select(EnrolledCourse.user_id, target.id, existing.id)
+        .join(existing, EnrolledCourse.course_id == existing.id)
+        .join(target, and_(
+            target.id.in_(target_ids),
+            target.day_of_week == existing.day_of_week,
+            target.start_time < existing.end_time,
+            existing.start_time < target.end_time
+        ))
+        .where(EnrolledCourse.user_id.in_(users),
+               EnrolledCourse.status == 'active',
+               existing.is_active == True,
+               existing.id.not_in(target_ids))
+        .order_by(EnrolledCourse.user_id, target.id, existing.id)
+    ).all()
+
+
+def existing_enrollments(session, users, target_ids):
+    """{(user_id, course_id): (Status, ID)} für die Zielkurse (eine Zeile pro Paar, Unique-Constraint)"""
+    from app.models import EnrolledCourse
+
+    return {
+        (user_id, course_id): (status, enrollment_id)
+        for enrollment_id, user_id, course_id, status in session.execute(
+            select(EnrolledCourse.id, EnrolledCourse.user_id, EnrolledCourse.course_id, EnrolledCourse.status)
+            .where(EnrolledCourse.user_id.in_(users), EnrolledCourse.course_id.in_(target_ids))
+        )
+    }
+
+
+def bulk_enroll(session, selector, course_ids=(), session_ids=(), on_conflict='skip_user', dry_run=False):
+    """
+    Kohorte einschreiben und Bericht liefern.
+
+    on_conflict='skip_user' überspringt Benutzer mit mindestens einem
+    Zeitkonflikt komplett, 'skip_course' nur die betroffenen Kurse.
+    dry_run berechnet den Bericht ohne zu schreiben. Commit macht der Aufrufer.
+    """
+    from app.models import Course, EnrolledCourse
+
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f'on_conflict muss einer von {", ".join(CONFLICT_POLICIES)} sein')
+    users = user_selection(selector)
+    courses, unknown = target_courses(session, course_ids, session_ids)
+    if not courses:
+        raise ValueError('Keine gültigen Kurse angegeben')
+    target_ids = [course.id for course in courses]
+    user_ids = session.scalars(users).all()
+
+    conflicts = find_conflicts(session, users, target_ids)
+    blocked = {}
+    for user_id, course_id, _ in conflicts:
+        blocked.setdefault(user_id, set()).add(course_id)
+
+    existing = existing_enrollments(session, users, target_ids)
+    new_pairs, reactivate = [], []
+    seats = dict.fromkeys(target_ids, 0)
+    counts = {'already_enrolled': 0, 'completed': 0, 'skipped_conflict': 0}
+    for user_id in user_ids:
+        user_blocked = blocked.get(user_id, ())
+        for course_id in target_ids:
+            if user_blocked and (on_conflict == 'skip_user' or course_id in user_blocked):
+                counts['skipped_conflict'] += 1
+                continue
+            status, enrollment_id = existing.get((user_id, course_id), (None, None))
+            if status == 'active':
+                counts['already_enrolled'] += 1
+            elif status == 'completed':
+                counts['completed'] += 1
+            elif status is not None:
+                reactivate.append(enrollment_id)
+                seats[course_id] += 1
+            else:
+                new_pairs.append((user_id, course_id))
+                seats[course_id] += 1
+
+    if not dry_run:
+        now = datetime.utcnow()
+        for offset in range(0, len(reactivate), INSERT_BATCH_SIZE):
+            session.execute(
+                update(EnrolledCourse)
+                .where(EnrolledCourse.id.in_(reactivate[offset:offset + INSERT_BATCH_SIZE]))
+                .values(status='active', enrollment_date=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        for offset in range(0, len(new_pairs), INSERT_BATCH_SIZE):
+            batch = new_pairs[offset:offset + INSERT_BATCH_SIZE]
+            session.execute(insert(EnrolledCourse), [
+                {'user_id': user_id, 'course_id': course_id, 'status': 'active',
+                 'enrollment_date': now, 'created_at': now, 'updated_at': now}
+                for user_id, course_id in batch
+            ])
+            # Über die Paare, nicht created_at: DATETIME(0) auf MySQL rundet die Mikrosekunden weg
+            record_bulk_changes(session, EnrolledCourse,
+                                tuple_(EnrolledCourse.user_id, EnrolledCourse.course_id).in_(batch))
+        courses_table = Course.__table__
+        for course_id, count in seats.items():
+            if count:
+                session.execute(update(courses_table).where(courses_table.c.id == course_id)
+                                .values(enrolled_count=courses_table.c.enrolled_count + count))
+        changed_courses = [course_id for course_id, count in seats.items() if count]
+        if changed_courses:
+            # Core-UPDATE der Zähler sieht kein Session-Hook: Kurse für Sync und Katalog-Cache nachtragen
+            record_bulk_changes(session, Course, Course.id.in_(changed_courses))
+
+    return {
+        'dry_run': bool(dry_run),
+        'users': len(user_ids),
+        'courses': target_ids,
+        'unknown_courses': unknown['courses'],
+        'unknown_sessions': unknown['sessions'],
+        'overlapping_courses': overlapping_targets(courses),
+        'enrolled': len(new_pairs),
+        'reactivated': len(reactivate),
+        **counts,
+        'skipped_users': sorted(blocked)[:REPORT_LIMIT] if on_conflict == 'skip_user' else [],
+        'skipped_user_count': len(blocked) if on_conflict == 'skip_user' else 0,
+        'conflicts': [
+            {'user_id': user_id, 'course_id': course_id, 'conflicts_with': existing_id}
+            for user_id, course_id, existing_id in conflicts[:REPORT_LIMIT]
+        ],
+        'conflict_count': len(conflicts),
+    }
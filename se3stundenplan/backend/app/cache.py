@@ -0,0 +1,494 @@
+"""
+Cache-Layer für Lesepfade (Stundenpläne, Katalog, Benachrichtigungen)
+
+Jeder Worker hält einen Prozess-LRU (L1). Mit CACHE_BACKEND='shm' oder
+'redis' liegt dahinter ein gemeinsamer Speicher (L2), den sich alle Worker
+teilen, sodass ein Eintrag nur einmal pro Host bzw. Cluster gebaut wird:
+
+- local: nur L1 (Development, ein Prozess)
+- shm:   SQLite-Datei auf /dev/shm (tmpfs), für alle Worker eines Hosts
+- redis: Redis-kompatibler Server (Redis, Valkey, KeyDB, ...), optional
+
+Invalidierung über Tags (timetable:<id>, user:<id>, catalog): jeder Tag hat
+eine Versionsnummer im Backend, Einträge merken sich die Tag-Versionen beim
+Schreiben und gelten nur, solange diese unverändert sind. Ein Invalidate
+erhöht die Version und verteilt sie an die anderen Worker (shm: Tabelle,
+redis: Pub/Sub), die sie beim nächsten Zugriff übernehmen.
+
+Welche Tags eine Transaktion invalidiert, ergibt sich aus dem
+Änderungsprotokoll (app/change_log.py); veröffentlicht wird nach dem Commit.
+Gegen Stampedes koalesziert Single-Flight im Prozess, zwischen Workern
+sorgt eine kurze Sperre im L2 dafür, dass nur einer baut.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time as clock
+from collections import OrderedDict
+
+from flask import Response, current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+TAG_PREFIX = 'tag:'
+LOCK_PREFIX = 'lock:'
+INVALIDATION_CHANNEL = 'stundenplan:cache-invalidate'
+
+
+class Uncacheable(Exception):
+    """build() liefert ein Ergebnis, das nicht gecacht werden darf (z.B. 404)"""
+
+    def __init__(self, value):
+        super().__init__('uncacheable')
+        self.value = value
+
+
+def _encode(versions, payload):
+    return json.dumps(versions).encode() + b'\n' + payload
+
+
+def _decode(raw):
+    header, payload = raw.split(b'\n', 1)
+    return [int(version) for version in json.loads(header)], payload
+
+
+# =================== BACKENDS ===================
+
+class LocalBackend:
+    """LRU im Prozess mit Ablaufzeit; Werte beliebig"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= clock.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, clock.monotonic() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedMemoryBackend:
+    """
+    Gemeinsamer Speicher aller Worker eines Hosts: SQLite im WAL-Modus auf
+    tmpfs (/dev/shm). Lesen ist ein Index-Lookup im Page-Cache, Schreiben
+    ist atomar; Invalidierungen laufen über eine fortlaufende Tabelle.
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._poll_lock = threading.Lock()
+        self._last_seq = None
+        with self._connection() as connection:
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL);
+                CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS invalidations (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT, tag TEXT NOT NULL, version INTEGER NOT NULL, created REAL
+                );
+            ''')
+        self._last_seq = self._execute('SELECT COALESCE(MAX(seq), 0) FROM invalidations').fetchone()[0]
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')  # Cache: Verlust bei Absturz ist egal
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql, params=()):
+        return self._connection().execute(sql, params)
+
+    def get(self, key):
+        row = self._execute('SELECT value, expires FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= clock.time()):
+            return None
+        return row[0]
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        placeholders = ','.join('?' * len(keys))
+        now = clock.time()
+        found = {key: value for key, value, expires in self._execute(
+            f'SELECT key, value, expires FROM entries WHERE key IN ({placeholders})', keys
+        ) if expires is None or expires > now}
+        return [found.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        self._execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?)',
+                      (key, value, clock.time() + ttl if ttl else None))
+        self._writes += 1
+        if self._writes % 256 == 0:
+            self._trim()
+
+    def add(self, key, value, ttl):
+        """Nur setzen, wenn nicht (mehr) vorhanden; True bei Erfolg (Sperren)"""
+        now = clock.time()
+        self._execute('DELETE FROM entries WHERE key = ? AND expires <= ?', (key, now))
+        return self._execute('INSERT OR IGNORE INTO entries VALUES (?, ?, ?)', (key, value, now + ttl)).rowcount == 1
+
+    def delete(self, key):
+        self._execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def incr(self, key):
+        return self._execute(
+            'INSERT INTO counters VALUES (?, 1) ON CONFLICT(key) DO UPDATE SET value = value + 1 RETURNING value',
+            (key,)
+        ).fetchone()[0]
+
+    def counters(self, keys):
+        if not keys:
+            return []
+        placeholders = ','.join('?' * len(keys))
+        found = dict(self._execute(f'SELECT key, value FROM counters WHERE key IN ({placeholders})', keys))
+        return [found.get(key, 0) for key in keys]
+
+    def publish(self, tag, version):
+        self._execute('INSERT INTO invalidations (tag, version, created) VALUES (?, ?, ?)', (tag, version, clock.time()))
+
+    def poll(self):
+        with self._poll_lock:
+            rows = self._execute('SELECT seq, tag, version FROM invalidations WHERE seq > ? ORDER BY seq',
+                                 (self._last_seq,)).fetchall()
+            if rows:
+                self._last_seq = rows[-1][0]
+        return [(tag, version) for _, tag, version in rows]
+
+    def _trim(self):
+        """Abgelaufene Einträge, alte Invalidierungen und Überhang (kürzeste Restlaufzeit zuerst) löschen"""
+        now = clock.time()
+        self._execute('DELETE FROM entries WHERE expires <= ?', (now,))
+        self._execute('DELETE FROM invalidations WHERE created < ?', (now - 3600,))
+        self._execute('''DELETE FROM entries WHERE key IN (
+            SELECT key FROM entries ORDER BY expires LIMIT MAX((SELECT COUNT(*) FROM entries) - ?, 0))''',
+                      (self.max_entries,))
+
+
+class RedisBackend:
+    """Redis-kompatibler Server; client ist ein redis.Redis (oder kompatibler Stand-in)"""
+
+    def __init__(self, client):
+        self.client = client
+        self._poll_lock = threading.Lock()  # die Pub/Sub-Verbindung ist nicht thread-sicher
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(INVALIDATION_CHANNEL)
+
+    @classmethod
+    def from_url(cls, url):
+        import redis  # optional: nur für CACHE_BACKEND=redis nötig
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def get_many(self, keys):
+        return self.client.mget(keys) if keys else []
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl):
+        return bool(self.client.set(key, value, nx=True, px=int(ttl * 1000)))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def counters(self, keys):
+        return [int(value or 0) for value in self.get_many(keys)]
+
+    def publish(self, tag, version):
+        self.client.publish(INVALIDATION_CHANNEL, f'{tag} {version}')
+
+    def poll(self):
+        messages = []
+        while True:
+            with self._poll_lock:
+                message = self.pubsub.get_message(timeout=0)
+            if message is None:
+                return messages
+            data = message['data']
+            tag, version = (data.decode() if isinstance(data, bytes) else data).rsplit(' ', 1)
+            messages.append((tag, int(version)))
+
+
+# =================== CACHE ===================
+
+class Cache:
+    """L1 im Prozess, optional gemeinsames L2, Tag-Versionen und Stampede-Schutz"""
+
+    def __init__(self, backend=None, flight=None, local_entries=2048, default_ttl=300.0,
+                 lock_seconds=5.0, poll_seconds=0.2):
+        from app.single_flight import SingleFlight
+        self.backend = backend
+        self.flight = flight or SingleFlight()
+        self.local = LocalBackend(local_entries)
+        self.default_ttl = default_ttl
+        self.lock_seconds = lock_seconds
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._tag_versions = {}
+        self._polled_at = 0.0
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0, 'lock_waits': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _receive_invalidations(self):
+        """Invalidierungen anderer Worker übernehmen (höchstens alle poll_seconds)"""
+        if self.backend is None or clock.monotonic() - self._polled_at < self.poll_seconds:
+            return
+        self._polled_at = clock.monotonic()
+        for tag, version in self.backend.poll():
+            self._note_version(tag, version)
+
+    def _note_version(self, tag, version):
+        with self._lock:
+            if version > self._tag_versions.get(tag, -1):
+                self._tag_versions[tag] = version
+
+    def tag_versions(self, tags, fresh=False):
+        """Aktuelle Versionen der Tags; fresh=True liest sie aus dem gemeinsamen Backend"""
+        if self.backend is not None and (fresh or any(tag not in self._tag_versions for tag in tags)):
+            for tag, version in zip(tags, self.backend.counters([TAG_PREFIX + tag for tag in tags])):
+                self._note_version(tag, int(version))
+        with self._lock:
+            return [self._tag_versions.get(tag, 0) for tag in tags]
+
+    def get(self, key, tags=()):
+        """Gültigen Eintrag liefern oder None"""
+        tags = sorted(tags)
+        self._receive_invalidations()
+        entry = self.local.get(key)
+        if entry is not None and entry[0] == self.tag_versions(tags):
+            self._count('local_hits')
+            return entry[1]
+
+        if self.backend is not None:
+            raw = self.backend.get(key)
+            if raw is not None:
+                versions, payload = _decode(raw)
+                if versions == self.tag_versions(tags, fresh=True):
+                    self.local.set(key, (versions, payload), self.default_ttl)
+                    self._count('shared_hits')
+                    return payload
+        return None
+
+    def set(self, key, payload, tags=(), ttl=None, versions=None):
+        tags = sorted(tags)
+        ttl = ttl or self.default_ttl
+        versions = versions if versions is not None else self.tag_versions(tags)
+        self.local.set(key, (versions, payload), ttl)
+        if self.backend is not None:
+            self.backend.set(key, _encode(versions, payload), ttl)
+
+    def get_or_set(self, key, build, tags=(), ttl=None, wait_timeout=None):
+        """
+        Eintrag liefern oder mit build() (liefert bytes) erzeugen.
+
+        Pro Prozess baut nur ein Thread (Single-Flight), über Worker hinweg
+        nur der Inhaber der Sperre im L2; die anderen warten bis zu
+        lock_seconds auf dessen Ergebnis. Wirft build() Uncacheable, wird
+        dessen Wert ungecacht zurückgegeben.
+        """
+        payload = self.get(key, tags)
+        if payload is not None:
+            return payload
+
+        def compute():
+            payload = self.get(key, tags)  # ein anderer Thread war schneller
+            if payload is not None:
+                return payload
+            self._count('misses')
+
+            locked = False
+            if self.backend is not None:
+                locked = self.backend.add(LOCK_PREFIX + key, b'1', self.lock_seconds)
+                if not locked:
+                    self._count('lock_waits')
+                    deadline = clock.monotonic() + self.lock_seconds
+                    while clock.monotonic() < deadline:
+                        clock.sleep(0.02)
+                        payload = self.get(key, tags)
+                        if payload is not None:
+                            return payload
+            try:
+                # Versionen vor dem Bauen lesen: Änderungen währenddessen machen den Eintrag ungültig
+                versions = self.tag_versions(sorted(tags), fresh=True)
+                try:
+                    payload = build()
+                except Uncacheable as e:
+                    return e
+                self.set(key, payload, tags, ttl, versions)
+                return payload
+            finally:
+                if locked:
+                    self.backend.delete(LOCK_PREFIX + key)
+
+        result = self.flight.do('cache|' + key, compute, wait_timeout=wait_timeout)
+        return result.value if isinstance(result, Uncacheable) else result
+
+    def invalidate(self, *tags):
+        """Tag-Versionen erhöhen und an alle Worker verteilen"""
+        for tag in tags:
+            if self.backend is not None:
+                version = self.backend.incr(TAG_PREFIX + tag)
+                self.backend.publish(tag, version)
+            else:
+                with self._lock:
+                    version = self._tag_versions.get(tag, 0) + 1
+            self._note_version(tag, version)
+            self._count('invalidations')
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.stats['local_hits'] + self.stats['shared_hits'] + self.stats['misses']
+            hits = self.stats['local_hits'] + self.stats['shared_hits']
+            return {
+                'pid': os.getpid(),
+                'backend': type(self.backend).__name__ if self.backend is not None else 'LocalBackend',
+                **self.stats,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+                'local_entries': len(self.local),
+                'known_tags': len(self._tag_versions),
+            }
+
+
+def create_backend(config):
+    name = config['CACHE_BACKEND']
+    if name == 'local':
+        return None
+    if name == 'shm':
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        path = config['CACHE_SHM_PATH'] or os.path.join(directory, 'stundenplan-cache.sqlite')
+        return SharedMemoryBackend(path, config['CACHE_SHARED_MAX_ENTRIES'])
+    if name == 'redis':
+        return RedisBackend.from_url(config['CACHE_REDIS_URL'])
+    raise ValueError(f'Unbekanntes CACHE_BACKEND: {name}')
+
+
+def register_cache(app):
+    """Ein Cache pro App (und damit pro Worker-Prozess; Verbindungen nach fork neu)"""
+    config = app.config
+    app.extensions['cache'] = Cache(
+        create_backend(config),
+        flight=app.extensions.get('single_flight'),
+        local_entries=config['CACHE_LOCAL_MAX_ENTRIES'],
+        default_ttl=config['CACHE_DEFAULT_TTL'],
+        lock_seconds=config['CACHE_LOCK_SECONDS'],
+        poll_seconds=config['CACHE_POLL_SECONDS'],
+    )
+
+
+def cached_json(key, build, tags, ttl=None, finish=None):
+    """
+    JSON-Antwort über den Cache; build() liefert (payload, status), gecacht wird nur Status 200.
+
+    finish(payload) bereitet gecachte 200er-Antworten pro Anfrage nach
+    (z.B. uhrzeitabhängige Felder), der Cache bleibt davon unberührt.
+
+    build() liest immer vom Primary: ein Eintrag gilt für die aktuelle
+    Tag-Version und damit für alle Benutzer; von einer nachhängenden Replica
+    gebaut, läge er bis zum Ablauf veraltet im Cache (auch für den Schreiber).
+    """
+    from app.db_routing import use_primary
+
+    def execute():
+        with use_primary():
+            payload, status = build()
+        body = current_app.json.dumps(payload).encode()
+        if status != 200:
+            raise Uncacheable((body, status))
+        return body
+
+    result = current_app.extensions['cache'].get_or_set(
+        key, execute, tags, ttl, wait_timeout=current_app.config['SINGLE_FLIGHT_WAIT_SECONDS']
+    )
+    body, status = result if isinstance(result, tuple) else (result, 200)
+    if finish is not None and status == 200:
+        body = current_app.json.dumps(finish(json.loads(body))).encode()
+    return Response(body, status=status, mimetype='application/json')
+
+
+# =================== INVALIDIERUNG NACH COMMIT ===================
+
+def note_cache_tags(session, rows):
+    """
+    Tags aus Änderungsprotokoll-Zeilen vormerken (aufgerufen von app/change_log.py)
+
+    Einschreibungen invalidieren den Katalog nicht: Platzzahlen tragen die
+    Katalog-Routen pro Anfrage nach (finish), sonst verwürfe jede Einschreibung
+    alle Katalogseiten. Kursdetails hängen am Tag des Kurses (course:<id>).
+    """
+    tags = session.info.setdefault('cache_tags', set())
+    session_ids = set()
+    for row in rows:
+        tags.add(f"user:{row['user_id']}")
+        if row['entity'] == 'course':
+            tags.update(('catalog', f"course:{row['entity_id']}"))
+        if row['entity'] == 'session':
+            session_ids.add(row['entity_id'])
+        if row['entity'] == 'timetable':
+            tags.add(f"timetable:{row['entity_id']}")
+    if session_ids:
+        tags.update(f'course:{course_id}' for course_id in _session_courses(session, session_ids))
+
+
+def _session_courses(session, session_ids):
+    """Kurse zu Terminen: aus der Session (auch gerade gelöschte Objekte), sonst per Abfrage"""
+    from app.models import CourseSession
+    known = {
+        obj.id: obj.course_id for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, CourseSession) and obj.id in session_ids
+    }
+    missing = session_ids - set(known)
+    if missing:
+        known.update(session.execute(
+            select(CourseSession.id, CourseSession.course_id).where(CourseSession.id.in_(missing))
+        ).all())
+    return set(known.values())
+
+
+def _publish_cache_tags(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags and has_app_context() and 'cache' in current_app.extensions:
+        current_app.extensions['cache'].invalidate(*sorted(tags))
+
+
+def _discard_cache_tags(session, previous_transaction):
+    session.info.pop('cache_tags', None)
+
+
+def register_cache_listeners():
+    """Invalidierungen nach erfolgreichem Commit veröffentlichen (einmal pro Prozess)"""
+    if not event.contains(Session, 'after_commit', _publish_cache_tags):
+        event.listen(Session, 'after_commit', _publish_cache_tags)
+        event.listen(Session, 'after_soft_rollback', _discard_cache_tags)
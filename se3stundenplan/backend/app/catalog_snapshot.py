@@ -0,0 +1,242 @@
+"""
+Spaltenorientierter Katalog-Snapshot für Filterabfragen
+
+Jeder Worker hält alle aktiven Kurse (und deren Sessions) als unveränderliche
+NumPy-Spalten: Strings dictionary-kodiert, Zeiten als Minute des Tages
+neben dem Wochentag. Filter werden als Boolesche Masken ausgewertet, erst
+die passenden IDs werden aus der Datenbank geladen.
+
+Die Katalogversion ist die höchste Sequenz im Änderungsprotokoll für Kurse
+und Sessions. Sie wird höchstens alle CATALOG_SNAPSHOT_CHECK_SECONDS geprüft
+(sofort nach eigenen Änderungen); bei einer neuen Version wird der Snapshot
+komplett neu gebaut und atomar ausgetauscht.
+"""
+import threading
+import time as clock
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+FIELD_SEPARATOR = '\x01'
+ROW_SEPARATOR = '\x00'
+
+# Zähler für Kurs-/Session-Änderungen in diesem Prozess
+_local_changes = 0
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _codes_in(codes, wanted, size):
+    """Maske für codes in wanted; wenige Werte per Vergleich, sonst per Lookup-Tabelle"""
+    wanted = list(wanted)
+    if len(wanted) <= 8:
+        mask = np.zeros(len(codes), dtype=bool)
+        for value in wanted:
+            mask |= codes == value
+        return mask
+    lookup = np.zeros(size, dtype=bool)
+    lookup[wanted] = True
+    return np.take(lookup, codes)
+
+
+def _encode(values):
+    """Dictionary-Kodierung: (Codes als int32, Wörterbuch)"""
+    dictionary = {}
+    codes = np.fromiter((dictionary.setdefault(value, len(dictionary)) for value in values),
+                        dtype=np.int32, count=len(values))
+    return codes, list(dictionary)
+
+
+class CatalogSnapshot:
+    """Unveränderliche Spalten aller aktiven Kurse, sortiert nach Name"""
+
+    def __init__(self, version, course_rows, session_rows):
+        self.version = version
+        self.built_at = clock.time()
+        self.size = len(course_rows)
+
+        self.ids = np.fromiter((row.id for row in course_rows), dtype=np.int64, count=self.size)
+        self.day = np.fromiter((row.day_of_week for row in course_rows), dtype=np.int16, count=self.size)
+        self.start_of_day = np.fromiter((_minutes(row.start_time) for row in course_rows), dtype=np.int16,
+                                        count=self.size)
+        self.end_of_day = np.fromiter((_minutes(row.end_time) for row in course_rows), dtype=np.int16,
+                                      count=self.size)
+        self.credits = np.fromiter((-1 if row.credits is None else row.credits for row in course_rows),
+                                   dtype=np.int32, count=self.size)
+        self.course_type, self.course_types = _encode([row.course_type or '' for row in course_rows])
+        self.instructor, self.instructors = _encode([row.instructor or '' for row in course_rows])
+        self.instructors_lower = [value.lower() for value in self.instructors]
+
+        # Volltext: ein String, Kurse per ROW_SEPARATOR getrennt; Trefferpositionen -> Zeile per Binärsuche
+        texts = [FIELD_SEPARATOR.join(value or '' for value in (row.name, row.code, row.instructor, row.description)).lower()
+                 for row in course_rows]
+        self.text = ROW_SEPARATOR.join(texts)
+        self.text_offsets = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]], dtype=np.int64)
+
+        # Sessions: Zeilenindex des Kurses und Wochentag des Termins
+        row_of = {course_id: index for index, course_id in enumerate(self.ids.tolist())}
+        session_rows = [row for row in session_rows if row.course_id in row_of]
+        self.session_row = np.fromiter((row_of[row.course_id] for row in session_rows), dtype=np.int32,
+                                       count=len(session_rows))
+        self.session_day = np.fromiter((row.session_date.weekday() for row in session_rows), dtype=np.int16,
+                                       count=len(session_rows))
+
+    # =================== MASKEN ===================
+
+    def all(self):
+        return np.ones(self.size, dtype=bool)
+
+    def dictionary_mask(self, codes, dictionary, predicate):
+        """Prädikat einmal pro Wörterbucheintrag auswerten, dann per Code auf alle Zeilen übertragen"""
+        matching = [code for code, value in enumerate(dictionary) if predicate(value)]
+        return _codes_in(codes, matching, len(dictionary))
+
+    def type_in(self, values):
+        values = set(values)
+        return self.dictionary_mask(self.course_type, self.course_types, lambda value: value in values)
+
+    def instructor_in(self, values):
+        values = set(values)
+        return self.dictionary_mask(self.instructor, self.instructors, lambda value: value in values)
+
+    def instructor_contains(self, term):
+        term = term.lower()
+        return self.dictionary_mask(self.instructor, self.instructors_lower, lambda value: term in value)
+
+    def day_in(self, days):
+        return _codes_in(self.day, {int(day) for day in days if 0 <= int(day) <= 6}, 7)
+
+    def credits_equal(self, credits):
+        return self.credits == credits
+
+    def within_time(self, start, end):
+        """Kurse, die komplett in [start, end] (Uhrzeit, beliebiger Tag) liegen"""
+        return (self.start_of_day >= _minutes(start)) & (self.end_of_day <= _minutes(end))
+
+    def session_day_in(self, days):
+        """Kurse mit mindestens einem Termin an einem der Wochentage"""
+        mask = np.zeros(self.size, dtype=bool)
+        days = {int(day) for day in days if 0 <= int(day) <= 6}
+        mask[self.session_row[_codes_in(self.session_day, days, 7)]] = True
+        return mask
+
+    def text_contains(self, term):
+        """Case-insensitive Teilstring-Suche über Name, Code, Dozent und Beschreibung"""
+        term = term.lower()
+        if not term or FIELD_SEPARATOR in term or ROW_SEPARATOR in term:
+            return np.zeros(self.size, dtype=bool)
+        positions = []
+        position = self.text.find(term)
+        while position != -1:
+            positions.append(position)
+            position = self.text.find(term, position + 1)
+        mask = np.zeros(self.size, dtype=bool)
+        if positions:
+            mask[np.searchsorted(self.text_offsets, positions, side='right') - 1] = True
+        return mask
+
+    def ids_where(self, mask, limit=None, order='name'):
+        """IDs der passenden Kurse nach Name (Snapshot-Reihenfolge) oder ID sortiert"""
+        ids = self.ids[mask]
+        if order == 'id':
+            ids = np.sort(ids)
+        return (ids if limit is None else ids[:limit]).tolist()
+
+
+def catalog_version(session):
+    """Höchste Protokollsequenz für Kurse und Sessions"""
+    from app.models import ChangeLog
+    rows = session.execute(
+        select(ChangeLog.entity, func.max(ChangeLog.seq))
+        .where(ChangeLog.entity.in_(('course', 'session')))
+        .group_by(ChangeLog.entity)
+    ).all()
+    return tuple(sorted((entity, seq) for entity, seq in rows))
+
+
+def build_snapshot(session, version):
+    from app.models import Course, CourseSession
+    course_rows = session.execute(
+        select(Course.id, Course.name, Course.code, Course.instructor, Course.description,
+               Course.course_type, Course.day_of_week, Course.start_time, Course.end_time, Course.credits)
+        .where(Course.is_active == True)
+        .order_by(Course.name, Course.id)
+    ).all()
+    session_rows = session.execute(
+        select(CourseSession.course_id, CourseSession.session_date)
+        .join(Course, CourseSession.course_id == Course.id)
+        .where(Course.is_active == True)
+    ).all()
+    return CatalogSnapshot(version, course_rows, session_rows)
+
+
+class CatalogSnapshotStore:
+    """Aktueller Snapshot eines Workers, wird bei neuer Katalogversion ersetzt"""
+
+    def __init__(self, check_seconds):
+        self.check_seconds = check_seconds
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.checked_at = 0.0
+        self.seen_changes = _local_changes
+        self.rebuilds = 0
+
+    def _fresh(self, snapshot):
+        return (snapshot is not None and self.seen_changes == _local_changes
+                and clock.monotonic() - self.checked_at < self.check_seconds)
+
+    def get(self, session):
+        """Aktuellen Snapshot liefern, bei neuer Katalogversion vorher neu bauen"""
+        snapshot = self.snapshot
+        if self._fresh(snapshot):
+            return snapshot
+
+        with self.lock:
+            if self._fresh(self.snapshot):
+                return self.snapshot
+            seen_changes = _local_changes
+            version = catalog_version(session)
+            if self.snapshot is None or self.snapshot.version != version:
+                self.snapshot = build_snapshot(session, version)
+                self.rebuilds += 1
+            self.checked_at = clock.monotonic()
+            self.seen_changes = seen_changes
+            return self.snapshot
+
+
+def register_catalog_snapshot(app):
+    """Ein Snapshot-Speicher pro App (und damit pro Worker-Prozess)"""
+    app.extensions['catalog_snapshot'] = CatalogSnapshotStore(app.config['CATALOG_SNAPSHOT_CHECK_SECONDS'])
+
+
+# =================== LOKALE ÄNDERUNGEN ===================
+
+def _note_catalog_changes(session, flush_context):
+    """Eigene Kurs-/Session-Änderungen vormerken"""
+    from app.models import Course, CourseSession
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Course, CourseSession)):
+            session.info['catalog_changed'] = True
+            return
+
+
+def _publish_catalog_changes(session):
+    """Nach dem Commit: Version beim nächsten Zugriff sofort prüfen"""
+    global _local_changes
+    if session.info.pop('catalog_changed', False):
+        _local_changes += 1
+
+
+def _discard_catalog_changes(session, previous_transaction):
+    session.info.pop('catalog_changed', None)
+
+
+def register_catalog_snapshot_listeners():
+    """Änderungszähler über Session-Events führen (einmal pro Prozess)"""
+    if not event.contains(Session, 'after_flush', _note_catalog_changes):
+        event.listen(Session, 'after_flush', _note_catalog_changes)
+        event.listen(Session, 'after_commit', _publish_catalog_changes)
+        event.listen(Session, 'after_soft_rollback', _discard_catalog_changes)
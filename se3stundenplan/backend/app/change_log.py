@@ -0,0 +1,207 @@
+"""
+Änderungsprotokoll für den Delta-Sync
+
+Jede Änderung an Stundenplänen, Kursen, Terminen, Kommentaren, Belegungen und
+Benachrichtigungen wird in derselben Transaktion als Zeile in `change_log`
+festgehalten (monotone Sequenz pro Zeile, Besitzer = Benutzer des Stundenplans).
+Löschungen, auch per Cascade oder Bulk-DELETE, erzeugen Tombstones.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert, select, delete, func
+from sqlalchemy.orm import Session
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+
+def tracked_entities():
+    """Modellklasse -> Entitätsname im Sync"""
+    from app.models import Timetable, Course, CourseSession, CourseComment, EnrolledCourse, Notification
+    return {
+        Timetable: 'timetable',
+        Course: 'course',
+        CourseSession: 'session',
+        CourseComment: 'comment',
+        EnrolledCourse: 'enrollment',
+        Notification: 'notification',
+    }
+
+
+def owner_query(model):
+    """SELECT (id, Besitzer) für ein Modell, für Bulk-Statements"""
+    from app.models import Timetable, Course, CourseSession, CourseComment
+
+    if model is Course:
+        return select(Course.id, Timetable.user_id).join(Timetable, Course.timetable_id == Timetable.id)
+    if model in (CourseSession, CourseComment):
+        return (select(model.id, Timetable.user_id)
+                .join(Course, model.course_id == Course.id)
+                .join(Timetable, Course.timetable_id == Timetable.id))
+    return select(model.id, model.user_id)
+
+
+def _resolve_owners(session, objects):
+    """Besitzer (user_id) für geänderte Objekte bestimmen, fehlende Eltern gesammelt nachladen"""
+    from app.models import Timetable, Course, CourseSession, CourseComment
+
+    timetable_owner = {}
+    course_timetable = {}
+    for obj in objects:
+        if isinstance(obj, Timetable):
+            timetable_owner[obj.id] = obj.user_id
+        elif isinstance(obj, Course):
+            course_timetable[obj.id] = obj.timetable_id
+
+    missing_courses = {
+        obj.course_id for obj in objects
+        if isinstance(obj, (CourseSession, CourseComment)) and obj.course_id not in course_timetable
+    }
+    if missing_courses:
+        course_timetable.update(session.execute(
+            select(Course.id, Course.timetable_id).where(Course.id.in_(missing_courses))
+        ).all())
+
+    missing_timetables = set(course_timetable.values()) - set(timetable_owner)
+    if missing_timetables:
+        timetable_owner.update(session.execute(
+            select(Timetable.id, Timetable.user_id).where(Timetable.id.in_(missing_timetables))
+        ).all())
+
+    owners = {}
+    for obj in objects:
+        if isinstance(obj, Timetable):
+            owners[obj] = obj.user_id
+        elif isinstance(obj, Course):
+            owners[obj] = timetable_owner.get(obj.timetable_id)
+        elif isinstance(obj, (CourseSession, CourseComment)):
+            owners[obj] = timetable_owner.get(course_timetable.get(obj.course_id))
+        else:
+            owners[obj] = obj.user_id
+    return owners
+
+
+def _write_rows(session, rows):
+    """Protokollzeilen schreiben und die betroffenen Cache-Tags vormerken (app/cache.py)"""
+    from app.models import ChangeLog
+    from app.cache import note_cache_tags
+    if rows:
+        session.connection().execute(insert(ChangeLog.__table__), rows)
+        note_cache_tags(session, rows)
+
+
+# =================== SESSION EVENTS ===================
+
+def _record_flush(session, flush_context):
+    """ORM-Änderungen (inkl. Cascade-Löschungen) im selben Flush protokollieren"""
+    entities = tracked_entities()
+    changes = []
+    for obj in list(session.new) + list(session.dirty):
+        if type(obj) in entities and obj.id is not None and (obj in session.new or session.is_modified(obj)):
+            changes.append((obj, UPSERT))
+    for obj in session.deleted:
+        if type(obj) in entities and obj.id is not None:
+            changes.append((obj, DELETE))
+    if not changes:
+        return
+
+    owners = _resolve_owners(session, [obj for obj, _ in changes])
+    now = datetime.utcnow()
+    _write_rows(session, [
+        {'user_id': owners[obj], 'entity': entities[type(obj)], 'entity_id': obj.id, 'op': op, 'changed_at': now}
+        for obj, op in changes if owners[obj] is not None
+    ])
+
+
+def _record_bulk(orm_execute_state):
+    """Bulk UPDATE/DELETE (Query.update/delete) vor der Ausführung protokollieren"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    entity = tracked_entities().get(mapper.class_) if mapper is not None else None
+    if entity is None:
+        return
+
+    query = owner_query(mapper.class_)
+    where = orm_execute_state.statement.whereclause
+    if where is not None:
+        query = query.where(where)
+
+    op = DELETE if orm_execute_state.is_delete else UPSERT
+    now = datetime.utcnow()
+    session = orm_execute_state.session
+    _write_rows(session, [
+        {'user_id': user_id, 'entity': entity, 'entity_id': entity_id, 'op': op, 'changed_at': now}
+        for entity_id, user_id in session.execute(query).all()
+    ])
+
+
+def record_bulk_changes(session, model, where, op=UPSERT):
+    """Änderungen ohne Session-Hook protokollieren (Bulk-INSERT, DROP PARTITION); vor Löschungen aufrufen"""
+    entity = tracked_entities()[model]
+    now = datetime.utcnow()
+    _write_rows(session, [
+        {'user_id': user_id, 'entity': entity, 'entity_id': entity_id, 'op': op, 'changed_at': now}
+        for entity_id, user_id in session.execute(owner_query(model).where(where)).all()
+    ])
+
+
+def register_change_log_listeners():
+    """Änderungsprotokoll über Session-Events führen (einmal pro Prozess)"""
+    if not event.contains(Session, 'after_flush', _record_flush):
+        event.listen(Session, 'after_flush', _record_flush)
+        event.listen(Session, 'do_orm_execute', _record_bulk)
+
+
+# =================== CURSOR ===================
+
+def settled_cursor(rows, since, settle_seconds):
+    """
+    Neuen Cursor aus gelesenen Protokollzeilen (seq, changed_at) bestimmen.
+
+    Auto-Increment-Werte werden beim INSERT vergeben, aber in Commit-Reihenfolge
+    sichtbar. Der Cursor rückt deshalb nur über Zeilen vor, die älter als
+    settle_seconds sind; jüngere werden beim nächsten Sync erneut geliefert.
+    """
+    horizon = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    cursor = since
+    for seq, changed_at in rows:
+        if changed_at > horizon:
+            break
+        cursor = seq
+    return cursor
+
+
+def current_cursor(session, settle_seconds):
+    """Höchste abgeschlossene Sequenz (Startpunkt nach einem Voll-Sync)"""
+    from app.models import ChangeLog
+    horizon = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    return session.execute(
+        select(func.max(ChangeLog.seq)).where(ChangeLog.changed_at <= horizon)
+    ).scalar() or 0
+
+
+def user_version(session, user_id, entities):
+    """Höchste Sequenz eines Benutzers für die Entitäten (Version für Caches, 0 = nie geändert)"""
+    from app.models import ChangeLog
+    return session.execute(
+        select(func.max(ChangeLog.seq)).where(ChangeLog.user_id == user_id, ChangeLog.entity.in_(entities))
+    ).scalar() or 0
+
+
+def prune_change_log(session, retention_days, now=None, limit=None):
+    """
+    Protokollzeilen älter als retention_days löschen; Clients davor bekommen einen Voll-Sync.
+
+    limit begrenzt auf die ältesten Zeilen (Lauf über den Primärschlüssel, seq steigt mit changed_at).
+    """
+    from app.models import ChangeLog
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    if limit is None:
+        return session.execute(delete(ChangeLog).where(ChangeLog.changed_at < cutoff)).rowcount
+    seqs = session.scalars(
+        select(ChangeLog.seq).where(ChangeLog.changed_at < cutoff).order_by(ChangeLog.seq).limit(limit)
+    ).all()
+    if seqs:
+        session.execute(delete(ChangeLog).where(ChangeLog.seq.in_(seqs)).execution_options(synchronize_session=False))
+    return len(seqs)
@@ -0,0 +1,200 @@
+"""
+Read-Replica Routing
+
+Lesende Requests (GET/HEAD/OPTIONS) und explizit lesende Abschnitte gehen per
+Round-Robin an die Replica-Engines, alles andere an den Primary. Fällt eine
+Replica aus, wird sie für DB_REPLICA_RETRY_SECONDS aus der Rotation genommen.
+Nach einem Schreibzugriff liest der Benutzer für DB_STICKY_SECONDS vom Primary
+(Read-your-writes), über alle Worker hinweg per Cookie.
+
+Die Replicas werden als Flask-SQLAlchemy Binds ("replica_0", "replica_1", ...)
+angelegt und teilen sich damit Engine-Optionen und Pool-Instrumentierung.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+
+REPLICA_PREFIX = 'replica_'
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# 'replica' oder 'primary' für den aktuellen Request bzw. Kontext
+_route = ContextVar('db_route', default='primary')
+
+
+class ReplicaRouter:
+    """Round-Robin über gesunde Replicas plus Sticky-Fenster pro Benutzer"""
+
+    def __init__(self, bind_keys, retry_seconds=30, sticky_seconds=5):
+        self.bind_keys = list(bind_keys)
+        self.retry_seconds = retry_seconds
+        self.sticky_seconds = sticky_seconds
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._down_until = {}
+        self._sticky_until = {}
+
+    @property
+    def enabled(self):
+        return bool(self.bind_keys)
+
+    def choose(self, engines):
+        """Nächste gesunde Replica-Engine, None wenn keine verfügbar ist"""
+        now = time.monotonic()
+        healthy = [key for key in self.bind_keys if self._down_until.get(key, 0) <= now]
+        if not healthy:
+            return None
+        return engines[healthy[next(self._counter) % len(healthy)]]
+
+    def mark_down(self, bind_key):
+        with self._lock:
+            self._down_until[bind_key] = time.monotonic() + self.retry_seconds
+        current_app.logger.warning(f'Replica {bind_key} ausgefallen, {self.retry_seconds}s aus der Rotation genommen')
+
+    def stick(self, user_id):
+        """Benutzer für das Sticky-Fenster an den Primary binden, liefert das Ende als Unix-Zeit"""
+        until = time.time() + self.sticky_seconds
+        if user_id is not None:
+            with self._lock:
+                self._sticky_until[str(user_id)] = until
+                if len(self._sticky_until) > 10000:
+                    now = time.time()
+                    self._sticky_until = {k: v for k, v in self._sticky_until.items() if v > now}
+        return until
+
+    def is_sticky(self, user_id):
+        return user_id is not None and self._sticky_until.get(str(user_id), 0) > time.time()
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            key: {
+                'healthy': self._down_until.get(key, 0) <= now,
+                'retry_in': max(0.0, round(self._down_until.get(key, 0) - now, 1)),
+            }
+            for key in self.bind_keys
+        }
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy Session, die lesende Statements an eine Replica schickt"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                # Ab dem ersten Schreibzugriff bleibt die Session auf dem Primary
+                self.info['wrote'] = True
+                if has_app_context():
+                    g.db_wrote = True
+            elif (_route.get() == 'replica' and not self.info.get('wrote')
+                  and getattr(clause, 'is_select', False) and has_app_context()):
+                engine = self._replica_engine()
+                if engine is not None:
+                    return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_engine(self):
+        # Innerhalb einer Session immer dieselbe Replica lesen (konsistenter Snapshot)
+        engine = self.info.get('replica_engine')
+        if engine is None:
+            router = current_app.extensions.get('db_router')
+            if router is None or not router.enabled:
+                return None
+            engine = router.choose(self._db.engines)
+            self.info['replica_engine'] = engine
+        return engine
+
+
+@contextmanager
+def use_replica():
+    """Abschnitt explizit als lesend markieren (z.B. in Skripten oder Reports)"""
+    token = _route.set('replica')
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Abschnitt erzwingen, der vom Primary liest"""
+    token = _route.set('primary')
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def configure_replicas(app):
+    """Replica-URIs vor db.init_app() als Binds eintragen"""
+    uris = [uri for uri in app.config.get('SQLALCHEMY_REPLICA_URIS') or [] if uri]
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for index, uri in enumerate(uris):
+        binds[f'{REPLICA_PREFIX}{index}'] = uri
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+    app.extensions['db_router'] = ReplicaRouter(
+        [f'{REPLICA_PREFIX}{index}' for index in range(len(uris))],
+        retry_seconds=app.config.get('DB_REPLICA_RETRY_SECONDS', 30),
+        sticky_seconds=app.config.get('DB_STICKY_SECONDS', 5)
+    )
+
+
+def register_replica_routing(app, db):
+    """Health-Ejection und Request-Routing registrieren (nach db.init_app())"""
+    router = app.extensions['db_router']
+    if not router.enabled:
+        return
+
+    with app.app_context():
+        engines = db.engines
+
+    for bind_key in router.bind_keys:
+        def handle_error(context, bind_key=bind_key):
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+                router.mark_down(bind_key)
+
+        event.listen(engines[bind_key], 'handle_error', handle_error)
+
+    @app.before_request
+    def route_request():
+        g.db_wrote = False
+        if request.method not in SAFE_METHODS:
+            g.db_route_token = _route.set('primary')
+            return
+
+        sticky = request.cookies.get(STICKY_COOKIE, type=float, default=0) > time.time()
+        if not sticky:
+            sticky = router.is_sticky(_request_user_id())
+        g.db_route_token = _route.set('primary' if sticky else 'replica')
+
+    @app.after_request
+    def remember_write(response):
+        if g.get('db_wrote') and response.status_code < 400:
+            until = router.stick(_request_user_id())
+            response.set_cookie(STICKY_COOKIE, f'{until:.3f}', max_age=router.sticky_seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    @app.teardown_request
+    def reset_route(error=None):
+        token = g.pop('db_route_token', None)
+        if token is not None:
+            _route.reset(token)
+
+
+def _request_user_id():
+    """Benutzer-ID aus dem JWT, falls vorhanden (ohne den Request abzulehnen)"""
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
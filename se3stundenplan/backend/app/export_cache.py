@@ -0,0 +1,142 @@
+"""
+Festplatten-Cache für Export-Dateien
+
+Exporte werden unter einem Dateinamen abgelegt, der sich eindeutig aus
+(Stundenplan, Version, Format, Sprache) ergibt. Solange sich der Stundenplan
+nicht ändert, wird dieselbe Datei per send_file (sendfile/zero-copy über
+wsgi.file_wrapper) ausgeliefert. Die Gesamtgröße ist begrenzt: beim Schreiben
+werden alte Versionen desselben Stundenplans entfernt und danach die am
+längsten nicht genutzten Dateien (mtime als LRU-Uhr, auch über Worker hinweg).
+
+Import-Templates ändern sich nie und werden einmalig vorgebaut: pro Deployment
+in create_tables.py (bzw. beim Start in Development), damit Worker beim Booten
+weder pandas noch openpyxl laden müssen.
+"""
+import os
+import re
+import tempfile
+import threading
+
+TEMPLATE_VERSION = 1  # erhöhen, wenn sich die Templates ändern
+TEMPLATE_FORMATS = ('csv', 'xlsx')
+TMP_PREFIX = '.tmp-'  # halbfertige Dateien (Endung bleibt, pandas prüft sie)
+
+
+class ExportCache:
+    """Größenbegrenzter LRU-Cache für Export-Dateien in einem Verzeichnis"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = os.path.abspath(directory)
+        self.template_directory = os.path.join(self.directory, 'templates')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.template_directory, exist_ok=True)
+
+    def path_for(self, timetable_id, version, format, locale):
+        locale = re.sub(r'[^A-Za-z_-]', '', locale)
+        return os.path.join(self.directory, f'{timetable_id}-{version}-{locale}.{format}')
+
+    def get(self, path):
+        """Pfad bei Treffer (LRU-Zeit wird aktualisiert), sonst None"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def store(self, path, write):
+        """write(tmp_path) erzeugt die Datei; atomar einsetzen, danach aufräumen"""
+        descriptor, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=TMP_PREFIX,
+                                                suffix=os.path.splitext(path)[1])
+        os.close(descriptor)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict_stale(path)
+        self._evict_lru(keep=path)
+        return path
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self.evictions += 1
+
+    def _evict_stale(self, path):
+        """Andere Versionen desselben Stundenplans entfernen"""
+        timetable_id, version = os.path.basename(path).split('-', 2)[:2]
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.startswith(TMP_PREFIX):
+                continue
+            parts = entry.name.split('-', 2)
+            if len(parts) == 3 and parts[0] == timetable_id and parts[1] != version:
+                self._remove(entry.path)
+
+    def _evict_lru(self, keep):
+        """Älteste Dateien löschen, bis die Gesamtgröße unter max_bytes liegt"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith(TMP_PREFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                self._remove(path)
+                total -= size
+
+    def template_path(self, format):
+        return os.path.join(self.template_directory, f'template-v{TEMPLATE_VERSION}.{format}')
+
+    def prebuild_templates(self, formats=TEMPLATE_FORMATS):
+        """Fehlende Templates einmalig erzeugen"""
+        from app.routes.export_import import TEMPLATE_BUILDERS
+        for format in formats:
+            path = self.template_path(format)
+            if not os.path.exists(path):
+                descriptor, tmp_path = tempfile.mkstemp(dir=self.template_directory, prefix=TMP_PREFIX,
+                                                        suffix=os.path.splitext(path)[1])
+                os.close(descriptor)
+                TEMPLATE_BUILDERS[format](tmp_path)
+                os.replace(tmp_path, path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'pid': os.getpid(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'files': sum(1 for entry in os.scandir(self.directory) if entry.is_file()),
+                'bytes': sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file()),
+                'max_bytes': self.max_bytes,
+            }
+
+
+def register_export_cache(app):
+    """Cache anlegen; in Development die Import-Templates direkt vorbauen"""
+    # Relative Pfade gelten ab dem Backend-Verzeichnis, nicht ab dem Arbeitsverzeichnis des Prozesses
+    directory = os.path.join(os.path.dirname(app.root_path), app.config['EXPORT_CACHE_DIR'])
+    cache = ExportCache(directory, app.config['EXPORT_CACHE_MAX_BYTES'])
+    if app.config['CREATE_TABLES_ON_STARTUP']:
+        cache.prebuild_templates()
+    app.extensions['export_cache'] = cache
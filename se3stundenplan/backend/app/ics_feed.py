@@ -0,0 +1,260 @@
+"""
+iCalendar-Feed für Stundenpläne (Abo in externen Kalender-Apps)
+
+Kurse werden als wöchentliche Serien (RRULE) im Semesterzeitraum gerendert,
+Termine (CourseSession) als Ausnahmen: abgesagte Termine am Kurstag als
+EXDATE, geänderte als RECURRENCE-ID, Termine an anderen Tagen als eigene
+Events. Erinnerungen kommen aus reminder_minutes.
+
+Kalender-Apps fragen alle paar Minuten nach. Die Version eines Stundenplans
+ist die höchste Sequenz im Änderungsprotokoll seines Besitzers; das gerenderte
+Ergebnis wird pro (Stundenplan, Version) gecacht und per ETag/304 ausgeliefert.
+"""
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from app.change_log import user_version
+
+FEED_FORMAT = 1  # erhöhen, wenn sich die Ausgabe ändert (Teil des ETags)
+PRODID = '-//SE3 Stundenplan//Kalender-Feed//DE'
+UID_DOMAIN = 'stundenplan.se3'
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+VTIMEZONE_BERLIN = [
+    'BEGIN:VTIMEZONE',
+    'TZID:Europe/Berlin',
+    'BEGIN:DAYLIGHT',
+    'TZOFFSETFROM:+0100',
+    'TZOFFSETTO:+0200',
+    'TZNAME:CEST',
+    'DTSTART:19700329T020000',
+    'RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU',
+    'END:DAYLIGHT',
+    'BEGIN:STANDARD',
+    'TZOFFSETFROM:+0200',
+    'TZOFFSETTO:+0100',
+    'TZNAME:CET',
+    'DTSTART:19701025T030000',
+    'RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU',
+    'END:STANDARD',
+    'END:VTIMEZONE',
+]
+
+
+# =================== TOKEN ===================
+
+def _serializer(secret_key):
+    return URLSafeSerializer(secret_key, salt='calendar-feed')
+
+
+def feed_token(secret_key, timetable_id, user_id):
+    """Signierter Token mit Stundenplan und Besitzer (Feed braucht keinen Login)"""
+    return _serializer(secret_key).dumps([timetable_id, user_id])
+
+
+def read_feed_token(secret_key, token, timetable_id):
+    """Besitzer aus dem Token lesen; None, wenn Signatur oder Stundenplan nicht passen"""
+    try:
+        token_timetable_id, user_id = _serializer(secret_key).loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None
+    return user_id if token_timetable_id == timetable_id else None
+
+
+# =================== VERSION & CACHE ===================
+
+def timetable_version(session, user_id):
+    """Höchste Protokollsequenz für Stundenpläne, Kurse und Termine des Benutzers"""
+    return user_version(session, user_id, ('timetable', 'course', 'session'))
+
+
+def feed_etag(timetable_id, version):
+    return f'ics-{FEED_FORMAT}-{timetable_id}-{version}'
+
+
+class FeedCache:
+    """LRU-Cache für gerenderte Feeds, Schlüssel (Stundenplan, Version)"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            # Ältere Versionen desselben Stundenplans werden nie wieder gebraucht
+            for stale in [k for k in self._entries if k[0] == key[0]]:
+                del self._entries[stale]
+            self._entries[key] = body
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def register_feed_cache(app):
+    app.extensions['ics_feed_cache'] = FeedCache(app.config['ICS_CACHE_SIZE'])
+
+
+# =================== RENDERING ===================
+
+def semester_range(timetable, fallback):
+    """
+    Vorlesungszeitraum aus Semesterangabe (z.B. 'WS24', 'WS 24/25', 'SS25').
+
+    Ohne erkennbares Semester beginnt die Serie bei fallback und endet nie.
+    """
+    match = re.match(r'\s*(WS|SS|SoSe|WiSe)\s*(\d{2,4})?', timetable.semester or '', re.IGNORECASE)
+    if not match:
+        return fallback, None
+    year = int(match.group(2)) if match.group(2) else timetable.year
+    if year is None:
+        return fallback, None
+    if year < 100:
+        year += 2000
+    if match.group(1).upper() in ('WS', 'WISE'):
+        return date(year, 10, 1), date(year + 1, 3, 31)
+    return date(year, 4, 1), date(year, 9, 30)
+
+
+def first_weekday_on_or_after(start, weekday):
+    return start + timedelta(days=(weekday - start.weekday()) % 7)
+
+
+def escape_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold(line):
+    """Zeilen nach RFC 5545 bei 75 Oktetts umbrechen"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts, current = [], b''
+    for char in line:
+        char_bytes = char.encode('utf-8')
+        if len(current) + len(char_bytes) > (75 if not parts else 74):
+            parts.append(current.decode('utf-8'))
+            current = b''
+        current += char_bytes
+    parts.append(current.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+
+def _local(day, at):
+    return f"{day.strftime('%Y%m%d')}T{at.strftime('%H%M%S')}"
+
+
+def _utc(moment):
+    return (moment or datetime.utcnow()).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _alarm(course, summary):
+    if not course.reminder_enabled or not course.reminder_minutes:
+        return []
+    return [
+        'BEGIN:VALARM',
+        'ACTION:DISPLAY',
+        f'DESCRIPTION:{escape_text(summary)}',
+        f'TRIGGER:-PT{int(course.reminder_minutes)}M',
+        'END:VALARM',
+    ]
+
+
+def _event(uid, course, summary, day, start, end, room, description, stamp, extra=()):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{stamp}',
+        f'LAST-MODIFIED:{stamp}',
+        *extra,
+        f'DTSTART;TZID=Europe/Berlin:{_local(day, start)}',
+        f'DTEND;TZID=Europe/Berlin:{_local(day, end)}',
+        f'SUMMARY:{escape_text(summary)}',
+    ]
+    if room:
+        lines.append(f'LOCATION:{escape_text(room)}')
+    if description:
+        lines.append(f'DESCRIPTION:{escape_text(description)}')
+    if course.course_type:
+        lines.append(f'CATEGORIES:{escape_text(course.course_type)}')
+    return lines
+
+
+def is_cancelled(session):
+    return bool(session.is_cancelled) or session.session_type == 'cancelled'
+
+
+def render_course(course, sessions, period_start, period_end):
+    """Wöchentliche Serie eines Kurses plus Ausnahmen/Einzeltermine"""
+    uid = f'course-{course.id}@{UID_DOMAIN}'
+    stamp = _utc(course.updated_at)
+    first = first_weekday_on_or_after(period_start, course.day_of_week)
+
+    exdates, overrides, singles = [], [], []
+    for session in sessions:
+        on_series = (session.session_date.weekday() == course.day_of_week and session.session_date >= first
+                     and (period_end is None or session.session_date <= period_end))
+        if on_series and is_cancelled(session):
+            exdates.append(session.session_date)
+        elif on_series:
+            overrides.append(session)
+        else:
+            singles.append(session)
+
+    rule = f'RRULE:FREQ=WEEKLY;BYDAY={WEEKDAYS[course.day_of_week]}'
+    if period_end is not None:
+        rule += f';UNTIL={period_end.strftime("%Y%m%d")}T235959Z'
+    extra = [rule]
+    if exdates:
+        extra.append('EXDATE;TZID=Europe/Berlin:' + ','.join(_local(day, course.start_time) for day in exdates))
+
+    lines = _event(uid, course, course.name, first, course.start_time, course.end_time,
+                   course.room, course.description, stamp, extra) + _alarm(course, course.name) + ['END:VEVENT']
+
+    for session in overrides:
+        summary = f'{course.name}: {session.title}' if session.title else course.name
+        lines += _event(uid, course, summary, session.session_date, session.start_time, session.end_time,
+                        session.room or course.room, session.description or course.description, _utc(session.updated_at),
+                        [f'RECURRENCE-ID;TZID=Europe/Berlin:{_local(session.session_date, course.start_time)}'])
+        lines += _alarm(course, summary) + ['END:VEVENT']
+
+    for session in singles:
+        summary = f'{course.name}: {session.title}' if session.title else course.name
+        extra = ['STATUS:CANCELLED'] if is_cancelled(session) else []
+        lines += _event(f'session-{session.id}@{UID_DOMAIN}', course, summary, session.session_date,
+                        session.start_time, session.end_time, session.room or course.room,
+                        session.description, _utc(session.updated_at), extra)
+        lines += ([] if is_cancelled(session) else _alarm(course, summary)) + ['END:VEVENT']
+
+    return lines
+
+
+def render_calendar(timetable, courses, sessions_by_course):
+    """Kompletten Feed als UTF-8-Bytes mit CRLF-Zeilenenden rendern"""
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(timetable.name)}',
+        'X-WR-TIMEZONE:Europe/Berlin',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT15M',
+        *VTIMEZONE_BERLIN,
+    ]
+    for course in courses:
+        period_start, period_end = semester_range(timetable, (course.created_at or datetime.utcnow()).date())
+        lines += render_course(course, sessions_by_course.get(course.id, []), period_start, period_end)
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(fold(line) for line in lines) + '\r\n').encode('utf-8')
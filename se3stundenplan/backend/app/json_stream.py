@@ -0,0 +1,144 @@
+"""
+Gestreamte JSON-Listen und Antwort-Kompression
+
+Große Listen (z.B. der Kurskatalog) werden Element für Element kodiert und in
+Blöcken gesendet, während die Datenbank die Zeilen blockweise (IN-Abfragen) nachliefert.
+Antworten ab COMPRESS_MIN_SIZE Bytes werden mit Brotli oder gzip komprimiert,
+sofern der Client es per Accept-Encoding erlaubt.
+"""
+import zlib
+from itertools import chain
+
+from flask import Response, current_app, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+
+def accepted_encoding():
+    """Bestes vom Client akzeptiertes Encoding ('br', 'gzip') oder None"""
+    accepted = {}
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+class Compressor:
+    """Inkrementeller Kompressor für gzip bzw. Brotli"""
+
+    def __init__(self, encoding):
+        config = current_app.config
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+            self.compress, self.finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+            self.compress, self.finish = compressor.compress, compressor.flush
+
+
+def compress_chunks(chunks, encoding):
+    compressor = Compressor(encoding)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.finish()
+
+
+def iter_json_list(key, items, serialize, extra=None, chunk_size=None):
+    """
+    JSON-Objekt {key: [...], 'count': n, **extra} blockweise erzeugen.
+
+    Jedes Element wird einzeln kodiert, nur ein Block (chunk_size Bytes) liegt
+    gleichzeitig im Speicher.
+    """
+    dumps = current_app.json.dumps
+    chunk_size = chunk_size or current_app.config['JSON_STREAM_CHUNK_SIZE']
+
+    buffer = [f'{{{dumps(key)}:['.encode()]
+    size = len(buffer[0])
+    count = 0
+    for item in items:
+        encoded = (',' if count else '') + dumps(serialize(item), separators=(',', ':'))
+        encoded = encoded.encode()
+        buffer.append(encoded)
+        size += len(encoded)
+        count += 1
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+
+    tail = {'count': count, **(extra or {})}
+    buffer.append(b']')
+    for name, value in tail.items():
+        buffer.append(f',{dumps(name)}:{dumps(value, separators=(",", ":"))}'.encode())
+    buffer.append(b'}')
+    yield b''.join(buffer)
+
+
+def stream_json_list(key, items, serialize, extra=None, status=200):
+    """
+    Gestreamte JSON-Antwort für eine große Liste.
+
+    Der erste Block wird noch im View erzeugt: Datenbankfehler landen so im
+    normalen Fehlerpfad, und bleibt die gesamte Antwort unter der Schwelle,
+    wird sie unkomprimiert in einem Stück gesendet.
+    """
+    chunks = iter_json_list(key, items, serialize, extra)
+    threshold = current_app.config['COMPRESS_MIN_SIZE']
+
+    head, size = [], 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= threshold:
+            break
+    else:
+        return Response(b''.join(head), status=status, mimetype='application/json')
+
+    body = chain(head, chunks)
+    encoding = accepted_encoding()
+    if encoding:
+        body = compress_chunks(body, encoding)
+
+    response = Response(stream_with_context(body), status=status, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def register_compression(app):
+    """Nicht gestreamte JSON-Antworten ab COMPRESS_MIN_SIZE komprimieren"""
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+                or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        encoding = accepted_encoding()
+        if encoding:
+            response.set_data(b''.join(compress_chunks([data], encoding)))
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
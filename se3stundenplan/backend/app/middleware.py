@@ -16,7 +16,7 @@ def register_middleware(app):
         
         # Validate Content-Type for POST/PUT requests
         if request.method in ['POST', 'PUT', 'PATCH']:
-            if not request.is_json and request.content_type != 'multipart/form-data':
+            if not request.is_json and request.mimetype != 'multipart/form-data':
                 return jsonify({
                     'error': 'Content-Type muss application/json oder multipart/form-data sein'
                 }), 400
@@ -108,15 +108,21 @@ class Course(db.Model):
     is_active = db.Column(db.Boolean, default=True)  
     reminder_enabled = db.Column(db.Boolean, default=True)  
     reminder_minutes = db.Column(db.Integer, default=15)  # Benachrichtigung X Minuten vorher  
+    
+    # Platzvergabe (app/admission.py): capacity None = unbegrenzt, enrolled_count = aktive Belegungen
+    capacity = db.Column(db.Integer, nullable=True)
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
       
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  
       
     # Relationships  
     comments = db.relationship('CourseComment', backref='course', lazy=True, cascade='all, delete-orphan')  
-    notifications = db.relationship('Notification', backref='course', lazy=True, cascade='all, delete-orphan')  
-      
-    def to_dict(self, include_comments=False):  
+    notifications = db.relationship('Notification', backref='course', lazy=True, cascade='all, delete-orphan')
+    course_sessions = db.relationship('CourseSession', backref='course', lazy=True, cascade='all, delete-orphan',
+                                      order_by='CourseSession.session_date')
+
+    def to_dict(self, include_comments=False, include_sessions=False):
         result = {  
             'id': self.id,  
             'timetable_id': self.timetable_id,  
@@ -137,11 +143,15 @@ class Course(db.Model):
             'is_active': self.is_active,  
             'reminder_enabled': self.reminder_enabled,  
             'reminder_minutes': self.reminder_minutes,  
+            'capacity': self.capacity,
+            'enrolled_count': self.enrolled_count,
             'created_at': self.created_at.isoformat(),  
             'updated_at': self.updated_at.isoformat()  
         }  
         if include_comments:  
-            result['comments'] = [comment.to_dict() for comment in self.comments]  
+            result['comments'] = [comment.to_dict() for comment in self.comments]
+        if include_sessions:
+            result['sessions'] = [session.to_dict() for session in self.course_sessions]
         return result
 
 class CourseComment(db.Model):  
@@ -172,6 +182,12 @@ class CourseComment(db.Model):
 
 class Notification(db.Model):  
     __tablename__ = 'notifications'  
+    __table_args__ = (
+        db.Index('ix_notifications_notify_time', 'notify_time'),  # Keyset-Walk der Aufbewahrung (app/retention.py)
+        db.Index('ix_notifications_user_notify', 'user_id', 'notify_time'),  # /upcoming, Dashboard
+        db.Index('ix_notifications_user_read', 'user_id', 'is_read'),  # Ungelesen-Zähler
+        db.Index('ix_notifications_broadcast', 'broadcast_key', 'user_id'),  # jüngste Meldung je Termin (app/broadcast.py)
+    )
       
     id = db.Column(db.Integer, primary_key=True)  
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  
@@ -186,6 +202,9 @@ class Notification(db.Model):
     is_sent = db.Column(db.Boolean, default=False)  
     is_read = db.Column(db.Boolean, default=False)  
       
+    # Terminänderungen an alle Teilnehmer: gleicher Schlüssel = dieselbe Meldung (app/broadcast.py)
+    broadcast_key = db.Column(db.String(200), nullable=True)
+      
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  
       
     def to_dict(self):  
@@ -223,12 +242,16 @@ class DegreeProgram(db.Model):
 
 class EnrolledCourse(db.Model):
     __tablename__ = 'enrolled_courses'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'course_id', name='uq_enrolled_courses_user_course'),
+        db.Index('ix_enrolled_courses_course_status', 'course_id', 'status'),  # Sammel-Einschreibung, Kohorten
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
     enrollment_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    status = db.Column(db.String(20), nullable=False, default='active')  # active, dropped, completed
+    status = db.Column(db.String(20), nullable=False, default='active')  # active, waitlisted, dropped, completed
     grade = db.Column(db.Float, nullable=True)
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -278,4 +301,28 @@ class CourseSession(db.Model):
             'is_cancelled': self.is_cancelled,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class ChangeLog(db.Model):
+    """Monotones Änderungsprotokoll pro Benutzer (Delta-Sync, Tombstones für Löschungen)"""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_user_seq', 'user_id', 'seq'),
+        db.Index('ix_change_log_entity_seq', 'entity', 'seq'),  # Katalogversion (app/catalog_snapshot.py)
+    )
+
+    seq = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # timetable, course, session, comment, enrollment, notification
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # upsert, delete
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'seq': self.seq,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'op': self.op,
+            'changed_at': self.changed_at.isoformat()
+        }
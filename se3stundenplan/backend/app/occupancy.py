@@ -0,0 +1,422 @@
+"""
+Globaler Belegungsindex für Räume und Dozenten
+
+Hält pro Worker alle aktiven Kurse (wöchentlich) und Sessions (datiert) in
+sortierten Intervall-Listen, getrennt nach Raum bzw. Dozent und Tag. Damit
+lassen sich Überschneidungen über alle Stundenpläne hinweg in O(log n + k)
+prüfen, statt jedes Mal den kompletten Katalog zu laden.
+
+Kopien desselben Kurses in verschiedenen Stundenplänen (gleicher Kurscode)
+zählen als ein Angebot und erzeugen keinen Konflikt miteinander.
+
+Eigene Commits übernimmt der Index sofort (Session-Events). Änderungen
+anderer Worker und Bulk-Statements ohne Session-Hook erkennt er an der
+Katalogversion (höchste Sequenz im Änderungsprotokoll für Kurse und
+Sessions, wie app/catalog_snapshot.py): höchstens alle
+OCCUPANCY_CHECK_SECONDS geprüft, bei neuer Version komplett neu gebaut.
+"""
+
+import threading
+import time as clock
+from bisect import bisect_left, insort
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.catalog_snapshot import catalog_version
+
+WEEKLY = 'w'       # wöchentlicher Kurstermin, Schlüssel: Wochentag
+DATED = 'd'        # datierte Session, Schlüssel: Datum
+DATED_WEEKDAY = 'dw'  # datierte Session, zusätzlich nach Wochentag (für Abfragen wöchentlicher Termine)
+
+RESOURCES = ('room', 'instructor')
+
+
+def _normalize(value):
+    return value.strip().lower() if value and value.strip() else None
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _offering_key(code, name):
+    return (_normalize(code) or _normalize(name) or '')
+
+
+class IntervalBucket:
+    """Nach Startzeit sortierte Intervalle eines Raums/Dozenten an einem Tag"""
+
+    def __init__(self):
+        self.keys = []          # (start, entry_id) sortiert
+        self.ends = {}          # entry_id -> end
+        self.max_duration = 0
+
+    def add(self, start, end, entry_id):
+        insort(self.keys, (start, entry_id))
+        self.ends[entry_id] = end
+        self.max_duration = max(self.max_duration, end - start)
+
+    def remove(self, start, entry_id):
+        index = bisect_left(self.keys, (start, entry_id))
+        if index < len(self.keys) and self.keys[index] == (start, entry_id):
+            del self.keys[index]
+            del self.ends[entry_id]
+
+    def overlapping(self, start, end):
+        """Alle Einträge, die [start, end) schneiden
+
+        Nur Einträge mit Startzeit in [start - max_duration, end) kommen in
+        Frage, beide Grenzen werden per Binärsuche gefunden.
+        """
+        low = bisect_left(self.keys, (start - self.max_duration,))
+        high = bisect_left(self.keys, (end,))
+        return [entry_id for entry_start, entry_id in self.keys[low:high] if self.ends[entry_id] > start]
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class OccupancyIndex:
+    """Belegungsindex über alle Kurse und Sessions"""
+
+    def __init__(self, check_seconds=2.0):
+        self.lock = threading.RLock()
+        self.built = False
+        self.check_seconds = check_seconds
+        self.version = None
+        self.checked_at = 0.0
+        self.rebuilds = 0
+        self.buckets = {}      # (resource, value, kind, day) -> IntervalBucket
+        self.courses = {}      # course_id -> Kursdaten
+        self.sessions = {}     # session_id -> Sessiondaten
+        self.course_sessions = {}  # course_id -> set(session_id)
+
+    # ---------- Aufbau & Pflege ----------
+
+    def build(self, courses, sessions):
+        """Index komplett neu aufbauen (Kurs- und Session-Snapshots als Dicts)"""
+        with self.lock:
+            self.buckets = {}
+            self.courses = {}
+            self.sessions = {}
+            self.course_sessions = {}
+            for course in courses:
+                self._put_course(course)
+            for session in sessions:
+                self._put_session(session)
+            self.built = True
+
+    def _fresh(self):
+        return self.built and clock.monotonic() - self.checked_at < self.check_seconds
+
+    def ensure_current(self, session):
+        """Beim ersten Zugriff und bei neuer Katalogversion aus der Datenbank (neu) aufbauen"""
+        if self._fresh():
+            return
+        from app.models import Course, CourseSession
+
+        with self.lock:
+            if self._fresh():
+                return
+            version = catalog_version(session)
+            if not self.built or version != self.version:
+                courses = [course_snapshot(course) for course in
+                           session.scalars(select(Course).where(Course.is_active == True))]
+                sessions = [session_snapshot(course_session) for course_session in
+                            session.scalars(select(CourseSession))]
+                self.build(courses, sessions)
+                self.version = version
+                self.rebuilds += 1
+            self.checked_at = clock.monotonic()
+
+    def apply(self, changes):
+        """Nach einem Commit geänderte/gelöschte Kurse und Sessions übernehmen"""
+        if not self.built:
+            return
+        with self.lock:
+            for kind, action, data in changes:
+                if kind == 'course':
+                    self._drop_course(data['id'])
+                    if action == 'upsert':
+                        self._put_course(data)
+                else:
+                    self._drop_session(data['id'])
+                    if action == 'upsert':
+                        self._put_session(data)
+
+    def _bucket(self, resource, value, kind, day):
+        key = (resource, value, kind, day)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = IntervalBucket()
+        return bucket
+
+    def _placements(self, entry_id):
+        """Alle (bucket-key, start) Positionen eines Eintrags"""
+        kind, item_id = entry_id
+        if kind == 'course':
+            course = self.courses[item_id]
+            if not course['is_active']:
+                return []
+            resources = {'room': course['room'], 'instructor': course['instructor']}
+            days = [(WEEKLY, course['day_of_week'])]
+            start = course['start']
+        else:
+            session = self.sessions[item_id]
+            course = self.courses.get(session['course_id'])
+            if session['is_cancelled'] or course is None or not course['is_active']:
+                return []
+            resources = {'room': session['room'] or course['room'], 'instructor': course['instructor']}
+            days = [(DATED, session['session_date']), (DATED_WEEKDAY, session['session_date'].weekday())]
+            start = session['start']
+
+        placements = []
+        for resource in RESOURCES:
+            value = _normalize(resources[resource])
+            if value:
+                for kind_key, day in days:
+                    placements.append(((resource, value, kind_key, day), start))
+        return placements
+
+    def _place(self, entry_id, end):
+        for key, start in self._placements(entry_id):
+            self._bucket(*key).add(start, end, entry_id)
+
+    def _unplace(self, entry_id):
+        for key, start in self._placements(entry_id):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.remove(start, entry_id)
+                if not len(bucket):
+                    del self.buckets[key]
+
+    def _put_course(self, course):
+        self.courses[course['id']] = course
+        self._place(('course', course['id']), course['end'])
+        # Sessions hängen an Dozent/Raum des Kurses, daher neu einsortieren
+        for session_id in self.course_sessions.get(course['id'], ()):
+            self._place(('session', session_id), self.sessions[session_id]['end'])
+
+    def _drop_course(self, course_id):
+        if course_id not in self.courses:
+            return
+        for session_id in self.course_sessions.get(course_id, ()):
+            self._unplace(('session', session_id))
+        self._unplace(('course', course_id))
+        del self.courses[course_id]
+
+    def _put_session(self, session):
+        self.sessions[session['id']] = session
+        self.course_sessions.setdefault(session['course_id'], set()).add(session['id'])
+        if session['course_id'] in self.courses:
+            self._place(('session', session['id']), session['end'])
+
+    def _drop_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            return
+        if session['course_id'] in self.courses:
+            self._unplace(('session', session_id))
+        self.course_sessions.get(session['course_id'], set()).discard(session_id)
+        del self.sessions[session_id]
+
+    # ---------- Abfragen ----------
+
+    def find_clashes(self, start_time, end_time, room=None, instructor=None, day_of_week=None,
+                     session_date=None, code=None, name=None, exclude_course_id=None):
+        """Belegungen, die mit einem geplanten Termin kollidieren
+
+        Entweder day_of_week (wöchentlicher Termin) oder session_date
+        (einzelner Termin) angeben. Termine desselben Angebots (Kurscode
+        bzw. Name) und des Kurses exclude_course_id werden ignoriert.
+        """
+        start, end = _minutes(start_time), _minutes(end_time)
+        offering = _offering_key(code, name) if (code or name) else None
+
+        if session_date is not None:
+            days = [(DATED, session_date), (WEEKLY, session_date.weekday())]
+        else:
+            days = [(WEEKLY, day_of_week), (DATED_WEEKDAY, day_of_week)]
+
+        clashes = []
+        seen = set()
+        with self.lock:
+            for resource, value in (('room', room), ('instructor', instructor)):
+                value = _normalize(value)
+                if not value:
+                    continue
+                for kind_key, day in days:
+                    bucket = self.buckets.get((resource, value, kind_key, day))
+                    if bucket is None:
+                        continue
+                    for entry_id in bucket.overlapping(start, end):
+                        entry = self._describe(entry_id)
+                        if entry['course_id'] == exclude_course_id:
+                            continue
+                        if offering and entry['offering'] == offering:
+                            continue
+                        if (resource, entry_id) in seen:
+                            continue
+                        seen.add((resource, entry_id))
+                        clashes.append({'resource': resource, 'value': value, 'booking': entry['public']})
+        return clashes
+
+    def report(self):
+        """Alle Konflikte des gesamten Katalogs in einem Durchlauf (Sweep-Line pro Bucket)"""
+        clashes = []
+        with self.lock:
+            for (resource, value, kind_key, day), bucket in self.buckets.items():
+                if kind_key == WEEKLY:
+                    entries = self._sorted_entries(bucket)
+                    clashes.extend(self._sweep(resource, value, entries, {'day_of_week': day}))
+                elif kind_key == DATED:
+                    # Datierte Sessions auch gegen die wöchentlichen Termine desselben Wochentags prüfen
+                    entries = self._sorted_entries(bucket)
+                    weekly = self.buckets.get((resource, value, WEEKLY, day.weekday()))
+                    if weekly is not None:
+                        entries = sorted(entries + self._sorted_entries(weekly))
+                    clashes.extend(self._sweep(resource, value, entries, {'session_date': day.isoformat()},
+                                               require_dated=True))
+        return clashes
+
+    def _sorted_entries(self, bucket):
+        return [(start, bucket.ends[entry_id], entry_id) for start, entry_id in bucket.keys]
+
+    def _sweep(self, resource, value, entries, where, require_dated=False):
+        found = []
+        active = []
+        for start, end, entry_id in entries:
+            active = [item for item in active if item[0] > start]
+            entry = self._describe(entry_id)
+            for other_end, other_id in active:
+                other = self._describe(other_id)
+                if other['offering'] == entry['offering']:
+                    continue
+                if require_dated and entry_id[0] != 'session' and other_id[0] != 'session':
+                    continue
+                found.append({
+                    'resource': resource,
+                    'value': value,
+                    **where,
+                    'bookings': [other['public'], entry['public']]
+                })
+            active.append((end, entry_id))
+        return found
+
+    def _describe(self, entry_id):
+        kind, item_id = entry_id
+        if kind == 'course':
+            course = self.courses[item_id]
+            public = {
+                'type': 'course',
+                'course_id': course['id'],
+                'course_name': course['name'],
+                'day_of_week': course['day_of_week'],
+                'start_time': course['start_time'],
+                'end_time': course['end_time']
+            }
+        else:
+            session = self.sessions[item_id]
+            course = self.courses[session['course_id']]
+            public = {
+                'type': 'session',
+                'session_id': session['id'],
+                'course_id': course['id'],
+                'course_name': course['name'],
+                'session_date': session['session_date'].isoformat(),
+                'start_time': session['start_time'],
+                'end_time': session['end_time']
+            }
+        return {'course_id': course['id'], 'offering': course['offering'], 'public': public}
+
+    def stats(self):
+        with self.lock:
+            return {
+                'built': self.built,
+                'version': dict(self.version or ()),
+                'rebuilds': self.rebuilds,
+                'courses': len(self.courses),
+                'sessions': len(self.sessions),
+                'buckets': len(self.buckets)
+            }
+
+
+def course_snapshot(course):
+    return {
+        'id': course.id,
+        'name': course.name,
+        'offering': _offering_key(course.code, course.name),
+        'room': course.room,
+        'instructor': course.instructor,
+        'is_active': bool(course.is_active) if course.is_active is not None else True,
+        'day_of_week': course.day_of_week,
+        'start': _minutes(course.start_time),
+        'end': _minutes(course.end_time),
+        'start_time': course.start_time.strftime('%H:%M'),
+        'end_time': course.end_time.strftime('%H:%M')
+    }
+
+
+def session_snapshot(session):
+    return {
+        'id': session.id,
+        'course_id': session.course_id,
+        'session_date': session.session_date,
+        'room': session.room,
+        'is_cancelled': bool(session.is_cancelled) or session.session_type == 'cancelled',
+        'start': _minutes(session.start_time),
+        'end': _minutes(session.end_time),
+        'start_time': session.start_time.strftime('%H:%M'),
+        'end_time': session.end_time.strftime('%H:%M')
+    }
+
+
+def register_occupancy_index(app):
+    """Ein Belegungsindex pro App (und damit pro Worker-Prozess)"""
+    app.extensions['occupancy_index'] = OccupancyIndex(app.config['OCCUPANCY_CHECK_SECONDS'])
+
+
+def current_occupancy_index(session):
+    """Index der laufenden App, vorher gegen die Katalogversion geprüft"""
+    index = current_app.extensions['occupancy_index']
+    index.ensure_current(session)
+    return index
+
+
+# =================== SESSION EVENTS ===================
+
+def _collect_changes(session, flush_context):
+    """Geänderte Kurse/Sessions beim Flush als Snapshot merken (nach Commit übernehmen)"""
+    from app.models import Course, CourseSession
+
+    pending = session.info.setdefault('occupancy_changes', [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Course) and obj.id is not None:
+            pending.append(('course', 'upsert', course_snapshot(obj)))
+        elif isinstance(obj, CourseSession) and obj.id is not None:
+            pending.append(('session', 'upsert', session_snapshot(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, Course):
+            pending.append(('course', 'delete', {'id': obj.id}))
+        elif isinstance(obj, CourseSession):
+            pending.append(('session', 'delete', {'id': obj.id}))
+
+
+def _apply_changes(session):
+    changes = session.info.pop('occupancy_changes', None)
+    if changes and has_app_context() and 'occupancy_index' in current_app.extensions:
+        current_app.extensions['occupancy_index'].apply(changes)
+
+
+def _discard_changes(session, previous_transaction):
+    session.info.pop('occupancy_changes', None)
+
+
+def register_occupancy_listeners():
+    """Index über Session-Events aktuell halten (einmal pro Prozess)"""
+    if not event.contains(Session, 'after_flush', _collect_changes):
+        event.listen(Session, 'after_flush', _collect_changes)
+        event.listen(Session, 'after_commit', _apply_changes)
+        event.listen(Session, 'after_soft_rollback', _discard_changes)
@@ -0,0 +1,167 @@
+"""
+Termin-Expansion: was passiert an welchem Datum?
+
+Wöchentliche Kurse werden über den Vorlesungszeitraum des Stundenplans
+(Semesterangabe, siehe ics_feed.semester_range) zu datierten Terminen
+expandiert. Datierte CourseSessions gehen vor: abgesagte Termine am Kurstag
+werden als 'cancelled' markiert, andere ersetzen den regulären Termin
+(Raum, Zeit, Art wie exam/makeup), Termine an anderen Tagen kommen hinzu.
+In vorlesungsfreien Zeiten (LECTURE_FREE_PERIODS) entfallen reguläre
+Termine, explizite Sessions bleiben bestehen.
+
+Pro Stundenplan wird einmal ein kompilierter Plan gebaut (zwei Abfragen)
+und pro (Stundenplan, Version) gecacht; Bereichsabfragen wie eine
+Monatsansicht laufen danach komplett im Speicher.
+"""
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from app.ics_feed import FeedCache, first_weekday_on_or_after, is_cancelled, semester_range
+
+RANGE_CACHE_SIZE = 16  # expandierte Bereiche pro Plan (z.B. die zuletzt angesehenen Monate)
+
+
+def parse_periods(value):
+    """'2024-12-23:2025-01-05,2025-02-10:2025-04-06' -> [(date, date), ...]"""
+    periods = []
+    for part in (value or '').split(','):
+        if part.strip():
+            start, end = part.split(':')
+            periods.append((date.fromisoformat(start.strip()), date.fromisoformat(end.strip())))
+    return sorted(periods)
+
+
+def periods_digest(periods):
+    """Kurzer Hash der vorlesungsfreien Zeiten für ETags und Cache-Schlüssel (Config-Änderung = neue Version)"""
+    text = ','.join(f'{start.isoformat()}:{end.isoformat()}' for start, end in periods)
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def _time(value):
+    return value.strftime('%H:%M')
+
+
+def _occurrence(course, day, start, end, room, kind, status, session=None):
+    return {
+        'date': day.isoformat(),
+        'start_time': _time(start),
+        'end_time': _time(end),
+        'course_id': course.id,
+        'session_id': session.id if session is not None else None,
+        'name': course.name,
+        'code': course.code,
+        'instructor': course.instructor,
+        'room': room,
+        'course_type': course.course_type,
+        'color': course.color,
+        'kind': kind,
+        'title': session.title if session is not None else None,
+        'status': status
+    }
+
+
+def session_occurrence(course, session):
+    status = 'cancelled' if is_cancelled(session) else 'scheduled'
+    kind = 'regular' if session.session_type == 'cancelled' else session.session_type
+    return _occurrence(course, session.session_date, session.start_time, session.end_time,
+                       session.room or course.room, kind, status, session)
+
+
+class TimetablePlan:
+    """Kompilierte Kurse und Sessions eines Stundenplans in einer Version"""
+
+    def __init__(self, version, timetable, courses, sessions, lecture_free):
+        self.version = version
+        self.period_start, self.period_end = semester_range(timetable, None)
+        self.lecture_free = lecture_free
+        self.courses = courses
+
+        # Sessions am Serientag im Zeitraum ersetzen den regulären Termin, alle anderen kommen hinzu
+        self.overrides = {}
+        extras = []
+        by_id = {course.id: course for course in courses}
+        for session in sessions:
+            course = by_id[session.course_id]
+            key = (course.id, session.session_date)
+            if self._on_series(course, session.session_date) and key not in self.overrides:
+                self.overrides[key] = session_occurrence(course, session)
+            else:
+                extras.append((session.session_date, session_occurrence(course, session)))
+        extras.sort(key=lambda item: item[0])
+        self.extra_dates = [day for day, _ in extras]
+        self.extras = [occurrence for _, occurrence in extras]
+
+        self._lock = threading.Lock()
+        self._ranges = OrderedDict()
+
+    def _on_series(self, course, day):
+        return (day.weekday() == course.day_of_week
+                and (self.period_start is None or day >= self.period_start)
+                and (self.period_end is None or day <= self.period_end))
+
+    def is_lecture_free(self, day):
+        index = bisect_right(self.lecture_free, (day, date.max)) - 1
+        return index >= 0 and self.lecture_free[index][0] <= day <= self.lecture_free[index][1]
+
+    def expand(self, start, end):
+        """Alle Termine in [start, end], sortiert nach Datum, Uhrzeit, Name (gecacht pro Bereich)"""
+        with self._lock:
+            cached = self._ranges.get((start, end))
+            if cached is not None:
+                self._ranges.move_to_end((start, end))
+                return cached
+
+        first_day = max(start, self.period_start) if self.period_start else start
+        last_day = min(end, self.period_end) if self.period_end else end
+        occurrences = []
+        for course in self.courses:
+            day = first_weekday_on_or_after(first_day, course.day_of_week)
+            while day <= last_day:
+                override = self.overrides.get((course.id, day))
+                if override is not None:
+                    occurrences.append(override)
+                elif not self.is_lecture_free(day):
+                    occurrences.append(_occurrence(course, day, course.start_time, course.end_time,
+                                                   course.room, 'regular', 'scheduled'))
+                day += timedelta(days=7)
+
+        occurrences += self.extras[bisect_left(self.extra_dates, start):bisect_right(self.extra_dates, end)]
+        occurrences.sort(key=lambda item: (item['date'], item['start_time'], item['name']))
+
+        with self._lock:
+            self._ranges[(start, end)] = occurrences
+            while len(self._ranges) > RANGE_CACHE_SIZE:
+                self._ranges.popitem(last=False)
+        return occurrences
+
+
+def build_plan(version, timetable, lecture_free):
+    """Kurse und Sessions als Spaltenzeilen laden (keine ORM-Objekte im prozessweiten Cache)"""
+    from sqlalchemy import select
+    from app import db
+    from app.models import Course, CourseSession
+    courses = db.session.execute(
+        select(Course.id, Course.name, Course.code, Course.instructor, Course.room, Course.course_type,
+               Course.color, Course.day_of_week, Course.start_time, Course.end_time)
+        .where(Course.timetable_id == timetable.id, Course.is_active == True)
+        .order_by(Course.day_of_week, Course.start_time)
+    ).all()
+    sessions = []
+    if courses:
+        sessions = db.session.execute(
+            select(CourseSession.id, CourseSession.course_id, CourseSession.session_date, CourseSession.start_time,
+                   CourseSession.end_time, CourseSession.room, CourseSession.session_type, CourseSession.title,
+                   CourseSession.is_cancelled)
+            .where(CourseSession.course_id.in_([course.id for course in courses]))
+            .order_by(CourseSession.session_date, CourseSession.start_time, CourseSession.id)
+        ).all()
+    return TimetablePlan(version, timetable, courses, sessions, lecture_free)
+
+
+def register_occurrence_cache(app):
+    """Kompilierte Pläne pro Worker, Schlüssel (Stundenplan, Version inkl. vorlesungsfreier Zeiten)"""
+    app.extensions['occurrence_cache'] = FeedCache(app.config['OCCURRENCE_CACHE_SIZE'])
+    app.extensions['lecture_free_periods'] = parse_periods(app.config['LECTURE_FREE_PERIODS'])
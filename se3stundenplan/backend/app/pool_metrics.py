@@ -0,0 +1,267 @@
+"""
+Connection-Pool Instrumentierung und Pool-Größenberechnung
+
+Misst pro Worker-Prozess, wie lange Anfragen auf eine Verbindung warten,
+wie lange Verbindungen ausgeliehen bleiben, Overflow und Timeouts, sowie
+die reine Query-Zeit. Verbringt eine Anfrage mehr Zeit mit Warten auf den
+Pool als mit Queries, wird eine Warnung geloggt.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """Thread-sichere Zähler für einen Worker-Prozess"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.held_total = 0.0
+            self.held_max = 0.0
+            self.returns = 0
+            self.timeouts = 0
+            self.overflow_checkouts = 0
+            self.overflow_peak = 0
+            self.queries = 0
+            self.query_total = 0.0
+            self.requests = 0
+            self.wait_bound_requests = 0
+
+    def record_checkout(self, wait, overflow):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.overflow_peak = max(self.overflow_peak, overflow)
+
+    def record_timeout(self, wait):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def record_return(self, held):
+        with self._lock:
+            self.returns += 1
+            self.held_total += held
+            self.held_max = max(self.held_max, held)
+
+    def record_query(self, duration):
+        with self._lock:
+            self.queries += 1
+            self.query_total += duration
+
+    def record_request(self, wait_bound):
+        with self._lock:
+            self.requests += 1
+            if wait_bound:
+                self.wait_bound_requests += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'checkouts': self.checkouts,
+                'checkout_wait_ms': {
+                    'avg': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                    'max': round(self.wait_max * 1000, 3),
+                    'total': round(self.wait_total * 1000, 3),
+                },
+                'checked_out_ms': {
+                    'avg': round(self.held_total / self.returns * 1000, 3) if self.returns else 0.0,
+                    'max': round(self.held_max * 1000, 3),
+                },
+                'timeouts': self.timeouts,
+                'overflow_checkouts': self.overflow_checkouts,
+                'overflow_peak': self.overflow_peak,
+                'queries': self.queries,
+                'query_ms_total': round(self.query_total * 1000, 3),
+                'requests': self.requests,
+                'wait_bound_requests': self.wait_bound_requests,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+# Warte- und Query-Zeit der laufenden Anfrage (pro Thread)
+_request_timing = threading.local()
+
+
+def _add_request_time(attr, duration):
+    if getattr(_request_timing, 'active', False):
+        setattr(_request_timing, attr, getattr(_request_timing, attr) + duration)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, der Wartezeit, Ausleihdauer, Overflow und Timeouts misst"""
+
+    def _do_get(self):
+        # QueuePool._do_get ruft sich bei Overflow-Rennen selbst auf; nur die äußerste Ebene messen
+        if getattr(_request_timing, 'in_checkout', False):
+            return super()._do_get()
+
+        _request_timing.in_checkout = True
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            waited = time.perf_counter() - started
+            pool_metrics.record_timeout(waited)
+            _add_request_time('wait', waited)
+            raise
+        finally:
+            _request_timing.in_checkout = False
+
+        waited = time.perf_counter() - started
+        pool_metrics.record_checkout(waited, self.overflow())
+        _add_request_time('wait', waited)
+        record.info['checked_out_at'] = time.perf_counter()
+        return record
+
+    def _do_return_conn(self, record):
+        checked_out_at = record.info.pop('checked_out_at', None)
+        if checked_out_at is not None:
+            pool_metrics.record_return(time.perf_counter() - checked_out_at)
+        super()._do_return_conn(record)
+
+    def stats(self):
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': max(self.overflow(), 0),
+            'max_overflow': self._max_overflow,
+            'timeout': self._timeout,
+        }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started_at')
+    if started:
+        duration = time.perf_counter() - started.pop()
+        pool_metrics.record_query(duration)
+        _add_request_time('query', duration)
+
+
+def compute_pool_settings(workers, threads, max_connections, reserved=10):
+    """
+    Pool-Größe aus Worker-/Threadzahl und max_connections der Datenbank ableiten.
+
+    Jeder Thread braucht höchstens eine Verbindung gleichzeitig; die Summe
+    aller Worker darf max_connections abzüglich reservierter Verbindungen
+    (Admin-Tools, Migrationen, Async-Pfad) nicht überschreiten.
+    """
+    workers = max(1, int(workers))
+    threads = max(1, int(threads))
+    budget = max(workers, int(max_connections) - int(reserved))
+    per_worker = max(1, budget // workers)
+
+    pool_size = min(threads, per_worker)
+    max_overflow = max(0, min(per_worker, threads * 2) - pool_size)
+    return {'pool_size': pool_size, 'max_overflow': max_overflow}
+
+
+def probe_max_connections(database_uri):
+    """max_connections der Datenbank abfragen (nur MySQL), sonst None"""
+    url = make_url(database_uri)
+    if url.get_backend_name() != 'mysql':
+        return None
+
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+
+    engine = create_engine(url, poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text("SHOW VARIABLES LIKE 'max_connections'")).first()
+            return int(row[1]) if row else None
+    except Exception:
+        return None
+    finally:
+        engine.dispose()
+
+
+def configure_pool(app):
+    """Engine-Optionen vor db.init_app() um Instrumentierung und Auto-Sizing ergänzen"""
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-Memory-SQLite nutzt einen eigenen Pool
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        return options
+
+    options.setdefault('poolclass', InstrumentedQueuePool)
+
+    if app.config.get('POOL_SIZING') == 'auto':
+        max_connections = app.config.get('DB_MAX_CONNECTIONS') or probe_max_connections(uri) or 151
+        sizing = compute_pool_settings(
+            app.config['WEB_WORKERS'],
+            app.config['WEB_THREADS'],
+            max_connections,
+            app.config.get('DB_RESERVED_CONNECTIONS', 10)
+        )
+        options.update(sizing)
+        app.logger.info(f"Pool Auto-Sizing: {sizing} (max_connections={max_connections})")
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    return options
+
+
+def register_pool_metrics(app):
+    """Query-Timing und Warnung bei Pool-gebundenen Anfragen registrieren"""
+    from flask import request
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    threshold = app.config.get('POOL_WAIT_WARN_MS', 50) / 1000
+
+    @app.before_request
+    def start_request_timing():
+        _request_timing.active = True
+        _request_timing.wait = 0.0
+        _request_timing.query = 0.0
+
+    @app.teardown_request
+    def finish_request_timing(error=None):
+        if not getattr(_request_timing, 'active', False):
+            return
+        _request_timing.active = False
+        wait, query = _request_timing.wait, _request_timing.query
+        wait_bound = wait > threshold and wait > query
+        pool_metrics.record_request(wait_bound)
+        if wait_bound:
+            app.logger.warning(
+                f'Pool-Engpass: {request.method} {request.path} wartete {wait * 1000:.1f}ms '
+                f'auf eine Verbindung, Queries liefen nur {query * 1000:.1f}ms'
+            )
+
+
+def pool_status(engine):
+    """Aktuelle Pool-Belegung und gesammelte Metriken dieses Workers"""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        state = pool.stats()
+    else:
+        state = {'status': pool.status()}
+    state['class'] = type(pool).__name__
+    return {'pool': state, 'metrics': pool_metrics.snapshot()}
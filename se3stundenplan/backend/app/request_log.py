@@ -0,0 +1,145 @@
+"""
+Request-Logging ohne Wartezeit im Request-Thread
+
+after_request legt pro Anfrage nur ein kleines Dict in eine begrenzte Queue
+(put_nowait). Ein Hintergrund-Thread pro Worker sammelt die Einträge und
+schreibt sie gebündelt als JSON-Zeilen (ein write() pro Batch) nach stdout.
+
+- Fehler (Status >= 400) und langsame Anfragen werden immer protokolliert,
+  erfolgreiche nur mit REQUEST_LOG_SAMPLE_RATE.
+- Ist die Queue voll, wird verworfen statt blockiert; die Anzahl landet als
+  eigener Eintrag im Log.
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time as clock
+
+
+class RequestLog:
+    """Begrenzte Queue plus Writer-Thread (startet beim ersten Eintrag, auch nach fork)"""
+
+    def __init__(self, stream=None, sample_rate=1.0, slow_ms=500.0, queue_size=10000,
+                 batch_size=200, flush_seconds=1.0):
+        self.stream = stream or sys.stdout
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.dropped = 0         # seit Start verworfen (Statistik)
+        self._unreported = 0     # verworfen, aber noch nicht als Log-Eintrag geschrieben
+        self.sampled_out = 0
+        self.written = 0
+
+    def wanted(self, status, duration_ms):
+        return status >= 400 or duration_ms >= self.slow_ms or random.random() < self.sample_rate
+
+    def record(self, entry):
+        """Eintrag übernehmen, ohne zu blockieren; False, wenn gesampelt oder verworfen"""
+        if not self.wanted(entry['status'], entry['duration_ms']):
+            with self._lock:
+                self.sampled_out += 1
+            return False
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+            return False
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='request-log', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        """Bis zu batch_size Einträge, höchstens flush_seconds nach dem ersten warten"""
+        batch = [self.queue.get()]
+        deadline = clock.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - clock.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            self.write(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def write(self, batch):
+        with self._lock:
+            dropped, self._unreported = self._unreported, 0
+        lines = [json.dumps(entry, separators=(',', ':'), default=str) for entry in batch]
+        if dropped:
+            lines.append(json.dumps({'event': 'request_log_dropped', 'count': dropped}))
+        if not lines:
+            return
+        try:
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+        except Exception:
+            with self._lock:
+                self._unreported += dropped  # im nächsten Batch erneut melden
+            return  # Logging darf Anfragen nie stören
+        with self._lock:
+            self.written += len(lines)
+
+    def flush(self, timeout=2.0):
+        """Warten, bis die Queue abgearbeitet ist (Tests, Shutdown)"""
+        if self._thread is None or self._pid != os.getpid():
+            batch = []
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                self.queue.task_done()
+            self.write(batch)
+            return
+        deadline = clock.monotonic() + timeout
+        while self.queue.unfinished_tasks and clock.monotonic() < deadline:
+            clock.sleep(0.01)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'queued': self.queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+                'sampled_out': self.sampled_out,
+                'sample_rate': self.sample_rate,
+            }
+
+
+def register_request_log(app):
+    """Eine Queue pro App; beim Beenden wird der Rest noch geschrieben"""
+    config = app.config
+    log = RequestLog(
+        sample_rate=config['REQUEST_LOG_SAMPLE_RATE'],
+        slow_ms=config['REQUEST_LOG_SLOW_MS'],
+        queue_size=config['REQUEST_LOG_QUEUE_SIZE'],
+        batch_size=config['REQUEST_LOG_BATCH_SIZE'],
+        flush_seconds=config['REQUEST_LOG_FLUSH_SECONDS'],
+    )
+    app.extensions['request_log'] = log
+    atexit.register(log.flush)
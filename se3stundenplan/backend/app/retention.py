@@ -0,0 +1,275 @@
+"""
+Aufbewahrung von Benachrichtigungen
+
+Jeder generate_*-Aufruf legt neue Zeilen an, gesendete und gelesene wurden
+bisher nie entfernt. Die Aufbewahrungsfrist gilt pro notification_type
+(NOTIFICATION_RETENTION, z.B. 'reminder:30,info:90,default:90'); gelöscht
+werden nur gesendete oder gelesene Benachrichtigungen, deren notify_time
+älter als die Frist ist.
+
+purge_notifications läuft als Keyset-Walk über (notify_time, id): jeder
+Block liest höchstens batch_size Zeilen, löscht die fälligen per ID und
+committet sofort. Keine Transaktion hält Sperren länger als einen Block,
+und es gibt kein OFFSET, das mit der Tabelle teurer wird. Tombstones für
+den Delta-Sync schreibt das Änderungsprotokoll (Bulk-DELETE-Hook). Optional
+werden die Zeilen vorher als gzip-JSONL archiviert.
+
+Auf MySQL kann die Tabelle zusätzlich monatsweise nach notify_time
+partitioniert werden (NOTIFICATION_PARTITIONING). Partitionen, die
+vollständig älter als die längste Frist sind, werden dann per DROP
+PARTITION sofort entfernt, unabhängig von gesendet/gelesen. Vorher werden
+ihre Zeilen archiviert und als Tombstones protokolliert.
+
+Im selben Lauf kürzt purge_change_log das Sync-Änderungsprotokoll
+(CHANGE_LOG_RETENTION_DAYS), ebenfalls blockweise mit commit pro Block.
+"""
+import gzip
+import json
+import os
+import time as clock
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, delete, or_, select, text
+
+DEFAULT_TYPE = 'default'
+
+PARTITIONS_QUERY = text(
+    'SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS '
+    'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL '
+    'ORDER BY PARTITION_ORDINAL_POSITION'
+)
+FOREIGN_KEYS_QUERY = text(
+    'SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS '
+    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+)
+
+
+def parse_retention(value):
+    """'reminder:30,info:90,default:90' -> {'reminder': 30, 'info': 90, 'default': 90}"""
+    policy = {}
+    for part in (value or '').split(','):
+        if part.strip():
+            kind, days = part.split(':')
+            policy[kind.strip()] = int(days)
+    return policy
+
+
+def cutoffs(policy, now):
+    """Frist pro Typ als Zeitpunkt; Typen ohne Eintrag und ohne 'default' werden nie gelöscht"""
+    return {kind: now - timedelta(days=days) for kind, days in policy.items()}
+
+
+# =================== ARCHIV ===================
+
+class NotificationArchive:
+    """gzip-komprimierte JSON-Zeilen, eine Datei pro Lauf (erst beim ersten Block angelegt)"""
+
+    def __init__(self, directory, started=None):
+        self.directory = directory
+        self.path = os.path.join(directory, f"notifications-{(started or datetime.utcnow()):%Y%m%dT%H%M%S}.jsonl.gz")
+        self._file = None
+        self.rows = 0
+
+    def write(self, rows):
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = gzip.open(self.path, 'at', encoding='utf-8')
+        for row in rows:
+            self._file.write(json.dumps(dict(row._mapping), separators=(',', ':'), default=str) + '\n')
+        self._file.flush()  # vor dem Löschen auf der Platte
+        self.rows += len(rows)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# =================== PURGE ===================
+
+def _keyset_batches(session, table, horizon, batch_size):
+    """Blöcke von Zeilen mit notify_time < horizon, sortiert nach (notify_time, id)"""
+    last = None
+    while True:
+        statement = select(table).where(table.c.notify_time < horizon)
+        if last is not None:
+            statement = statement.where(or_(
+                table.c.notify_time > last[0],
+                and_(table.c.notify_time == last[0], table.c.id > last[1])
+            ))
+        rows = session.execute(
+            statement.order_by(table.c.notify_time, table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        last = (rows[-1].notify_time, rows[-1].id)
+        yield rows
+
+
+def purge_notifications(session, policy, now=None, batch_size=500, archive=None, pause_seconds=0.0,
+                        max_batches=None, dry_run=False):
+    """
+    Fällige Benachrichtigungen blockweise löschen (commit pro Block).
+
+    Liefert {'scanned', 'deleted', 'batches'}. dry_run zählt nur.
+    pause_seconds zwischen Blöcken gibt Replikation und anderen Schreibern Luft.
+    """
+    from app.models import Notification
+
+    now = now or datetime.now()
+    limits = cutoffs(policy, now)
+    if not limits:
+        return {'scanned': 0, 'deleted': 0, 'batches': 0}
+    horizon = max(limits.values())  # jüngste Frist: davor liegen alle Kandidaten
+    default = limits.get(DEFAULT_TYPE)
+
+    stats = {'scanned': 0, 'deleted': 0, 'batches': 0}
+    for rows in _keyset_batches(session, Notification.__table__, horizon, batch_size):
+        due = [
+            row for row in rows
+            if (row.is_sent or row.is_read)
+            and row.notify_time < limits.get(row.notification_type, default or datetime.min)
+        ]
+        stats['scanned'] += len(rows)
+        stats['batches'] += 1
+        if due and not dry_run:
+            if archive is not None:
+                archive.write(due)
+            session.execute(
+                delete(Notification).where(Notification.id.in_([row.id for row in due]))
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        stats['deleted'] += len(due)
+        if max_batches is not None and stats['batches'] >= max_batches:
+            break
+        if pause_seconds:
+            clock.sleep(pause_seconds)
+    return stats
+
+
+def purge_change_log(session, retention_days, now=None, batch_size=500, pause_seconds=0.0, max_batches=None):
+    """Änderungsprotokoll blockweise kürzen, liefert {'deleted', 'batches'}"""
+    from app.change_log import prune_change_log
+
+    stats = {'deleted': 0, 'batches': 0}
+    while True:
+        deleted = prune_change_log(session, retention_days, now=now, limit=batch_size)
+        session.commit()
+        stats['deleted'] += deleted
+        if not deleted:
+            return stats
+        stats['batches'] += 1
+        if deleted < batch_size or (max_batches is not None and stats['batches'] >= max_batches):
+            return stats
+        if pause_seconds:
+            clock.sleep(pause_seconds)
+
+
+# =================== PARTITIONEN (MySQL) ===================
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'p{month:%Y%m}'
+
+
+def partition_definitions(first_month, last_month):
+    """Monatspartitionen [first_month, last_month] plus pmax als Auffangpartition"""
+    definitions = []
+    month = month_start(first_month)
+    while month <= last_month:
+        definitions.append(f"PARTITION {partition_name(month)} VALUES LESS THAN ('{next_month(month).isoformat()}')")
+        month = next_month(month)
+    definitions.append('PARTITION pmax VALUES LESS THAN (MAXVALUE)')
+    return definitions
+
+
+def partition_table_statements(foreign_keys, first_month, last_month, table='notifications'):
+    """
+    Einmalige Umstellung auf RANGE COLUMNS(notify_time).
+
+    MySQL verlangt notify_time im Primärschlüssel und erlaubt auf
+    partitionierten Tabellen keine Fremdschlüssel; die Referenzen auf
+    users/courses prüft danach nur noch die Anwendung.
+    """
+    statements = [f'ALTER TABLE {table} DROP FOREIGN KEY {name}' for name in foreign_keys]
+    statements.append(f'ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, notify_time)')
+    statements.append(f'ALTER TABLE {table} PARTITION BY RANGE COLUMNS(notify_time) (\n    '
+                      + ',\n    '.join(partition_definitions(first_month, last_month)) + '\n)')
+    return statements
+
+
+def current_partitions(session, table='notifications'):
+    """[(Name, obere Grenze als date oder None für MAXVALUE)]; leer, wenn nicht partitioniert"""
+    partitions = []
+    for name, description in session.execute(PARTITIONS_QUERY, {'table': table}).all():
+        bound = None if description == 'MAXVALUE' else date.fromisoformat(description.strip("'")[:10])
+        partitions.append((name, bound))
+    return partitions
+
+
+def partition_table(session, today, months_ahead, table='notifications'):
+    """Tabelle partitionieren (ab dem ältesten vorhandenen Monat); nichts tun, wenn schon partitioniert"""
+    if current_partitions(session, table):
+        return []
+    oldest = session.execute(text(f'SELECT MIN(notify_time) FROM {table}')).scalar()
+    first = month_start(oldest.date() if oldest else today)
+    last = month_start(today)
+    for _ in range(months_ahead):
+        last = next_month(last)
+    foreign_keys = session.execute(FOREIGN_KEYS_QUERY, {'table': table}).scalars().all()
+    statements = partition_table_statements(foreign_keys, first, last, table)
+    for statement in statements:
+        session.execute(text(statement))
+    return statements
+
+
+def ensure_partitions(session, today, months_ahead, table='notifications'):
+    """Monatspartitionen bis months_ahead im Voraus aus pmax herauslösen (REORGANIZE, pmax ist leer)"""
+    partitions = current_partitions(session, table)
+    bounds = [bound for _, bound in partitions if bound is not None]
+    if not partitions or not bounds:
+        return []
+    last = month_start(today)
+    for _ in range(months_ahead):
+        last = next_month(last)
+    first = max(bounds)  # erste noch fehlende Monatspartition beginnt an der höchsten Grenze
+    if first > last:
+        return []
+    statement = (f'ALTER TABLE {table} REORGANIZE PARTITION pmax INTO (\n    '
+                 + ',\n    '.join(partition_definitions(first, last)) + '\n)')
+    session.execute(text(statement))
+    return [statement]
+
+
+def drop_expired_partitions(session, policy, now=None, batch_size=500, archive=None, table='notifications'):
+    """Partitionen vollständig älter als die längste Frist archivieren, protokollieren und droppen"""
+    from app.models import Notification
+    from app.change_log import DELETE, record_bulk_changes
+
+    now = now or datetime.now()
+    if not policy:
+        return []
+    horizon = (now - timedelta(days=max(policy.values()))).date()
+    notifications = Notification.__table__
+    dropped = []
+    for name, bound in current_partitions(session, table):
+        if bound is None or bound > horizon:
+            continue
+        # Ältere Partitionen sind bereits weg: alles unter der Grenze liegt in dieser
+        for rows in _keyset_batches(session, notifications, datetime.combine(bound, datetime.min.time()),
+                                    batch_size):
+            if archive is not None:
+                archive.write(rows)
+            record_bulk_changes(session, Notification, Notification.id.in_([row.id for row in rows]), op=DELETE)
+            session.commit()
+        session.execute(text(f'ALTER TABLE {table} DROP PARTITION {name}'))
+        dropped.append(name)
+    return dropped
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import (
     create_access_token, jwt_required, get_jwt_identity,
     create_refresh_token
@@ -197,6 +197,8 @@ def update_profile():
             user.theme_preference = data['theme_preference']
         
         db.session.commit()
+        # Benutzer stehen nicht im Änderungsprotokoll: Dashboard & Co. direkt invalidieren
+        current_app.extensions['cache'].invalidate(f'user:{user.id}')
         
         return jsonify({
             'message': 'Profil erfolgreich aktualisiert',
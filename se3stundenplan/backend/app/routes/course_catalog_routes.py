@@ -1,12 +1,46 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from app import db
 from app.models import User, Timetable, Course, CourseSession, EnrolledCourse
-from datetime import time
+from app.timetable_solver import build_components, blocked_mask, solve
+from app.occupancy import current_occupancy_index
+from app.json_stream import stream_json_list
+from app.single_flight import query_signature
+from app.cache import cached_json
+from app.bulk_enrollment import bulk_enroll
+from app.admission import capacity_error, seat_counts
+from datetime import time, date
 import json
 
 course_catalog_bp = Blueprint('course_catalog', __name__)
 
+def attach_sessions(courses):
+    """Sessions eines Kurs-Blocks mit einer IN-Abfrage laden"""
+    sessions = {course.id: [] for course in courses}
+    for course_session in CourseSession.query.filter(CourseSession.course_id.in_(sessions.keys())) \
+            .order_by(CourseSession.session_date):
+        sessions[course_session.course_id].append(course_session)
+    for course in courses:
+        set_committed_value(course, 'course_sessions', sessions[course.id])
+    return courses
+
+def iter_courses_matching(statement, batch_size):
+    """Treffer-IDs vorab lesen, dann Kurse (inkl. Sessions) blockweise per IN laden"""
+    # Kein Server-Side-Cursor: PyMySQL (SSCursor) verwirft den Rest eines offenen Ergebnisses,
+    # sobald auf derselben Verbindung die Sessions abgefragt werden
+    course_ids = db.session.scalars(statement.with_only_columns(Course.id)).all()
+    return iter_courses_by_ids(course_ids, batch_size)
+
+def iter_courses_by_ids(course_ids, batch_size):
+    """Kurse (inkl. Sessions) in der Reihenfolge von course_ids blockweise laden"""
+    for offset in range(0, len(course_ids), batch_size):
+        block = course_ids[offset:offset + batch_size]
+        found = {course.id: course for course in
+                 Course.query.filter(Course.id.in_(block), Course.is_active == True).all()}
+        yield from attach_sessions([found[course_id] for course_id in block if course_id in found])
+
 # =================== COURSE CATALOG ===================
 
 @course_catalog_bp.route('/courses', methods=['GET'])
@@ -42,12 +76,12 @@ def get_course_catalog():
                 )
             )
         
-        courses = query.order_by(Course.name).all()
+        # Kurse (inkl. Sessions) blockweise laden und direkt gestreamt kodieren
+        courses = iter_courses_matching(
+            query.order_by(Course.name, Course.id).statement, current_app.config['JSON_STREAM_YIELD_PER']
+        )
         
-        return jsonify({
-            'courses': [course.to_dict(include_sessions=True) for course in courses],
-            'count': len(courses)
-        }), 200
+        return stream_json_list('courses', courses, lambda course: course.to_dict(include_sessions=True))
         
     except Exception as e:
         return jsonify({'error': f'Kurskatalog konnte nicht geladen werden: {str(e)}'}), 500
@@ -57,18 +91,31 @@ def get_course_catalog():
 def get_course_details(course_id):
     """Detailierte Kursinformationen mit allen Terminen"""
     try:
-        course = Course.query.filter_by(id=course_id, is_active=True).first()
-        
-        if not course:
-            return jsonify({'error': 'Kurs nicht gefunden'}), 404
-        
-        return jsonify({
-            'course': course.to_dict(include_sessions=True)
-        }), 200
+        return cached_json(query_signature('course_catalog.details', id=course_id),
+                           lambda: build_course_details(course_id), tags=(f'course:{course_id}',),
+                           finish=finish_course_details)
         
     except Exception as e:
         return jsonify({'error': f'Kursdetails konnten nicht geladen werden: {str(e)}'}), 500
 
+def build_course_details(course_id):
+    """Kurs inkl. Terminen laden (läuft pro Kurs nur einmal gleichzeitig)"""
+    course = Course.query.filter_by(id=course_id, is_active=True).first()
+    
+    if not course:
+        return {'error': 'Kurs nicht gefunden'}, 404
+    
+    return {
+        'course': course.to_dict(include_sessions=True)
+    }, 200
+
+def finish_course_details(payload):
+    """Platzzahlen pro Anfrage nachtragen (Einschreibungen invalidieren den Detail-Cache nicht)"""
+    course = payload['course']
+    course['capacity'], course['enrolled_count'] = seat_counts(db.session, [course['id']]).get(
+        course['id'], (course['capacity'], course['enrolled_count']))
+    return payload
+
 @course_catalog_bp.route('/courses/search', methods=['POST'])
 @jwt_required()
 def search_courses():
@@ -76,47 +123,34 @@ def search_courses():
     try:
         data = request.get_json()
         
-        query = Course.query.filter_by(is_active=True)
+        # Filter als Masken über den Katalog-Snapshot, nur Treffer aus der DB laden
+        unsupported = [name for name in ('degree_programs', 'semester_levels') if data.get(name)]
+        if unsupported:
+            return jsonify({'error': f"Filter nicht unterstützt: {', '.join(unsupported)}"}), 400
+        
+        snapshot = current_app.extensions['catalog_snapshot'].get(db.session)
+        mask = snapshot.all()
         
         # Text search
         if data.get('search'):
-            search_term = f"%{data['search']}%"
-            query = query.filter(
-                db.or_(
-                    Course.name.like(search_term),
-                    Course.code.like(search_term),
-                    Course.instructor.like(search_term),
-                    Course.description.like(search_term)
-                )
-            )
+            mask &= snapshot.text_contains(data['search'])
         
         # Multiple filters
-        if data.get('degree_programs'):
-            query = query.filter(Course.degree_program.in_(data['degree_programs']))
-        
-        if data.get('semester_levels'):
-            query = query.filter(Course.semester_level.in_(data['semester_levels']))
-        
         if data.get('course_types'):
-            query = query.filter(Course.course_type.in_(data['course_types']))
+            mask &= snapshot.type_in(data['course_types'])
         
         if data.get('instructors'):
-            query = query.filter(Course.instructor.in_(data['instructors']))
+            mask &= snapshot.instructor_in(data['instructors'])
         
         # Time filters
         if data.get('day_of_week') is not None:
             # Find courses that have sessions on specific days
-            subquery = CourseSession.query.filter(
-                CourseSession.day_of_week.in_(data['day_of_week'])
-            ).subquery()
-            query = query.join(subquery, Course.id == subquery.c.course_id)
+            mask &= snapshot.session_day_in(data['day_of_week'])
         
-        courses = query.order_by(Course.name).all()
+        # Treffer (nach Name sortiert) blockweise laden und direkt gestreamt kodieren
+        courses = iter_courses_by_ids(snapshot.ids_where(mask), current_app.config['JSON_STREAM_YIELD_PER'])
         
-        return jsonify({
-            'courses': [course.to_dict(include_sessions=True) for course in courses],
-            'count': len(courses)
-        }), 200
+        return stream_json_list('courses', courses, lambda course: course.to_dict(include_sessions=True))
         
     except Exception as e:
         return jsonify({'error': f'Suche fehlgeschlagen: {str(e)}'}), 500
@@ -398,6 +432,97 @@ def check_time_conflicts(timetable_id, new_sessions, exclude_enrollment_id=None)
     
     return conflicts
 
+def find_occupancy_clashes(session_data, code=None, name=None, instructor=None, exclude_course_id=None):
+    """Raum- und Dozentenkonflikte eines geplanten Termins im gesamten Katalog"""
+    session_date = session_data.get('session_date')
+    return current_occupancy_index(db.session).find_clashes(
+        time.fromisoformat(session_data['start_time']),
+        time.fromisoformat(session_data['end_time']),
+        room=session_data.get('room'),
+        instructor=instructor,
+        day_of_week=session_data.get('day_of_week'),
+        session_date=date.fromisoformat(session_date) if session_date else None,
+        code=code,
+        name=name,
+        exclude_course_id=exclude_course_id
+    )
+
+# =================== TIMETABLE GENERATOR ===================
+
+@course_catalog_bp.route('/solve', methods=['POST'])
+@jwt_required()
+def solve_timetable():
+    """Konfliktfreie Stundenpläne aus den gewünschten Kursen generieren"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+
+        if not data or not data.get('course_ids'):
+            return jsonify({'error': 'course_ids ist erforderlich'}), 400
+
+        course_ids = list(dict.fromkeys(data['course_ids']))
+        config = current_app.config
+        top_k = min(int(data.get('top_k', 5)), config['SOLVER_MAX_RESULTS'])
+        time_budget = min(float(data.get('time_budget', config['SOLVER_TIME_BUDGET'])), config['SOLVER_TIME_BUDGET'])
+
+        courses = Course.query.options(selectinload(Course.course_sessions)).filter(
+            Course.id.in_(course_ids),
+            Course.is_active == True
+        ).all()
+
+        found_ids = {course.id for course in courses}
+        missing = [course_id for course_id in course_ids if course_id not in found_ids]
+        if missing:
+            return jsonify({'error': 'Kurs nicht gefunden', 'course_ids': missing}), 404
+
+        # Bereits belegte Zeiten aus dem eigenen Stundenplan blockieren
+        used = 0
+        if data.get('timetable_id'):
+            timetable = Timetable.query.filter_by(
+                id=data['timetable_id'],
+                user_id=current_user_id
+            ).first()
+
+            if not timetable:
+                return jsonify({'error': 'Stundenplan nicht gefunden'}), 404
+
+            existing_courses = Course.query.filter(
+                Course.timetable_id == timetable.id,
+                Course.is_active == True,
+                Course.id.notin_(course_ids)
+            ).all()
+            used = blocked_mask(existing_courses)
+
+        components = []
+        for course in courses:
+            components.extend(build_components(course))
+
+        result = solve(
+            components,
+            used=used,
+            preferences=data.get('preferences'),
+            top_k=top_k,
+            time_budget=time_budget,
+            parallel_threshold=config['SOLVER_PARALLEL_THRESHOLD'],
+            max_workers=config['SOLVER_MAX_WORKERS']
+        )
+
+        if result['unsatisfiable']:
+            return jsonify({
+                'error': 'Kein konfliktfreier Termin verfügbar',
+                'unsatisfiable': result['unsatisfiable']
+            }), 409
+
+        return jsonify({
+            'schedules': result['schedules'],
+            'count': len(result['schedules']),
+            'explored': result['explored'],
+            'complete': result['complete']
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Stundenplan konnte nicht generiert werden: {str(e)}'}), 500
+
 # =================== COURSE MANAGEMENT (Admin) ===================
 
 @course_catalog_bp.route('/admin/courses', methods=['POST'])
@@ -419,6 +544,26 @@ def create_course():
         if Course.query.filter_by(code=data['code']).first():
             return jsonify({'error': 'Kurscode bereits vergeben'}), 400
         
+        error = capacity_error(data.get('capacity'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Raum- und Dozentenkonflikte im gesamten Katalog prüfen
+        if not data.get('force'):
+            clashes = []
+            for session_data in data.get('sessions') or []:
+                clashes.extend(find_occupancy_clashes(
+                    session_data,
+                    code=data['code'],
+                    name=data['name'],
+                    instructor=data.get('instructor')
+                ))
+            if clashes:
+                return jsonify({
+                    'error': 'Raum- oder Dozentenkonflikt erkannt',
+                    'clashes': clashes
+                }), 409
+        
         # Create course
         course = Course(
             name=data['name'],
@@ -432,7 +577,8 @@ def create_course():
             semester_level=data.get('semester_level'),
             horst_url=data.get('horst_url'),
             moodle_url=data.get('moodle_url'),
-            syllabus_url=data.get('syllabus_url')
+            syllabus_url=data.get('syllabus_url'),
+            capacity=data.get('capacity')
         )
         
         db.session.add(course)
@@ -483,6 +629,20 @@ def add_course_session(course_id):
             if field not in data:
                 return jsonify({'error': f'{field} ist erforderlich'}), 400
         
+        if not data.get('force'):
+            clashes = find_occupancy_clashes(
+                data,
+                code=course.code,
+                name=course.name,
+                instructor=course.instructor,
+                exclude_course_id=course.id
+            )
+            if clashes:
+                return jsonify({
+                    'error': 'Raum- oder Dozentenkonflikt erkannt',
+                    'clashes': clashes
+                }), 409
+        
         session = CourseSession(
             course_id=course_id,
             session_type=data.get('session_type', 'Vorlesung'),
@@ -505,4 +665,94 @@ def add_course_session(course_id):
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Session konnte nicht erstellt werden: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Session konnte nicht erstellt werden: {str(e)}'}), 500
+
+@course_catalog_bp.route('/admin/enrollments/bulk', methods=['POST'])
+@jwt_required()
+def bulk_enroll_cohort():
+    """Kohorte (Selektor) in mehrere Kurse einschreiben, Konflikte mengenbasiert prüfen"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Keine Daten empfangen'}), 400
+        if not isinstance(data.get('selector'), dict):
+            return jsonify({'error': 'selector ist erforderlich'}), 400
+        if not data.get('course_ids') and not data.get('session_ids'):
+            return jsonify({'error': 'course_ids oder session_ids ist erforderlich'}), 400
+
+        try:
+            report = bulk_enroll(
+                db.session,
+                data['selector'],
+                course_ids=data.get('course_ids') or [],
+                session_ids=data.get('session_ids') or [],
+                on_conflict=data.get('on_conflict', 'skip_user'),
+                dry_run=bool(data.get('dry_run'))
+            )
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+
+        if report['dry_run']:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        return jsonify(report), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Sammel-Einschreibung fehlgeschlagen: {str(e)}'}), 500
+
+# =================== OCCUPANCY (Admin) ===================
+
+@course_catalog_bp.route('/admin/occupancy/clashes', methods=['GET'])
+@jwt_required()
+def check_occupancy():
+    """Raum-/Dozentenbelegung für einen geplanten Termin prüfen"""
+    try:
+        if not request.args.get('start_time') or not request.args.get('end_time'):
+            return jsonify({'error': 'start_time und end_time sind erforderlich'}), 400
+        
+        if request.args.get('day_of_week') is None and not request.args.get('session_date'):
+            return jsonify({'error': 'day_of_week oder session_date ist erforderlich'}), 400
+        
+        session_data = {
+            'start_time': request.args['start_time'],
+            'end_time': request.args['end_time'],
+            'room': request.args.get('room'),
+            'day_of_week': request.args.get('day_of_week', type=int),
+            'session_date': request.args.get('session_date')
+        }
+        
+        clashes = find_occupancy_clashes(
+            session_data,
+            instructor=request.args.get('instructor'),
+            exclude_course_id=request.args.get('exclude_course_id', type=int)
+        )
+        
+        return jsonify({
+            'clashes': clashes,
+            'count': len(clashes)
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Ungültiges Datums- oder Zeitformat'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Belegung konnte nicht geprüft werden: {str(e)}'}), 500
+
+@course_catalog_bp.route('/admin/occupancy/report', methods=['GET'])
+@jwt_required()
+def occupancy_report():
+    """Alle Raum- und Dozentenkonflikte des gesamten Katalogs"""
+    try:
+        index = current_occupancy_index(db.session)
+        clashes = index.report()
+        
+        return jsonify({
+            'clashes': clashes,
+            'count': len(clashes),
+            'index': index.stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Belegungsbericht konnte nicht erstellt werden: {str(e)}'}), 500
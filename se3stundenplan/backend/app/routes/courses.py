@@ -1,9 +1,15 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User, Timetable, Course, CourseComment, EnrolledCourse, CourseSession
 from datetime import datetime, time
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, select, func
+from sqlalchemy.orm import contains_eager
+from app.batch import parse_id_list
+from app.single_flight import query_signature
+from app.cache import cached_json
+from app.admission import AdmissionBusy, admit, capacity_error, release, seat_counts, waitlist_position
+from sqlalchemy.exc import IntegrityError
 
 courses_bp = Blueprint('courses', __name__)
 
@@ -22,6 +28,82 @@ def parse_time(time_str):
     except:
         return None
 
+# Felder, die per PUT direkt übernommen werden
+COURSE_UPDATE_FIELDS = [
+    'name', 'code', 'instructor', 'room', 'description', 'color', 'course_type', 'credits',
+    'horst_url', 'moodle_url', 'external_url', 'is_active', 'reminder_enabled', 'reminder_minutes'
+]
+
+def apply_course_update(course, data):
+    """Änderungen auf einen Kurs anwenden, liefert (Fehlermeldung, Zeit geändert)"""
+    if 'capacity' in data:
+        error = capacity_error(data['capacity'], course.enrolled_count or 0)
+        if error:
+            return error, False
+        course.capacity = data['capacity']
+    
+    for field in COURSE_UPDATE_FIELDS:
+        if field in data:
+            setattr(course, field, data[field])
+    
+    # Handle time updates
+    time_changed = False
+    new_start_time = course.start_time
+    new_end_time = course.end_time
+    new_day = course.day_of_week
+    
+    if 'start_time' in data:
+        new_start_time = parse_time(data['start_time'])
+        if not new_start_time:
+            return 'Ungültiges Startzeit-Format', time_changed
+        time_changed = True
+    
+    if 'end_time' in data:
+        new_end_time = parse_time(data['end_time'])
+        if not new_end_time:
+            return 'Ungültiges Endzeit-Format', time_changed
+        time_changed = True
+    
+    if 'day_of_week' in data:
+        if not isinstance(data['day_of_week'], int) or not (0 <= data['day_of_week'] <= 6):
+            return 'Ungültiger Wochentag', time_changed
+        new_day = data['day_of_week']
+        time_changed = True
+    
+    # Validate time logic
+    if new_start_time >= new_end_time:
+        return 'Startzeit muss vor Endzeit liegen', time_changed
+    
+    course.start_time = new_start_time
+    course.end_time = new_end_time
+    course.day_of_week = new_day
+    course.updated_at = datetime.utcnow()
+    return None, time_changed
+
+def find_time_conflicts(courses):
+    """Zeitkonflikte der geänderten Kurse mit einer Abfrage pro Batch finden (Kurs-ID -> Konfliktkurs)"""
+    changed_ids = {course.id for course in courses}
+    timetable_ids = {course.timetable_id for course in courses}
+    
+    by_day = {}
+    for course in Course.query.filter(Course.timetable_id.in_(timetable_ids)).all():
+        by_day.setdefault((course.timetable_id, course.day_of_week), []).append(course)
+    
+    conflicts = {}
+    for day_courses in by_day.values():
+        day_courses.sort(key=lambda c: (c.start_time, c.end_time))
+        # Sweep: aktive Kurse, deren Ende nach dem Start des aktuellen liegt
+        running = []
+        for course in day_courses:
+            running = [other for other in running if other.end_time > course.start_time]
+            for other in running:
+                if course.id in changed_ids and course.id not in conflicts:
+                    conflicts[course.id] = other
+                if other.id in changed_ids and other.id not in conflicts:
+                    conflicts[other.id] = course
+            running.append(course)
+    return conflicts
+
 # =================== COURSE CATALOG ENDPOINTS ===================
 
 @courses_bp.route('/catalog', methods=['GET'])
@@ -29,77 +111,29 @@ def parse_time(time_str):
 def get_course_catalog():
     """Course Catalog API - Alle verfügbaren Kurse abrufen"""
     try:
-        # Get query parameters
-        search_query = request.args.get('search', '')
-        course_type = request.args.get('type', '')
-        instructor = request.args.get('instructor', '')
+        # Get query parameters (normalisiert, damit gleiche Abfragen dieselbe Signatur haben)
+        search_query = request.args.get('search', '').strip()
+        course_type = request.args.get('type', '').strip()
+        instructor = request.args.get('instructor', '').strip()
         day_of_week = request.args.get('day', '')
-        page = request.args.get('page', 1, type=int)
+        page = max(request.args.get('page', 1, type=int), 1)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
 
-        # Base query
-        query = Course.query
-
-        # Apply filters
-        if search_query:
-            query = query.filter(
-                or_(
-                    Course.name.ilike(f'%{search_query}%'),
-                    Course.code.ilike(f'%{search_query}%'),
-                    Course.description.ilike(f'%{search_query}%')
-                )
-            )
-
-        if course_type:
-            query = query.filter(Course.course_type.ilike(f'%{course_type}%'))
-
-        if instructor:
-            query = query.filter(Course.instructor.ilike(f'%{instructor}%'))
-
-        if day_of_week:
-            try:
-                day_num = int(day_of_week)
-                if 0 <= day_num <= 6:
-                    query = query.filter(Course.day_of_week == day_num)
-            except ValueError:
-                pass
-
-        # Get active courses only
-        query = query.filter(Course.is_active == True)
-
-        # Pagination
-        paginated_courses = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
+        try:
+            day_num = int(day_of_week) if day_of_week else None
+        except ValueError:
+            day_num = None
+        if day_num is not None and not 0 <= day_num <= 6:
+            day_num = None
+
+        # ilike: Groß-/Kleinschreibung spielt für das Ergebnis keine Rolle
+        key = query_signature(
+            'courses.catalog', search=search_query.lower(), type=course_type.lower(),
+            instructor=instructor.lower(), day=day_num, page=page, per_page=per_page
         )
-
-        # Prepare response
-        courses_data = []
-        for course in paginated_courses.items:
-            course_dict = course.to_dict()
-            
-            # Add additional info
-            course_dict['available'] = True
-            course_dict['enrollment_count'] = EnrolledCourse.query.filter_by(
-                course_id=course.id, 
-                status='active'
-            ).count()
-            
-            courses_data.append(course_dict)
-
-        return jsonify({
-            'success': True,
-            'courses': courses_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': paginated_courses.total,
-                'pages': paginated_courses.pages,
-                'has_next': paginated_courses.has_next,
-                'has_prev': paginated_courses.has_prev
-            }
-        }), 200
+        return cached_json(key, lambda: build_course_catalog(
+            search_query, course_type, instructor, day_num, page, per_page
+        ), tags=('catalog',), finish=finish_course_catalog)
 
     except Exception as e:
         return jsonify({
@@ -108,56 +142,124 @@ def get_course_catalog():
             'details': str(e)
         }), 500
 
+def build_course_catalog(search_query, course_type, instructor, day_num, page, per_page):
+    """Kurskatalog-Seite abfragen (läuft pro Signatur nur einmal gleichzeitig)"""
+    # Base query
+    query = Course.query
+
+    # Apply filters
+    if search_query:
+        query = query.filter(
+            or_(
+                Course.name.ilike(f'%{search_query}%'),
+                Course.code.ilike(f'%{search_query}%'),
+                Course.description.ilike(f'%{search_query}%')
+            )
+        )
+
+    if course_type:
+        query = query.filter(Course.course_type.ilike(f'%{course_type}%'))
+
+    if instructor:
+        query = query.filter(Course.instructor.ilike(f'%{instructor}%'))
+
+    if day_num is not None:
+        query = query.filter(Course.day_of_week == day_num)
+
+    # Get active courses only
+    query = query.filter(Course.is_active == True)
+
+    # Pagination
+    paginated_courses = query.paginate(
+        page=page, 
+        per_page=per_page, 
+        error_out=False
+    )
+
+    # Prepare response
+    courses_data = []
+    for course in paginated_courses.items:
+        course_dict = course.to_dict()
+        
+        # Add additional info
+        course_dict['available'] = course.capacity is None or course.enrolled_count < course.capacity
+        course_dict['enrollment_count'] = course.enrolled_count
+        
+        courses_data.append(course_dict)
+
+    return {
+        'success': True,
+        'courses': courses_data,
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': paginated_courses.total,
+            'pages': paginated_courses.pages,
+            'has_next': paginated_courses.has_next,
+            'has_prev': paginated_courses.has_prev
+        }
+    }, 200
+
+def finish_course_catalog(payload):
+    """Platzzahlen pro Anfrage nachtragen (Einschreibungen invalidieren den Katalog-Cache nicht)"""
+    seats = seat_counts(db.session, [course['id'] for course in payload['courses']])
+    for course in payload['courses']:
+        capacity, enrolled = seats.get(course['id'], (course['capacity'], course['enrolled_count']))
+        course.update(capacity=capacity, enrolled_count=enrolled, enrollment_count=enrolled,
+                      available=capacity is None or enrolled < capacity)
+    return payload
+
 
 @courses_bp.route('/<int:course_id>/enroll', methods=['POST'])
 @jwt_required()
 def enroll_in_course(course_id):
-    """In Kurs einschreiben"""
+    """In Kurs einschreiben; volle Kurse führen auf die Warteliste (waitlist=false: 409)"""
     try:
-        current_user_id = get_jwt_identity()
-        
-        # Check if course exists
-        course = Course.query.get_or_404(course_id)
-        
-        # Check if already enrolled
-        existing_enrollment = EnrolledCourse.query.filter_by(
-            user_id=current_user_id,
-            course_id=course_id
-        ).first()
-
-        if existing_enrollment:
-            if existing_enrollment.status == 'active':
-                return jsonify({
-                    'success': False,
-                    'error': 'Bereits in diesem Kurs eingeschrieben'
-                }), 400
-            else:
-                # Reactivate enrollment
-                existing_enrollment.status = 'active'
-                existing_enrollment.enrollment_date = datetime.utcnow()
-                db.session.commit()
-                
-                return jsonify({
-                    'success': True,
-                    'message': 'Erfolgreich wieder eingeschrieben',
-                    'enrollment': existing_enrollment.to_dict()
-                }), 200
-
-        # Create new enrollment
-        new_enrollment = EnrolledCourse(
-            user_id=current_user_id,
-            course_id=course_id,
-            enrollment_date=datetime.utcnow(),
-            status='active'
-        )
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True) or {}
+
+        if db.session.scalar(select(Course.id).where(Course.id == course_id, Course.is_active == True)) is None:
+            return jsonify({'success': False, 'error': 'Kurs nicht gefunden'}), 404
+
+        # Pro Kurs nur ein Schreiber je Worker; die Transaktion bleibt innerhalb des Slots kurz
+        try:
+            with current_app.extensions['admission_queue'].slot(course_id):
+                try:
+                    enrollment, outcome = admit(db.session, current_user_id, course_id,
+                                                waitlist=data.get('waitlist', True))
+                    db.session.commit()
+                except IntegrityError:
+                    db.session.rollback()  # paralleler Doppelversuch desselben Benutzers
+                    enrollment, outcome = None, 'exists'
+        except AdmissionBusy:
+            db.session.rollback()
+            response = jsonify({
+                'success': False,
+                'error': 'Zu viele gleichzeitige Einschreibungen, bitte erneut versuchen'
+            })
+            response.headers['Retry-After'] = '1'
+            return response, 503
 
-        db.session.add(new_enrollment)
-        db.session.commit()
+        if outcome == 'exists':
+            return jsonify({
+                'success': False,
+                'error': 'Bereits in diesem Kurs eingeschrieben oder auf der Warteliste',
+                'enrollment': enrollment.to_dict() if enrollment is not None else None
+            }), 409
+        if outcome == 'full':
+            return jsonify({'success': False, 'error': 'Kurs ist voll'}), 409
 
+        if outcome == 'waitlisted':
+            return jsonify({
+                'success': True,
+                'message': 'Kurs ist voll, auf die Warteliste gesetzt',
+                'enrollment': enrollment.to_dict(),
+                'waitlist_position': waitlist_position(db.session, enrollment)
+            }), 202
         return jsonify({
             'success': True,
             'message': 'Erfolgreich eingeschrieben',
-            'enrollment': new_enrollment.to_dict()
+            'enrollment': enrollment.to_dict()
         }), 201
 
     except Exception as e:
@@ -172,14 +274,14 @@ def enroll_in_course(course_id):
 @courses_bp.route('/<int:course_id>/unenroll', methods=['POST'])
 @jwt_required()
 def unenroll_from_course(course_id):
-    """Aus Kurs austragen"""
+    """Aus Kurs austragen bzw. Warteliste verlassen; Wartende rücken automatisch nach"""
     try:
         current_user_id = get_jwt_identity()
         
-        enrollment = EnrolledCourse.query.filter_by(
-            user_id=current_user_id,
-            course_id=course_id,
-            status='active'
+        enrollment = EnrolledCourse.query.filter(
+            EnrolledCourse.user_id == current_user_id,
+            EnrolledCourse.course_id == course_id,
+            EnrolledCourse.status.in_(['active', 'waitlisted'])
         ).first()
 
         if not enrollment:
@@ -188,12 +290,20 @@ def unenroll_from_course(course_id):
                 'error': 'Nicht in diesem Kurs eingeschrieben'
             }), 400
 
-        enrollment.status = 'dropped'
-        db.session.commit()
+        try:
+            with current_app.extensions['admission_queue'].slot(course_id):
+                promoted = release(db.session, enrollment)
+                db.session.commit()
+        except AdmissionBusy:
+            db.session.rollback()
+            response = jsonify({'success': False, 'error': 'Kurs ist ausgelastet, bitte erneut versuchen'})
+            response.headers['Retry-After'] = '1'
+            return response, 503
 
         return jsonify({
             'success': True,
-            'message': 'Erfolgreich ausgetragen'
+            'message': 'Erfolgreich ausgetragen',
+            'promoted': len(promoted)
         }), 200
 
     except Exception as e:
@@ -278,6 +388,64 @@ def get_course_sessions(course_id):
             'details': str(e)
         }), 500
 
+
+@courses_bp.route('/<int:course_id>/sessions/<int:session_id>', methods=['PUT'])
+@jwt_required()
+def update_course_session(course_id, session_id):
+    """Termin ändern/absagen; eingeschriebene Teilnehmer werden beim Speichern benachrichtigt"""
+    try:
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'Keine Daten empfangen'}), 400
+
+        course_session = (
+            CourseSession.query
+            .join(Course, CourseSession.course_id == Course.id)
+            .join(Timetable, Course.timetable_id == Timetable.id)
+            .filter(CourseSession.id == session_id,
+                    CourseSession.course_id == course_id,
+                    Timetable.user_id == current_user_id)
+            .first()
+        )
+        if not course_session:
+            return jsonify({'error': 'Termin nicht gefunden'}), 404
+
+        if 'session_date' in data:
+            try:
+                course_session.session_date = datetime.strptime(data['session_date'], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Ungültiges Datum (YYYY-MM-DD)'}), 400
+        for field in ('start_time', 'end_time'):
+            if field in data:
+                if not validate_time_format(data[field]):
+                    return jsonify({'error': f'Ungültiges Zeitformat für {field} (HH:MM)'}), 400
+                setattr(course_session, field, parse_time(data[field]))
+        if course_session.start_time >= course_session.end_time:
+            return jsonify({'error': 'Startzeit muss vor Endzeit liegen'}), 400
+        for field in ('room', 'session_type', 'title', 'description'):
+            if field in data:
+                setattr(course_session, field, data[field])
+        if 'is_cancelled' in data:
+            course_session.is_cancelled = bool(data['is_cancelled'])
+
+        # Der Flush verteilt die Benachrichtigungen (app/broadcast.py)
+        db.session.flush()
+        broadcasts = db.session.info.pop('broadcasts', [])
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Termin erfolgreich aktualisiert',
+            'session': course_session.to_dict(),
+            'notified': sum(item['recipients'] for item in broadcasts),
+            'broadcasts': broadcasts
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Termin konnte nicht aktualisiert werden: {str(e)}'}), 500
+
 # =================== EXISTING TIMETABLE COURSE ENDPOINTS ===================
 
 @courses_bp.route('/timetable/<int:timetable_id>', methods=['GET'])
@@ -346,6 +514,10 @@ def create_course():
         if not (0 <= data['day_of_week'] <= 6):
             return jsonify({'error': 'Wochentag muss zwischen 0 (Montag) und 6 (Sonntag) liegen'}), 400
         
+        error = capacity_error(data.get('capacity'))
+        if error:
+            return jsonify({'error': error}), 400
+        
         # Check for time conflicts
         existing_courses = Course.query.filter_by(
             timetable_id=data['timetable_id'],
@@ -376,7 +548,8 @@ def create_course():
             moodle_url=data.get('moodle_url'),
             external_url=data.get('external_url'),
             reminder_enabled=data.get('reminder_enabled', True),
-            reminder_minutes=data.get('reminder_minutes', 15)
+            reminder_minutes=data.get('reminder_minutes', 15),
+            capacity=data.get('capacity')
         )
         
         db.session.add(course)
@@ -396,29 +569,34 @@ def create_course():
 def get_course(course_id):
     """Spezifischen Kurs mit Details abrufen"""
     try:
-        current_user_id = get_jwt_identity()
-        
-        course = Course.query.join(Timetable).filter(
-            Course.id == course_id,
-            Timetable.user_id == current_user_id
-        ).first()
-        
-        if not course:
+        current_user_id = int(get_jwt_identity())
+        page = max(request.args.get('comments_page', 1, type=int), 1)
+        per_page = min(max(request.args.get('comments_per_page', 20, type=int), 1), 100)
+        
+        # Abfrage 1: Kurs (nur eigener), Termine und Einschreibung in einem Statement
+        row = db.session.execute(
+            select(Course, EnrolledCourse.status)
+            .join(Timetable, Course.timetable_id == Timetable.id)
+            .outerjoin(CourseSession, CourseSession.course_id == Course.id)
+            .outerjoin(EnrolledCourse, and_(EnrolledCourse.course_id == Course.id,
+                                            EnrolledCourse.user_id == current_user_id))
+            .options(contains_eager(Course.course_sessions))
+            .where(Course.id == course_id, Timetable.user_id == current_user_id)
+            .order_by(CourseSession.session_date, CourseSession.id)
+        ).unique().first()
+        
+        if not row:
             return jsonify({'error': 'Kurs nicht gefunden'}), 404
+        course, enrollment_status = row
         
-        # Get course sessions for catalog view
-        sessions = CourseSession.query.filter_by(course_id=course_id).order_by(CourseSession.session_date).all()
+        # Abfrage 2: eine Seite Kommentare samt Gesamtzahl
+        comments, total = comment_page(course_id, page, per_page)
         
-        # Get enrollment info
-        enrollment = EnrolledCourse.query.filter_by(
-            user_id=current_user_id,
-            course_id=course_id
-        ).first()
-
-        course_data = course.to_dict(include_comments=True)
-        course_data['sessions'] = [session.to_dict() for session in sessions]
-        course_data['is_enrolled'] = enrollment is not None
-        course_data['enrollment_status'] = enrollment.status if enrollment else None
+        course_data = course.to_dict(include_sessions=True)
+        course_data['comments'] = [comment.to_dict() for comment in comments]
+        course_data['comments_pagination'] = comment_pagination(page, per_page, total)
+        course_data['is_enrolled'] = enrollment_status is not None
+        course_data['enrollment_status'] = enrollment_status
         
         return jsonify({
             'course': course_data
@@ -446,83 +624,25 @@ def update_course(course_id):
         if not data:
             return jsonify({'error': 'Keine Daten empfangen'}), 400
         
-        # Update basic fields
-        if 'name' in data:
-            course.name = data['name']
-        if 'code' in data:
-            course.code = data['code']
-        if 'instructor' in data:
-            course.instructor = data['instructor']
-        if 'room' in data:
-            course.room = data['room']
-        if 'description' in data:
-            course.description = data['description']
-        if 'color' in data:
-            course.color = data['color']
-        if 'course_type' in data:
-            course.course_type = data['course_type']
-        if 'credits' in data:
-            course.credits = data['credits']
-        if 'horst_url' in data:
-            course.horst_url = data['horst_url']
-        if 'moodle_url' in data:
-            course.moodle_url = data['moodle_url']
-        if 'external_url' in data:
-            course.external_url = data['external_url']
-        if 'is_active' in data:
-            course.is_active = data['is_active']
-        if 'reminder_enabled' in data:
-            course.reminder_enabled = data['reminder_enabled']
-        if 'reminder_minutes' in data:
-            course.reminder_minutes = data['reminder_minutes']
-        
-        # Handle time updates
-        time_changed = False
-        new_start_time = course.start_time
-        new_end_time = course.end_time
-        new_day = course.day_of_week
-        
-        if 'start_time' in data:
-            new_start_time = parse_time(data['start_time'])
-            if not new_start_time:
-                return jsonify({'error': 'Ungültiges Startzeit-Format'}), 400
-            time_changed = True
-        
-        if 'end_time' in data:
-            new_end_time = parse_time(data['end_time'])
-            if not new_end_time:
-                return jsonify({'error': 'Ungültiges Endzeit-Format'}), 400
-            time_changed = True
-        
-        if 'day_of_week' in data:
-            if not (0 <= data['day_of_week'] <= 6):
-                return jsonify({'error': 'Ungültiger Wochentag'}), 400
-            new_day = data['day_of_week']
-            time_changed = True
-        
-        # Validate time logic
-        if new_start_time >= new_end_time:
-            return jsonify({'error': 'Startzeit muss vor Endzeit liegen'}), 400
+        error, time_changed = apply_course_update(course, data)
+        if error:
+            db.session.rollback()
+            return jsonify({'error': error}), 400
         
         # Check for conflicts if time changed
         if time_changed:
             existing_courses = Course.query.filter_by(
                 timetable_id=course.timetable_id,
-                day_of_week=new_day
+                day_of_week=course.day_of_week
             ).filter(Course.id != course_id).all()
             
             for existing_course in existing_courses:
-                if not (new_end_time <= existing_course.start_time or new_start_time >= existing_course.end_time):
+                if not (course.end_time <= existing_course.start_time or course.start_time >= existing_course.end_time):
+                    db.session.rollback()
                     return jsonify({
                         'error': f'Zeitkonflikt mit Kurs "{existing_course.name}"'
                     }), 400
         
-        # Apply time changes
-        course.start_time = new_start_time
-        course.end_time = new_end_time
-        course.day_of_week = new_day
-        course.updated_at = datetime.utcnow()
-        
         db.session.commit()
         
         return jsonify({
@@ -560,8 +680,148 @@ def delete_course(course_id):
         db.session.rollback()
         return jsonify({'error': f'Kurs konnte nicht gelöscht werden: {str(e)}'}), 500
 
+# =================== BATCH ===================
+
+@courses_bp.route('/batch', methods=['GET'])
+@jwt_required()
+def get_courses_batch():
+    """Mehrere Kurse per ID-Liste abrufen (?ids=1,2,3)"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        ids, error = parse_id_list(request.args.get('ids'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        courses = {
+            course.id: course
+            for course in Course.query.join(Timetable).filter(
+                Course.id.in_(ids),
+                Timetable.user_id == current_user_id
+            ).all()
+        }
+        
+        results = []
+        for course_id in ids:
+            if course_id in courses:
+                results.append({'id': course_id, 'status': 'ok', 'course': courses[course_id].to_dict()})
+            else:
+                results.append({'id': course_id, 'status': 'not_found', 'error': 'Kurs nicht gefunden'})
+        
+        return jsonify({
+            'results': results,
+            'found': len(courses),
+            'count': len(ids)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Kurse konnten nicht geladen werden: {str(e)}'}), 500
+
+@courses_bp.route('/batch', methods=['PUT'])
+@jwt_required()
+def update_courses_batch():
+    """Mehrere Kurse in einer Transaktion aktualisieren (alles oder nichts)"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        updates = data.get('updates') if isinstance(data, dict) else None
+        if not isinstance(updates, list) or not updates:
+            return jsonify({'error': 'updates muss eine nicht-leere Liste sein'}), 400
+        
+        if not all(isinstance(item, dict) for item in updates):
+            return jsonify({'error': 'Jeder Eintrag in updates muss ein Objekt sein'}), 400
+        
+        ids, error = parse_id_list([item.get('id') for item in updates])
+        if error:
+            return jsonify({'error': error}), 400
+        if len(ids) != len(updates):
+            return jsonify({'error': 'Jeder Kurs darf nur einmal pro Batch vorkommen'}), 400
+        
+        # Eigentümerschaft mit einer Abfrage für den ganzen Batch prüfen
+        courses = {
+            course.id: course
+            for course in Course.query.join(Timetable).filter(
+                Course.id.in_(ids),
+                Timetable.user_id == current_user_id
+            ).all()
+        }
+        
+        results = {}
+        time_changed_courses = []
+        with db.session.no_autoflush:
+            for item in updates:
+                course_id = int(item['id'])
+                course = courses.get(course_id)
+                if course is None:
+                    results[course_id] = {'status': 'not_found', 'error': 'Kurs nicht gefunden'}
+                    continue
+                
+                error, time_changed = apply_course_update(course, item)
+                if error:
+                    results[course.id] = {'status': 'invalid', 'error': error}
+                elif time_changed:
+                    time_changed_courses.append(course)
+        
+        # Ein gemeinsamer Konflikt-Check nach allen Änderungen (z.B. Drag & Drop Umsortierung)
+        if not results and time_changed_courses:
+            for course_id, other in find_time_conflicts(time_changed_courses).items():
+                results[course_id] = {'status': 'conflict', 'error': f'Zeitkonflikt mit Kurs "{other.name}"'}
+        
+        if results:
+            db.session.rollback()
+            status_code = 404 if all(r['status'] == 'not_found' for r in results.values()) else 400
+            if any(r['status'] == 'conflict' for r in results.values()):
+                status_code = 409
+            return jsonify({
+                'error': 'Batch nicht übernommen, keine Änderungen gespeichert',
+                'results': [
+                    {'id': course_id, **results.get(course_id, {'status': 'skipped'})}
+                    for course_id in ids
+                ]
+            }), status_code
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(ids)} Kurse erfolgreich aktualisiert',
+            'results': [{'id': course_id, 'status': 'ok', 'course': courses[course_id].to_dict()} for course_id in ids]
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Kurse konnten nicht aktualisiert werden: {str(e)}'}), 500
+
 # =================== COURSE COMMENTS ===================
 
+def comment_page(course_id, page, per_page):
+    """Eine Seite Kommentare (neueste zuerst) und die Gesamtzahl in einer Abfrage (COUNT(*) OVER ())"""
+    rows = db.session.execute(
+        select(CourseComment, func.count().over().label('total'))
+        .where(CourseComment.course_id == course_id)
+        .order_by(CourseComment.created_at.desc(), CourseComment.id.desc())
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    ).all()
+    if rows:
+        return [comment for comment, _ in rows], rows[0].total
+    if page == 1:
+        return [], 0
+    # Seite hinter dem Ende: Gesamtzahl separat zählen
+    total = db.session.scalar(select(func.count()).select_from(CourseComment).where(CourseComment.course_id == course_id))
+    return [], total
+
+def comment_pagination(page, per_page, total):
+    pages = (total + per_page - 1) // per_page
+    return {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': pages,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
 @courses_bp.route('/<int:course_id>/comments', methods=['GET'])
 @jwt_required()
 def get_course_comments(course_id):
@@ -577,11 +837,14 @@ def get_course_comments(course_id):
         if not course:
             return jsonify({'error': 'Kurs nicht gefunden'}), 404
         
-        comments = CourseComment.query.filter_by(course_id=course_id).all()
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 100)
+        comments, total = comment_page(course_id, page, per_page)
         
         return jsonify({
             'comments': [comment.to_dict() for comment in comments],
-            'count': len(comments)
+            'count': total,
+            'pagination': comment_pagination(page, per_page, total)
         }), 200
         
     except Exception as e:
@@ -702,42 +965,37 @@ def search_courses():
         # Search parameters
         search_term = data.get('search', '')
         filters = data.get('filters', {})
-        
-        query = Course.query.filter(Course.is_active == True)
+
+        # Filter als Masken über den Katalog-Snapshot, nur Treffer aus der DB laden
+        snapshot = current_app.extensions['catalog_snapshot'].get(db.session)
+        mask = snapshot.all()
 
         # Text search
         if search_term:
-            query = query.filter(
-                or_(
-                    Course.name.ilike(f'%{search_term}%'),
-                    Course.code.ilike(f'%{search_term}%'),
-                    Course.instructor.ilike(f'%{search_term}%'),
-                    Course.description.ilike(f'%{search_term}%')
-                )
-            )
+            mask &= snapshot.text_contains(search_term)
 
         # Apply filters
         if filters.get('course_type'):
-            query = query.filter(Course.course_type == filters['course_type'])
+            mask &= snapshot.type_in([filters['course_type']])
             
         if filters.get('day_of_week') is not None:
-            query = query.filter(Course.day_of_week == filters['day_of_week'])
+            mask &= snapshot.day_in([filters['day_of_week']])
             
         if filters.get('time_range'):
             start_time = time.fromisoformat(filters['time_range']['start'])
             end_time = time.fromisoformat(filters['time_range']['end'])
-            query = query.filter(
-                and_(
-                    Course.start_time >= start_time,
-                    Course.end_time <= end_time
-                )
-            )
+            mask &= snapshot.within_time(start_time, end_time)
 
         if filters.get('credits'):
-            query = query.filter(Course.credits == filters['credits'])
+            mask &= snapshot.credits_equal(filters['credits'])
+
+        if filters.get('instructor'):
+            mask &= snapshot.instructor_contains(filters['instructor'])
 
         # Execute query
-        courses = query.limit(50).all()
+        course_ids = snapshot.ids_where(mask, limit=50, order='id')
+        courses = Course.query.filter(Course.id.in_(course_ids), Course.is_active == True) \
+            .order_by(Course.id).all() if course_ids else []
         courses_data = [course.to_dict() for course in courses]
 
         return jsonify({
@@ -0,0 +1,147 @@
+from flask import Blueprint, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.models import User, Timetable, Course, Notification
+from app.ics_feed import timetable_version
+from app.occurrences import build_plan, periods_digest
+from app.cache import cached_json
+from app.single_flight import query_signature
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, select
+import time as clock
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+REMINDER_LIMIT = 100
+
+# =================== DASHBOARD ===================
+
+@dashboard_bp.route('', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    """
+    Startseite in einer Anfrage: aktiver Stundenplan, Termine heute und morgen,
+    nächster Kurs, ungelesene Benachrichtigungen und Erinnerungen der nächsten 24 h.
+
+    Der tagesabhängige Teil wird pro (Benutzer, Tag) gecacht und über das Tag
+    user:<id> invalidiert; nächster Kurs und Erinnerungsfenster werden pro
+    Anfrage aus dem gecachten Teil bestimmt.
+    """
+    try:
+        started = clock.perf_counter()
+        current_user_id = int(get_jwt_identity())
+        today = date.today()
+
+        response = cached_json(
+            query_signature('dashboard', user=current_user_id, day=today.isoformat()),
+            lambda: build_dashboard(current_user_id, today, datetime.now()),
+            tags=(f'user:{current_user_id}',),
+            finish=lambda data: finish_dashboard(data, datetime.now())
+        )
+        response.headers['Server-Timing'] = f'dashboard;dur={(clock.perf_counter() - started) * 1000:.2f}'
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': f'Dashboard konnte nicht geladen werden: {str(e)}'}), 500
+
+
+def build_dashboard(user_id, today, now):
+    """Tagesteil des Dashboards mit festen Abfragen (Benutzer, Stundenplan, Version, Erinnerungen + Plan)"""
+    unread = (select(func.count()).select_from(Notification)
+              .where(Notification.user_id == user_id, Notification.is_read == False)
+              .scalar_subquery())
+    row = db.session.execute(
+        select(User.id, User.username, User.full_name, unread.label('unread_count')).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return {'error': 'Benutzer nicht gefunden'}, 404
+
+    # Aktiver Stundenplan, sonst der älteste (ohne ihn wie /timetable/active zu aktivieren)
+    course_count = (select(func.count()).select_from(Course)
+                    .where(Course.timetable_id == Timetable.id, Course.is_active == True)
+                    .scalar_subquery())
+    total_credits = (select(func.coalesce(func.sum(Course.credits), 0))
+                     .where(Course.timetable_id == Timetable.id, Course.is_active == True)
+                     .scalar_subquery())
+    active = db.session.execute(
+        select(Timetable, course_count.label('course_count'), total_credits.label('total_credits'))
+        .where(Timetable.user_id == user_id)
+        .order_by(Timetable.is_active.desc(), Timetable.id)
+        .limit(1)
+    ).first()
+
+    tomorrow = today + timedelta(days=1)
+    days = {today.isoformat(): [], tomorrow.isoformat(): []}
+    summary = None
+    if active is not None:
+        timetable = active[0]
+        summary = {
+            'id': timetable.id,
+            'name': timetable.name,
+            'semester': timetable.semester,
+            'year': timetable.year,
+            'is_active': timetable.is_active,
+            'course_count': active.course_count,
+            'total_credits': active.total_credits
+        }
+        # Kompilierter Plan wird mit /calendar geteilt (gleicher Schlüssel)
+        version = timetable_version(db.session, user_id)
+        cache = current_app.extensions['occurrence_cache']
+        lecture_free = current_app.extensions['lecture_free_periods']
+        key = (timetable.id, (user_id, version, periods_digest(lecture_free)))
+        plan = cache.get(key)
+        if plan is None:
+            plan = build_plan(version, timetable, lecture_free)
+            cache.put(key, plan)
+        for occurrence in plan.expand(today, tomorrow):
+            days[occurrence['date']].append(occurrence)
+
+    # Erinnerungen ab Erstellung des Eintrags bis übermorgen 0 Uhr; das 24-h-Fenster schneidet
+    # finish_dashboard zu. Ab 0 Uhr gelesen, füllten überfällige, noch nicht gesendete Erinnerungen
+    # das Limit und die kommenden fehlten.
+    reminders = db.session.scalars(
+        select(Notification)
+        .where(Notification.user_id == user_id,
+               Notification.notify_time >= now,
+               Notification.notify_time < datetime.combine(today + timedelta(days=2), time.min),
+               Notification.is_sent == False)
+        .order_by(Notification.notify_time)
+        .limit(REMINDER_LIMIT)
+    ).all()
+
+    return {
+        'user': {'id': row.id, 'username': row.username, 'full_name': row.full_name},
+        'timetable': summary,
+        'today': {'date': today.isoformat(), 'occurrences': days[today.isoformat()]},
+        'tomorrow': {'date': tomorrow.isoformat(), 'occurrences': days[tomorrow.isoformat()]},
+        'unread_count': row.unread_count,
+        'reminders': [notification.to_dict() for notification in reminders]
+    }, 200
+
+
+def finish_dashboard(data, now):
+    """Zeitabhängige Felder aus dem gecachten Tagesteil bestimmen (ohne Datenbank)"""
+    current = now.strftime('%H:%M')
+    data['next_course'] = None
+    for day in (data['today'], data['tomorrow']):
+        for occurrence in day['occurrences']:
+            if occurrence['status'] == 'cancelled':
+                continue
+            if day is data['today'] and occurrence['end_time'] <= current:
+                continue
+            data['next_course'] = {
+                **occurrence,
+                'in_progress': day is data['today'] and occurrence['start_time'] <= current
+            }
+            break
+        if data['next_course'] is not None:
+            break
+
+    until = now + timedelta(days=1)
+    data['upcoming_reminders'] = [
+        reminder for reminder in data.pop('reminders')
+        if now <= datetime.fromisoformat(reminder['notify_time']) <= until
+    ]
+    data['generated_at'] = now.isoformat()
+    return data
@@ -1,14 +1,16 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User, Timetable, Course, CourseComment
+from app.change_log import user_version
+from app.admission import capacity_error
 from datetime import datetime, time
 import json
 import csv
 import io
-import pandas as pd
 import tempfile
 import os
+import re
 from werkzeug.utils import secure_filename
 
 export_import_bp = Blueprint('export_import', __name__)
@@ -18,47 +20,309 @@ ALLOWED_EXTENSIONS = {'csv', 'json', 'xlsx', 'xls'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# HH:MM, HH:MM:SS, HH.MM, HH,MM (Trennzeichen frei kombinierbar)
+TIME_PATTERN = re.compile(r'^\s*(\d{1,2})[:.,](\d{2})(?:[:.,](\d{2}))?\s*$')
+
+DAY_MAPPING = {
+    'monday': 0, 'montag': 0, 'mo': 0,
+    'tuesday': 1, 'dienstag': 1, 'di': 1,
+    'wednesday': 2, 'mittwoch': 2, 'mi': 2,
+    'thursday': 3, 'donnerstag': 3, 'do': 3,
+    'friday': 4, 'freitag': 4, 'fr': 4,
+    'saturday': 5, 'samstag': 5, 'sa': 5,
+    'sunday': 6, 'sonntag': 6, 'so': 6
+}
+
 def parse_time_flexible(time_str):
     """Flexible Zeit-Parsing für verschiedene Formate"""
     if not time_str:
         return None
     
-    # Bekannte Formate
-    formats = ['%H:%M:%S', '%H:%M', '%H.%M', '%H,%M']
-    
-    for fmt in formats:
-        try:
-            return datetime.strptime(str(time_str).strip(), fmt).time()
-        except:
-            continue
+    match = TIME_PATTERN.match(str(time_str))
+    if not match:
+        return None
     
-    return None
+    hour, minute, second = (int(part) if part else 0 for part in match.groups())
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    return time(hour, minute, second)
 
 def get_day_number(day_str):
     """Wochentag zu Nummer konvertieren"""
     if isinstance(day_str, int):
         return day_str if 0 <= day_str <= 6 else None
     
-    day_mapping = {
-        'monday': 0, 'montag': 0, 'mo': 0,
-        'tuesday': 1, 'dienstag': 1, 'di': 1,
-        'wednesday': 2, 'mittwoch': 2, 'mi': 2,
-        'thursday': 3, 'donnerstag': 3, 'do': 3,
-        'friday': 4, 'freitag': 4, 'fr': 4,
-        'saturday': 5, 'samstag': 5, 'sa': 5,
-        'sunday': 6, 'sonntag': 6, 'so': 6
+    return DAY_MAPPING.get(str(day_str).lower().strip())
+
+# =================== VECTORIZED PARSING ===================
+
+# Feld -> Spaltennamen in Prioritätsreihenfolge (erste nicht-leere Spalte gewinnt)
+CSV_COLUMNS = {
+    'name': ['Name', 'name'],
+    'start_time': ['Start Time', 'Startzeit', 'start_time'],
+    'end_time': ['End Time', 'Endzeit', 'end_time'],
+    'day_of_week': ['Day', 'Wochentag', 'day_of_week'],
+    'code': ['Code', 'code'],
+    'instructor': ['Instructor', 'Dozent', 'instructor'],
+    'room': ['Room', 'Raum', 'room'],
+    'description': ['Description', 'Beschreibung', 'description'],
+    'color': ['Color', 'Farbe', 'color'],
+    'course_type': ['Type', 'Typ', 'course_type'],
+    'credits': ['Credits'],
+    'horst_url': ['Horst URL', 'horst_url'],
+    'capacity': ['Capacity', 'capacity']
+}
+
+EXCEL_COLUMNS = {
+    **CSV_COLUMNS,
+    'start_time': ['Startzeit', 'Start Time', 'start_time'],
+    'end_time': ['Endzeit', 'End Time', 'end_time'],
+    'day_of_week': ['Wochentag', 'Day', 'day_of_week'],
+    'instructor': ['Dozent'],
+    'room': ['Raum'],
+    'description': ['Beschreibung'],
+    'color': ['Farbe'],
+    'course_type': ['Typ'],
+    'credits': ['ECTS'],
+    'horst_url': ['Horst URL'],
+    'capacity': ['Plätze']
+}
+
+def map_unique(series, parse, default=None):
+    """
+    parse() nur einmal pro unterschiedlichem Wert aufrufen und per Code auf alle
+    Zeilen übertragen (Uhrzeiten, Wochentage, Typen wiederholen sich ständig).
+    Leere Zellen (NaN/None) erhalten default.
+    """
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(series)
+    parsed = np.empty(len(uniques) + 1, dtype=object)
+    parsed[:-1] = [parse(value) for value in uniques]
+    parsed[-1] = default
+    return parsed[codes]  # Code -1 (leer) -> letzter Eintrag
+
+def coalesce_columns(df, aliases):
+    """Aliase einmal pro Spalte auflösen; leere Zellen fallen auf die nächste Spalte zurück"""
+    import pandas as pd
+    columns = {}
+    for field, names in aliases.items():
+        result = None
+        for name in names:
+            if name not in df.columns:
+                continue
+            series = df[name]
+            filled = map_unique(series, lambda value: str(value).strip() != '', False).astype(bool)
+            series = series.where(filled)
+            result = series if result is None else result.combine_first(series)
+        columns[field] = result if result is not None else pd.Series(None, index=df.index, dtype=object)
+    return columns
+
+def parse_day_value(value):
+    """Wochentag aus Name/Abkürzung oder Zahl 0-6"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    return get_day_number(int(value) if isinstance(value, int) else value)
+
+def parse_course_frame(df, aliases):
+    """
+    DataFrame in Kursdaten umwandeln.
+
+    Alle Spalten werden als Ganzes geparst, Fehler per Maske ermittelt.
+    Liefert (Liste von Kurs-Dicts, Fehlermeldungen nach Zeile sortiert).
+    """
+    import numpy as np
+    import pandas as pd
+    columns = coalesce_columns(df, aliases)
+    
+    name_missing = columns['name'].isna().to_numpy()
+    start_times = map_unique(columns['start_time'], parse_time_flexible)
+    end_times = map_unique(columns['end_time'], parse_time_flexible)
+    days = map_unique(columns['day_of_week'], parse_day_value)
+    
+    time_invalid = ~name_missing & (pd.isna(start_times) | pd.isna(end_times))
+    day_invalid = ~name_missing & ~time_invalid & pd.isna(days)
+    valid = ~(name_missing | time_invalid | day_invalid)
+    
+    # Zeilennummer wie in der Datei (Kopfzeile = 1)
+    row_numbers = np.arange(len(df)) + 2
+    errors = sorted(
+        [(row, 'Name fehlt') for row in row_numbers[name_missing].tolist()] +
+        [(row, 'Ungültige Zeitangaben') for row in row_numbers[time_invalid].tolist()] +
+        [(row, 'Ungültiger Wochentag') for row in row_numbers[day_invalid].tolist()]
+    )
+    
+    def parse_count(value):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return int(number) if number >= 0 and number.is_integer() else None
+    
+    fields = {
+        'name': map_unique(columns['name'], str),
+        'code': map_unique(columns['code'], str),
+        'instructor': map_unique(columns['instructor'], str),
+        'room': map_unique(columns['room'], str),
+        'description': map_unique(columns['description'], str),
+        'color': map_unique(columns['color'], str, '#3498db'),
+        'course_type': map_unique(columns['course_type'], str, 'Vorlesung'),
+        'credits': map_unique(columns['credits'], parse_count),
+        'horst_url': map_unique(columns['horst_url'], str),
+        'capacity': map_unique(columns['capacity'], parse_count),
+        'day_of_week': days,
+        'start_time': start_times,
+        'end_time': end_times
     }
     
-    return day_mapping.get(str(day_str).lower().strip())
+    indices = np.flatnonzero(valid)
+    names = list(fields)
+    courses = [dict(zip(names, row)) for row in zip(*(fields[name][indices].tolist() for name in names))]
+    return courses, [f"Zeile {row}: {message}" for row, message in errors]
+
+def save_imported_courses(timetable, courses, errors, mode='append', delete_missing=False):
+    """Geparste Kurse anlegen (append) bzw. abgleichen (sync) und Import-Ergebnis liefern"""
+    if mode == 'sync':
+        return sync_imported_courses(timetable, courses, errors, delete_missing)
+    
+    db.session.add_all([Course(timetable_id=timetable.id, **values) for values in courses])
+    db.session.commit()
+    
+    return jsonify({
+        'message': f'{len(courses)} Kurse erfolgreich importiert',
+        'imported_count': len(courses),
+        'errors': errors
+    }), 201
+
+# =================== DIFF IMPORT ===================
+
+IMPORT_MODES = ('append', 'sync')
+
+# Felder, die ein Import setzt (Reihenfolge bestimmt den Inhalts-Hash)
+IMPORT_FIELDS = (
+    'name', 'code', 'instructor', 'room', 'description', 'color', 'course_type',
+    'credits', 'horst_url', 'day_of_week', 'start_time', 'end_time', 'capacity'
+)
+
+def _normalized(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+def course_key(values):
+    """Natürlicher Schlüssel: (Code, sonst Name; Wochentag; Startzeit; Typ)"""
+    label = _normalized(values.get('code')) or _normalized(values.get('name')) or ''
+    return (label.casefold(), values.get('day_of_week'), values.get('start_time'),
+            (_normalized(values.get('course_type')) or '').casefold())
+
+def content_hash(values):
+    """Hash über alle Importfelder; leere Strings und None gelten als gleich"""
+    import hashlib
+    text = '\x1f'.join(repr(_normalized(values.get(field))) for field in IMPORT_FIELDS)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def sync_imported_courses(timetable, courses, errors, delete_missing=False):
+    """
+    Import als Abgleich: vorhandene Kurse werden über den natürlichen Schlüssel
+    gefunden, nur neue und geänderte Zeilen werden geschrieben. Mit
+    delete_missing werden Kurse gelöscht, die in der Datei fehlen (auch
+    Duplikate früherer Importe mit gleichem Schlüssel).
+    """
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    
+    # Doppelte Schlüssel in der Datei: letzte Zeile gewinnt
+    incoming = {}
+    for values in courses:
+        incoming[course_key(values)] = values
+    duplicates = len(courses) - len(incoming)
+    
+    # Vorhandene Kurse mit einer Abfrage laden (nur Spalten, keine ORM-Objekte)
+    existing = {}
+    surplus_ids = []
+    enrolled = {}
+    rows = db.session.execute(
+        select(Course.id, Course.enrolled_count, *(getattr(Course, field) for field in IMPORT_FIELDS))
+        .where(Course.timetable_id == timetable.id)
+        .order_by(Course.id)
+    ).all()
+    for row in rows:
+        values = dict(zip(IMPORT_FIELDS, row[2:]))
+        key = course_key(values)
+        enrolled[row.id] = row.enrolled_count or 0
+        if key in existing:
+            surplus_ids.append(row.id)
+        else:
+            existing[key] = (row.id, content_hash(values))
+    
+    inserts = [values for key, values in incoming.items() if key not in existing]
+    updates = {existing[key][0]: values for key, values in incoming.items()
+               if key in existing and existing[key][1] != content_hash(values)}
+    # Kapazität nicht unter die belegten Plätze senken: Zeile bleibt unverändert
+    for course_id, values in list(updates.items()):
+        error = capacity_error(values['capacity'], enrolled[course_id])
+        if error:
+            errors.append(f'Kurs "{values["name"]}": {error}')
+            del updates[course_id]
+    unchanged = len(incoming) - len(inserts) - len(updates)
+    deleted_ids = []
+    if delete_missing:
+        deleted_ids = sorted(surplus_ids + [course_id for key, (course_id, _) in existing.items()
+                                            if key not in incoming])
+    
+    # Geänderte/zu löschende Kurse als ORM-Objekte laden (Änderungsprotokoll, Cascades)
+    touched_ids = list(updates) + deleted_ids
+    if touched_ids:
+        loaded = {course.id: course for course in Course.query.options(
+            selectinload(Course.comments), selectinload(Course.notifications), selectinload(Course.course_sessions)
+        ).filter(Course.id.in_(touched_ids))}
+        for course_id, values in updates.items():
+            for field in IMPORT_FIELDS:
+                setattr(loaded[course_id], field, values[field])
+        for course_id in deleted_ids:
+            db.session.delete(loaded[course_id])
+    
+    new_courses = [Course(timetable_id=timetable.id, **values) for values in inserts]
+    db.session.add_all(new_courses)
+    if new_courses or touched_ids:
+        db.session.commit()
+    
+    return jsonify({
+        'message': f'{len(inserts)} neu, {len(updates)} geändert, {unchanged} unverändert, {len(deleted_ids)} gelöscht',
+        'mode': 'sync',
+        'imported_count': len(inserts) + len(updates),
+        'diff': {
+            'inserted': [course.id for course in new_courses],
+            'updated': sorted(updates),
+            'deleted': deleted_ids,
+            'unchanged': unchanged,
+            'duplicates': duplicates
+        },
+        'errors': errors
+    }), 200
 
 # =================== EXPORT FUNCTIONS ===================
 
+EXPORT_MIMETYPES = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+DAY_NAMES = {
+    'de': ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag'],
+    'en': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+}
+
 @export_import_bp.route('/export/<int:timetable_id>/<format>', methods=['GET'])
 @jwt_required()
 def export_timetable(timetable_id, format):
     """Stundenplan exportieren"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         
         # Verify timetable belongs to user
         timetable = Timetable.query.filter_by(
@@ -72,92 +336,80 @@ def export_timetable(timetable_id, format):
         if format not in ['json', 'csv', 'xlsx']:
             return jsonify({'error': 'Ungültiges Export-Format'}), 400
         
-        courses = Course.query.filter_by(timetable_id=timetable_id).all()
+        locale = request.args.get('locale', 'de')
+        if locale not in DAY_NAMES:
+            return jsonify({'error': f"Ungültige Sprache, erlaubt: {', '.join(DAY_NAMES)}"}), 400
+        
+        # Unveränderter Stundenplan -> vorhandene Datei ausliefern (ohne Exportzeitpunkt im Inhalt,
+        # der stünde sonst veraltet in jeder gecachten Datei; Last-Modified liefert send_file)
+        cache = current_app.extensions['export_cache']
+        version = user_version(db.session, current_user_id, ('timetable', 'course'))
+        path = cache.path_for(timetable_id, version, format, locale)
         
-        if format == 'json':
-            return export_to_json(timetable, courses)
-        elif format == 'csv':
-            return export_to_csv(timetable, courses)
-        elif format == 'xlsx':
-            return export_to_excel(timetable, courses)
+        if cache.get(path) is None:
+            courses = Course.query.filter_by(timetable_id=timetable_id).all()
+            exporter = {'json': export_to_json, 'csv': export_to_csv, 'xlsx': export_to_excel}[format]
+            cache.store(path, lambda target: exporter(timetable, courses, target, locale))
+        
+        filename = f"stundenplan_{timetable.name}_{datetime.now().strftime('%Y%m%d')}.{format}"
+        return send_file(
+            path,
+            mimetype=EXPORT_MIMETYPES[format],
+            as_attachment=True,
+            download_name=filename,
+            conditional=True
+        )
             
     except Exception as e:
         return jsonify({'error': f'Export fehlgeschlagen: {str(e)}'}), 500
 
-def export_to_json(timetable, courses):
+def export_to_json(timetable, courses, path, locale='de'):
     """JSON Export"""
     data = {
         'timetable': timetable.to_dict(),
         'courses': [course.to_dict() for course in courses],
-        'export_date': datetime.now().isoformat(),
         'format_version': '1.0'
     }
     
-    # Create file
-    json_data = json.dumps(data, indent=2, ensure_ascii=False)
-    
-    # Create in-memory file
-    file_buffer = io.BytesIO()
-    file_buffer.write(json_data.encode('utf-8'))
-    file_buffer.seek(0)
-    
-    filename = f"stundenplan_{timetable.name}_{datetime.now().strftime('%Y%m%d')}.json"
-    
-    return send_file(
-        file_buffer,
-        mimetype='application/json',
-        as_attachment=True,
-        download_name=filename
-    )
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
 
-def export_to_csv(timetable, courses):
+def export_to_csv(timetable, courses, path, locale='de'):
     """CSV Export"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow([
-        'Name', 'Code', 'Instructor', 'Room', 'Day', 'Start Time', 
-        'End Time', 'Type', 'Credits', 'Description', 'Color', 'Horst URL'
-    ])
-    
-    # Courses
-    day_names = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
-    
-    for course in courses:
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        
+        # Header
         writer.writerow([
-            course.name,
-            course.code or '',
-            course.instructor or '',
-            course.room or '',
-            day_names[course.day_of_week],
-            course.start_time.strftime('%H:%M'),
-            course.end_time.strftime('%H:%M'),
-            course.course_type or '',
-            course.credits or '',
-            course.description or '',
-            course.color or '',
-            course.horst_url or ''
+            'Name', 'Code', 'Instructor', 'Room', 'Day', 'Start Time', 
+            'End Time', 'Type', 'Credits', 'Description', 'Color', 'Horst URL', 'Capacity'
         ])
-    
-    # Create file
-    file_buffer = io.BytesIO()
-    file_buffer.write(output.getvalue().encode('utf-8'))
-    file_buffer.seek(0)
-    
-    filename = f"stundenplan_{timetable.name}_{datetime.now().strftime('%Y%m%d')}.csv"
-    
-    return send_file(
-        file_buffer,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
-    )
+        
+        # Courses
+        day_names = DAY_NAMES[locale]
+        
+        for course in courses:
+            writer.writerow([
+                course.name,
+                course.code or '',
+                course.instructor or '',
+                course.room or '',
+                day_names[course.day_of_week],
+                course.start_time.strftime('%H:%M'),
+                course.end_time.strftime('%H:%M'),
+                course.course_type or '',
+                course.credits or '',
+                course.description or '',
+                course.color or '',
+                course.horst_url or '',
+                '' if course.capacity is None else course.capacity
+            ])
 
-def export_to_excel(timetable, courses):
+def export_to_excel(timetable, courses, path, locale='de'):
     """Excel Export"""
+    import pandas as pd  # lazy: pandas kostet ~0,4s beim Worker-Start
     # Create data for pandas
-    day_names = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
+    day_names = DAY_NAMES[locale]
     
     course_data = []
     for course in courses:
@@ -173,36 +425,26 @@ def export_to_excel(timetable, courses):
             'ECTS': course.credits or '',
             'Beschreibung': course.description or '',
             'Farbe': course.color or '',
-            'Horst URL': course.horst_url or ''
+            'Horst URL': course.horst_url or '',
+            'Plätze': '' if course.capacity is None else course.capacity
         })
     
     # Create Excel file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-        with pd.ExcelWriter(tmp_file.name, engine='openpyxl') as writer:
-            # Timetable info
-            timetable_info = pd.DataFrame([{
-                'Stundenplan': timetable.name,
-                'Semester': timetable.semester or '',
-                'Jahr': timetable.year or '',
-                'Beschreibung': timetable.description or '',
-                'Erstellt': timetable.created_at.strftime('%d.%m.%Y'),
-                'Export': datetime.now().strftime('%d.%m.%Y %H:%M')
-            }])
-            timetable_info.to_excel(writer, sheet_name='Info', index=False)
-            
-            # Courses
-            if course_data:
-                courses_df = pd.DataFrame(course_data)
-                courses_df.to_excel(writer, sheet_name='Kurse', index=False)
-        
-        filename = f"stundenplan_{timetable.name}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        
-        return send_file(
-            tmp_file.name,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        # Timetable info
+        timetable_info = pd.DataFrame([{
+            'Stundenplan': timetable.name,
+            'Semester': timetable.semester or '',
+            'Jahr': timetable.year or '',
+            'Beschreibung': timetable.description or '',
+            'Erstellt': timetable.created_at.strftime('%d.%m.%Y')
+        }])
+        timetable_info.to_excel(writer, sheet_name='Info', index=False)
+        
+        # Courses
+        if course_data:
+            courses_df = pd.DataFrame(course_data)
+            courses_df.to_excel(writer, sheet_name='Kurse', index=False)
 
 # =================== IMPORT FUNCTIONS ===================
 
@@ -233,16 +475,22 @@ def import_to_timetable(timetable_id):
         if not allowed_file(file.filename):
             return jsonify({'error': 'Ungültiger Dateityp. Erlaubt: CSV, JSON, Excel'}), 400
         
+        # append: alle Zeilen neu anlegen; sync: nur Unterschiede schreiben
+        mode = request.values.get('mode', 'append')
+        if mode not in IMPORT_MODES:
+            return jsonify({'error': f"Ungültiger Import-Modus, erlaubt: {', '.join(IMPORT_MODES)}"}), 400
+        delete_missing = request.values.get('delete_missing', '').lower() in ('1', 'true', 'yes')
+        
         # Parse file based on extension
         filename = secure_filename(file.filename)
         file_ext = filename.rsplit('.', 1)[1].lower()
         
         if file_ext == 'json':
-            result = import_from_json(file, timetable)
+            result = import_from_json(file, timetable, mode, delete_missing)
         elif file_ext == 'csv':
-            result = import_from_csv(file, timetable)
+            result = import_from_csv(file, timetable, mode, delete_missing)
         elif file_ext in ['xlsx', 'xls']:
-            result = import_from_excel(file, timetable)
+            result = import_from_excel(file, timetable, mode, delete_missing)
         else:
             return jsonify({'error': 'Nicht unterstütztes Dateiformat'}), 400
         
@@ -252,7 +500,7 @@ def import_to_timetable(timetable_id):
         db.session.rollback()
         return jsonify({'error': f'Import fehlgeschlagen: {str(e)}'}), 500
 
-def import_from_json(file, timetable):
+def import_from_json(file, timetable, mode='append', delete_missing=False):
     """JSON Import"""
     try:
         data = json.load(file)
@@ -285,9 +533,12 @@ def import_from_json(file, timetable):
                     errors.append(f"Zeile {i+1}: Ungültiger Wochentag")
                     continue
                 
-                # Create course
-                course = Course(
-                    timetable_id=timetable.id,
+                capacity_invalid = capacity_error(course_data.get('capacity'))
+                if capacity_invalid:
+                    errors.append(f"Zeile {i+1}: {capacity_invalid}")
+                    continue
+                
+                imported_courses.append(dict(
                     name=course_data['name'],
                     code=course_data.get('code'),
                     instructor=course_data.get('instructor'),
@@ -299,164 +550,48 @@ def import_from_json(file, timetable):
                     end_time=end_time,
                     course_type=course_data.get('course_type', 'Vorlesung'),
                     credits=course_data.get('credits'),
-                    horst_url=course_data.get('horst_url')
-                )
-                
-                db.session.add(course)
-                imported_courses.append(course)
+                    horst_url=course_data.get('horst_url'),
+                    capacity=course_data.get('capacity')
+                ))
                 
             except Exception as e:
                 errors.append(f"Zeile {i+1}: {str(e)}")
         
-        db.session.commit()
-        
-        return jsonify({
-            'message': f'{len(imported_courses)} Kurse erfolgreich importiert',
-            'imported_count': len(imported_courses),
-            'errors': errors
-        }), 201
+        return save_imported_courses(timetable, imported_courses, errors, mode, delete_missing)
         
     except json.JSONDecodeError:
         return jsonify({'error': 'Ungültige JSON-Datei'}), 400
 
-def import_from_csv(file, timetable):
+def import_from_csv(file, timetable, mode='append', delete_missing=False):
     """CSV Import"""
+    import pandas as pd
     try:
-        # Read CSV
-        content = file.read().decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(content))
-        
-        imported_courses = []
-        errors = []
-        
-        for i, row in enumerate(csv_reader):
-            try:
-                # Required fields
-                if not row.get('Name') and not row.get('name'):
-                    errors.append(f"Zeile {i+2}: Name fehlt")
-                    continue
-                
-                name = row.get('Name') or row.get('name')
-                
-                # Parse times
-                start_time_str = row.get('Start Time') or row.get('Startzeit') or row.get('start_time')
-                end_time_str = row.get('End Time') or row.get('Endzeit') or row.get('end_time')
-                
-                start_time = parse_time_flexible(start_time_str)
-                end_time = parse_time_flexible(end_time_str)
-                
-                if not start_time or not end_time:
-                    errors.append(f"Zeile {i+2}: Ungültige Zeitangaben")
-                    continue
-                
-                # Parse day
-                day_str = row.get('Day') or row.get('Wochentag') or row.get('day_of_week')
-                day_of_week = get_day_number(day_str)
-                
-                if day_of_week is None:
-                    errors.append(f"Zeile {i+2}: Ungültiger Wochentag")
-                    continue
-                
-                # Create course
-                course = Course(
-                    timetable_id=timetable.id,
-                    name=name,
-                    code=row.get('Code') or row.get('code'),
-                    instructor=row.get('Instructor') or row.get('Dozent') or row.get('instructor'),
-                    room=row.get('Room') or row.get('Raum') or row.get('room'),
-                    description=row.get('Description') or row.get('Beschreibung') or row.get('description'),
-                    color=row.get('Color') or row.get('Farbe') or row.get('color', '#3498db'),
-                    day_of_week=day_of_week,
-                    start_time=start_time,
-                    end_time=end_time,
-                    course_type=row.get('Type') or row.get('Typ') or row.get('course_type', 'Vorlesung'),
-                    credits=int(row['Credits']) if row.get('Credits') and row['Credits'].isdigit() else None,
-                    horst_url=row.get('Horst URL') or row.get('horst_url')
-                )
-                
-                db.session.add(course)
-                imported_courses.append(course)
-                
-            except Exception as e:
-                errors.append(f"Zeile {i+2}: {str(e)}")
-        
-        db.session.commit()
+        # Read CSV (alle Zellen als Text, leere Zellen bleiben leer)
+        df = pd.read_csv(file, dtype=str, keep_default_na=False, encoding='utf-8')
         
-        return jsonify({
-            'message': f'{len(imported_courses)} Kurse erfolgreich importiert',
-            'imported_count': len(imported_courses),
-            'errors': errors
-        }), 201
+        courses, errors = parse_course_frame(df, CSV_COLUMNS)
+        return save_imported_courses(timetable, courses, errors, mode, delete_missing)
         
     except Exception as e:
         return jsonify({'error': f'CSV-Import fehlgeschlagen: {str(e)}'}), 400
 
-def import_from_excel(file, timetable):
+def excel_engine():
+    """calamine (Rust) ist beim Lesen ein Vielfaches schneller als openpyxl, aber optional"""
+    try:
+        import python_calamine  # noqa: F401
+        return 'calamine'
+    except ImportError:
+        return 'openpyxl'
+
+def import_from_excel(file, timetable, mode='append', delete_missing=False):
     """Excel Import"""
+    import pandas as pd
     try:
         # Read Excel file
-        df = pd.read_excel(file, sheet_name=0)  # First sheet
+        df = pd.read_excel(file, sheet_name=0, engine=excel_engine())  # First sheet
         
-        imported_courses = []
-        errors = []
-        
-        for i, row in df.iterrows():
-            try:
-                # Required fields
-                name = row.get('Name') or row.get('name')
-                if pd.isna(name) or not name:
-                    errors.append(f"Zeile {i+2}: Name fehlt")
-                    continue
-                
-                # Parse times
-                start_time_str = row.get('Startzeit') or row.get('Start Time') or row.get('start_time')
-                end_time_str = row.get('Endzeit') or row.get('End Time') or row.get('end_time')
-                
-                start_time = parse_time_flexible(start_time_str)
-                end_time = parse_time_flexible(end_time_str)
-                
-                if not start_time or not end_time:
-                    errors.append(f"Zeile {i+2}: Ungültige Zeitangaben")
-                    continue
-                
-                # Parse day
-                day_str = row.get('Wochentag') or row.get('Day') or row.get('day_of_week')
-                day_of_week = get_day_number(day_str)
-                
-                if day_of_week is None:
-                    errors.append(f"Zeile {i+2}: Ungültiger Wochentag")
-                    continue
-                
-                # Create course
-                course = Course(
-                    timetable_id=timetable.id,
-                    name=str(name),
-                    code=str(row.get('Code', '')) if not pd.isna(row.get('Code')) else None,
-                    instructor=str(row.get('Dozent', '')) if not pd.isna(row.get('Dozent')) else None,
-                    room=str(row.get('Raum', '')) if not pd.isna(row.get('Raum')) else None,
-                    description=str(row.get('Beschreibung', '')) if not pd.isna(row.get('Beschreibung')) else None,
-                    color=str(row.get('Farbe', '#3498db')) if not pd.isna(row.get('Farbe')) else '#3498db',
-                    day_of_week=day_of_week,
-                    start_time=start_time,
-                    end_time=end_time,
-                    course_type=str(row.get('Typ', 'Vorlesung')) if not pd.isna(row.get('Typ')) else 'Vorlesung',
-                    credits=int(row['ECTS']) if not pd.isna(row.get('ECTS')) and str(row.get('ECTS')).isdigit() else None,
-                    horst_url=str(row.get('Horst URL', '')) if not pd.isna(row.get('Horst URL')) else None
-                )
-                
-                db.session.add(course)
-                imported_courses.append(course)
-                
-            except Exception as e:
-                errors.append(f"Zeile {i+2}: {str(e)}")
-        
-        db.session.commit()
-        
-        return jsonify({
-            'message': f'{len(imported_courses)} Kurse erfolgreich importiert',
-            'imported_count': len(imported_courses),
-            'errors': errors
-        }), 201
+        courses, errors = parse_course_frame(df, EXCEL_COLUMNS)
+        return save_imported_courses(timetable, courses, errors, mode, delete_missing)
         
     except Exception as e:
         return jsonify({'error': f'Excel-Import fehlgeschlagen: {str(e)}'}), 400
@@ -464,41 +599,36 @@ def import_from_excel(file, timetable):
 @export_import_bp.route('/template/<format>', methods=['GET'])
 @jwt_required()
 def download_template(format):
-    """Import-Template herunterladen"""
+    """Import-Template herunterladen (einmalig vorgebaut, siehe app/export_cache.py)"""
     try:
         if format not in ['csv', 'xlsx']:
             return jsonify({'error': 'Ungültiges Template-Format'}), 400
         
-        if format == 'csv':
-            return create_csv_template()
-        elif format == 'xlsx':
-            return create_excel_template()
+        cache = current_app.extensions['export_cache']
+        cache.prebuild_templates([format])  # falls das Deployment ohne create_tables.py lief
+        return send_file(
+            cache.template_path(format),
+            mimetype=EXPORT_MIMETYPES[format],
+            as_attachment=True,
+            download_name=f'stundenplan_template.{format}',
+            conditional=True
+        )
             
     except Exception as e:
         return jsonify({'error': f'Template konnte nicht erstellt werden: {str(e)}'}), 500
 
-def create_csv_template():
+def create_csv_template(path):
     """CSV Template erstellen"""
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header with example
-    writer.writerow(['Name', 'Code', 'Instructor', 'Room', 'Day', 'Start Time', 'End Time', 'Type', 'Credits', 'Description', 'Color', 'Horst URL'])
-    writer.writerow(['Mathematik I', 'MATH101', 'Prof. Müller', 'A1.01', 'Montag', '08:00', '09:30', 'Vorlesung', '5', 'Grundlagen der Mathematik', '#3498db', 'https://horst.example.com/math101'])
-    
-    file_buffer = io.BytesIO()
-    file_buffer.write(output.getvalue().encode('utf-8'))
-    file_buffer.seek(0)
-    
-    return send_file(
-        file_buffer,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name='stundenplan_template.csv'
-    )
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        
+        # Header with example
+        writer.writerow(['Name', 'Code', 'Instructor', 'Room', 'Day', 'Start Time', 'End Time', 'Type', 'Credits', 'Description', 'Color', 'Horst URL'])
+        writer.writerow(['Mathematik I', 'MATH101', 'Prof. Müller', 'A1.01', 'Montag', '08:00', '09:30', 'Vorlesung', '5', 'Grundlagen der Mathematik', '#3498db', 'https://horst.example.com/math101'])
 
-def create_excel_template():
+def create_excel_template(path):
     """Excel Template erstellen"""
+    import pandas as pd
     data = [{
         'Name': 'Mathematik I',
         'Code': 'MATH101',
@@ -514,14 +644,9 @@ def create_excel_template():
         'Horst URL': 'https://horst.example.com/math101'
     }]
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-        with pd.ExcelWriter(tmp_file.name, engine='openpyxl') as writer:
-            df = pd.DataFrame(data)
-            df.to_excel(writer, sheet_name='Stundenplan', index=False)
-        
-        return send_file(
-            tmp_file.name,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name='stundenplan_template.xlsx'
-        )
\ No newline at end of file
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        df = pd.DataFrame(data)
+        df.to_excel(writer, sheet_name='Stundenplan', index=False)
+
+# Vorbau der Templates (app/export_cache.py)
+TEMPLATE_BUILDERS = {'csv': create_csv_template, 'xlsx': create_excel_template}
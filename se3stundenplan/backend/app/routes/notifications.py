@@ -4,6 +4,9 @@ from app import db
 from app.models import User, Course, Notification, Timetable
 from datetime import datetime, timedelta, time, date
 import calendar
+from app.batch import parse_id_list
+from app.cache import cached_json
+from app.single_flight import query_signature
 
 notifications_bp = Blueprint('notifications', __name__)
 
@@ -45,34 +48,41 @@ def create_course_notifications(course, user):
 def get_user_notifications():
     """Alle Benachrichtigungen des Benutzers abrufen"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         
         # Query parameters
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
         limit = int(request.args.get('limit', 50))
         
-        query = Notification.query.filter_by(user_id=current_user_id)
-        
-        if unread_only:
-            query = query.filter_by(is_read=False)
-        
-        notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
-        
-        # Count unread notifications
-        unread_count = Notification.query.filter_by(
-            user_id=current_user_id, 
-            is_read=False
-        ).count()
-        
-        return jsonify({
-            'notifications': [notification.to_dict() for notification in notifications],
-            'count': len(notifications),
-            'unread_count': unread_count
-        }), 200
+        return cached_json(
+            query_signature('notifications.list', user=current_user_id, unread_only=unread_only, limit=limit),
+            lambda: build_user_notifications(current_user_id, unread_only, limit),
+            tags=(f'user:{current_user_id}',)
+        )
         
     except Exception as e:
         return jsonify({'error': f'Benachrichtigungen konnten nicht geladen werden: {str(e)}'}), 500
 
+def build_user_notifications(user_id, unread_only, limit):
+    query = Notification.query.filter_by(user_id=user_id)
+    
+    if unread_only:
+        query = query.filter_by(is_read=False)
+    
+    notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
+    
+    # Count unread notifications
+    unread_count = Notification.query.filter_by(
+        user_id=user_id, 
+        is_read=False
+    ).count()
+    
+    return {
+        'notifications': [notification.to_dict() for notification in notifications],
+        'count': len(notifications),
+        'unread_count': unread_count
+    }, 200
+
 @notifications_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_notification():
@@ -245,6 +255,55 @@ def mark_all_notifications_read():
         db.session.rollback()
         return jsonify({'error': f'Status konnte nicht aktualisiert werden: {str(e)}'}), 500
 
+@notifications_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_notifications():
+    """Mehrere Benachrichtigungen per ID-Liste als gelesen/ungelesen markieren oder löschen"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'Keine Daten empfangen'}), 400
+        
+        action = data.get('action')
+        if action not in ('read', 'unread', 'delete'):
+            return jsonify({'error': 'action muss read, unread oder delete sein'}), 400
+        
+        ids, error = parse_id_list(data.get('ids'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Eigentümerschaft mit einer Abfrage für den ganzen Batch prüfen
+        owned_ids = {
+            notification_id for (notification_id,) in db.session.query(Notification.id).filter(
+                Notification.id.in_(ids),
+                Notification.user_id == current_user_id
+            )
+        }
+        
+        if owned_ids:
+            query = Notification.query.filter(Notification.id.in_(owned_ids))
+            if action == 'delete':
+                query.delete(synchronize_session=False)
+            else:
+                query.update({'is_read': action == 'read'}, synchronize_session=False)
+            db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(owned_ids)} Benachrichtigungen verarbeitet',
+            'results': [
+                {'id': notification_id, 'status': 'ok'} if notification_id in owned_ids
+                else {'id': notification_id, 'status': 'not_found', 'error': 'Benachrichtigung nicht gefunden'}
+                for notification_id in ids
+            ],
+            'processed': len(owned_ids)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Batch konnte nicht verarbeitet werden: {str(e)}'}), 500
+
 @notifications_bp.route('/course/<int:course_id>/generate', methods=['POST'])
 @jwt_required()
 def generate_course_notifications(course_id):
@@ -0,0 +1,112 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import db
+from app.models import Timetable, Course, CourseSession, CourseComment, EnrolledCourse, Notification, ChangeLog
+from app.change_log import UPSERT, settled_cursor, current_cursor
+from sqlalchemy import func
+
+sync_bp = Blueprint('sync', __name__)
+
+# Entität im Protokoll -> (Modell, Schlüssel in der Antwort)
+SYNC_ENTITIES = {
+    'timetable': (Timetable, 'timetables'),
+    'course': (Course, 'courses'),
+    'session': (CourseSession, 'sessions'),
+    'comment': (CourseComment, 'comments'),
+    'enrollment': (EnrolledCourse, 'enrollments'),
+    'notification': (Notification, 'notifications'),
+}
+
+def empty_payload():
+    payload = {key: [] for _, key in SYNC_ENTITIES.values()}
+    payload['deleted'] = {key: [] for _, key in SYNC_ENTITIES.values()}
+    return payload
+
+def full_snapshot(user_id):
+    """Kompletter Datenstand des Benutzers (erster Sync oder Cursor zu alt)"""
+    payload = empty_payload()
+    timetables = Timetable.query.filter_by(user_id=user_id).all()
+    timetable_ids = [timetable.id for timetable in timetables]
+    courses = Course.query.filter(Course.timetable_id.in_(timetable_ids)).all() if timetable_ids else []
+    course_ids = [course.id for course in courses]
+
+    payload['timetables'] = [timetable.to_dict() for timetable in timetables]
+    payload['courses'] = [course.to_dict() for course in courses]
+    if course_ids:
+        payload['sessions'] = [s.to_dict() for s in CourseSession.query.filter(CourseSession.course_id.in_(course_ids)).all()]
+        payload['comments'] = [c.to_dict() for c in CourseComment.query.filter(CourseComment.course_id.in_(course_ids)).all()]
+    payload['enrollments'] = [e.to_dict() for e in EnrolledCourse.query.filter_by(user_id=user_id).all()]
+    payload['notifications'] = [n.to_dict() for n in Notification.query.filter_by(user_id=user_id).all()]
+    return payload
+
+def delta_since(user_id, since, limit):
+    """Änderungen seit dem Cursor, je Entität nur der letzte Stand"""
+    rows = db.session.query(
+        ChangeLog.seq, ChangeLog.changed_at, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op
+    ).filter(
+        ChangeLog.user_id == user_id,
+        ChangeLog.seq > since
+    ).order_by(ChangeLog.seq).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for row in rows:
+        latest[(row.entity, row.entity_id)] = row.op
+
+    payload = empty_payload()
+    upserts = {}
+    for (entity, entity_id), op in latest.items():
+        if entity not in SYNC_ENTITIES:
+            continue
+        if op == UPSERT:
+            upserts.setdefault(entity, set()).add(entity_id)
+        else:
+            payload['deleted'][SYNC_ENTITIES[entity][1]].append(entity_id)
+
+    # Eine Abfrage pro Entitätstyp
+    for entity, ids in upserts.items():
+        model, key = SYNC_ENTITIES[entity]
+        found = model.query.filter(model.id.in_(ids)).all()
+        payload[key] = [obj.to_dict() for obj in found]
+        # Inzwischen gelöscht, Tombstone folgt ggf. erst im nächsten Block
+        payload['deleted'][key].extend(sorted(ids - {obj.id for obj in found}))
+
+    return payload, [(row.seq, row.changed_at) for row in rows], has_more
+
+# =================== DELTA SYNC ===================
+
+@sync_bp.route('', methods=['GET'])
+@jwt_required()
+def sync():
+    """Nur Änderungen seit ?since=<cursor> liefern (ohne Cursor: Voll-Sync)"""
+    try:
+        current_user_id = int(get_jwt_identity())
+        settle_seconds = current_app.config['SYNC_SETTLE_SECONDS']
+        limit = min(request.args.get('limit', current_app.config['SYNC_MAX_CHANGES'], type=int),
+                    current_app.config['SYNC_MAX_CHANGES'])
+
+        since = request.args.get('since', type=int)
+        oldest = db.session.query(func.min(ChangeLog.seq)).scalar()
+        # Cursor liegt vor dem ältesten noch vorhandenen Protokolleintrag -> Voll-Sync
+        expired = since is not None and since > 0 and (oldest is None or since < oldest - 1)
+
+        if since is None or since < 0 or expired:
+            cursor = current_cursor(db.session, settle_seconds)
+            payload = full_snapshot(current_user_id)
+            payload.update({'cursor': cursor, 'full': True, 'has_more': False})
+            return jsonify(payload), 200
+
+        payload, seen, has_more = delta_since(current_user_id, since, max(limit, 1))
+        cursor = settled_cursor(seen, since, settle_seconds)
+        payload.update({
+            'cursor': cursor,
+            'full': False,
+            # Weiterblättern nur sinnvoll, wenn der Cursor bis zum Blockende vorgerückt ist
+            'has_more': has_more and bool(seen) and cursor == seen[-1][0]
+        })
+        return jsonify(payload), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Synchronisation fehlgeschlagen: {str(e)}'}), 500
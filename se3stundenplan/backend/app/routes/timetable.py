@@ -1,8 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import Timetable, User
-from datetime import datetime
+from app.models import Timetable, User, Course, CourseSession
+from app.ics_feed import feed_token, read_feed_token, timetable_version, feed_etag, render_calendar
+from app.occurrences import build_plan, periods_digest
+from app.cache import cached_json
+from app.single_flight import query_signature
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, func, select
 
 timetable_bp = Blueprint('timetable', __name__)
 
@@ -11,21 +16,24 @@ timetable_bp = Blueprint('timetable', __name__)
 def get_user_timetables():
     """Alle Stundenpläne des Benutzers abrufen"""
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        current_user_id = int(get_jwt_identity())
+        return cached_json(query_signature('timetable.list', user=current_user_id),
+                           lambda: build_user_timetables(current_user_id), tags=(f'user:{current_user_id}',))
 
-        if not user:
-            return jsonify({'error': 'Benutzer nicht gefunden'}), 404
+    except Exception as e:
+        return jsonify({'error': f'Stundenpläne konnten nicht geladen werden: {str(e)}'}), 500
 
-        timetables = Timetable.query.filter_by(user_id=current_user_id).all()
 
-        return jsonify({
-            'timetables': [timetable.to_dict() for timetable in timetables],
-            'count': len(timetables)
-        }), 200
+def build_user_timetables(user_id):
+    user = User.query.get(user_id)
+    if not user:
+        return {'error': 'Benutzer nicht gefunden'}, 404
 
-    except Exception as e:
-        return jsonify({'error': f'Stundenpläne konnten nicht geladen werden: {str(e)}'}), 500
+    timetables = Timetable.query.filter_by(user_id=user_id).all()
+    return {
+        'timetables': [timetable.to_dict() for timetable in timetables],
+        'count': len(timetables)
+    }, 200
 
 
 @timetable_bp.route('/', methods=['POST'])
@@ -77,22 +85,27 @@ def create_timetable():
 def get_timetable(timetable_id):
     """Spezifischen Stundenplan mit Kursen abrufen"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
+        return cached_json(query_signature('timetable.get', id=timetable_id, user=current_user_id),
+                           lambda: build_timetable(timetable_id, current_user_id),
+                           tags=(f'user:{current_user_id}', f'timetable:{timetable_id}'))
 
-        timetable = Timetable.query.filter_by(
-            id=timetable_id,
-            user_id=current_user_id
-        ).first()
+    except Exception as e:
+        return jsonify({'error': f'Stundenplan konnte nicht geladen werden: {str(e)}'}), 500
 
-        if not timetable:
-            return jsonify({'error': 'Stundenplan nicht gefunden'}), 404
 
-        return jsonify({
-            'timetable': timetable.to_dict(include_courses=True)
-        }), 200
+def build_timetable(timetable_id, user_id):
+    timetable = Timetable.query.filter_by(
+        id=timetable_id,
+        user_id=user_id
+    ).first()
 
-    except Exception as e:
-        return jsonify({'error': f'Stundenplan konnte nicht geladen werden: {str(e)}'}), 500
+    if not timetable:
+        return {'error': 'Stundenplan nicht gefunden'}, 404
+
+    return {
+        'timetable': timetable.to_dict(include_courses=True)
+    }, 200
 
 
 @timetable_bp.route('/<int:timetable_id>', methods=['PUT'])
@@ -306,3 +319,168 @@ def duplicate_timetable(timetable_id):
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Stundenplan konnte nicht dupliziert werden: {str(e)}'}), 500
+
+
+# =================== STATISTIK ===================
+
+@timetable_bp.route('/<int:timetable_id>/statistics', methods=['GET'])
+@jwt_required()
+def get_timetable_statistics(timetable_id):
+    """Kurse, ECTS, Typen und Wochentage eines Stundenplans (eine GROUP BY-Abfrage)"""
+    try:
+        current_user_id = int(get_jwt_identity())
+
+        # Gruppen (Typ, Tag) für eigene Stundenpläne; Summen werden aus den wenigen Gruppen gebildet
+        rows = db.session.execute(
+            select(Course.course_type, Course.day_of_week, func.count(Course.id), func.sum(Course.credits))
+            .select_from(Timetable)
+            .outerjoin(Course, and_(Course.timetable_id == Timetable.id, Course.is_active == True))
+            .where(Timetable.id == timetable_id, Timetable.user_id == current_user_id)
+            .group_by(Course.course_type, Course.day_of_week)
+        ).all()
+        if not rows:
+            return jsonify({'error': 'Stundenplan nicht gefunden'}), 404
+
+        course_types, days_distribution = {}, {}
+        total_courses = total_credits = 0
+        for course_type, day, count, credits in rows:
+            if not count:
+                continue  # Stundenplan ohne Kurse (Outer Join)
+            course_types[course_type] = course_types.get(course_type, 0) + count
+            days_distribution[day] = days_distribution.get(day, 0) + count
+            total_courses += count
+            total_credits += credits or 0
+
+        return jsonify({
+            'timetable_id': timetable_id,
+            'total_courses': total_courses,
+            'total_credits': total_credits,
+            'course_types': course_types,
+            'days_distribution': days_distribution
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Statistik konnte nicht geladen werden: {str(e)}'}), 500
+
+
+# =================== KALENDER-FEED ===================
+
+@timetable_bp.route('/<int:timetable_id>/calendar-feed', methods=['GET'])
+@jwt_required()
+def get_calendar_feed_url(timetable_id):
+    """Abo-URL für den iCalendar-Feed eines Stundenplans"""
+    try:
+        current_user_id = int(get_jwt_identity())
+
+        timetable = Timetable.query.filter_by(id=timetable_id, user_id=current_user_id).first()
+        if not timetable:
+            return jsonify({'error': 'Stundenplan nicht gefunden'}), 404
+
+        token = feed_token(current_app.config['SECRET_KEY'], timetable.id, current_user_id)
+        return jsonify({
+            'url': url_for('timetable.calendar_feed', timetable_id=timetable.id, token=token, _external=True),
+            'token': token
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Kalender-Feed konnte nicht erstellt werden: {str(e)}'}), 500
+
+
+@timetable_bp.route('/<int:timetable_id>/calendar.ics', methods=['GET'])
+def calendar_feed(timetable_id):
+    """iCalendar-Feed (Token statt Login, da Kalender-Apps keine JWTs senden)"""
+    try:
+        user_id = read_feed_token(current_app.config['SECRET_KEY'], request.args.get('token', ''), timetable_id)
+        if user_id is None:
+            return jsonify({'error': 'Ungültiger Kalender-Token'}), 403
+
+        # Wiederholte Abfragen: eine Indexabfrage für die Version, kein ORM
+        version = timetable_version(db.session, user_id)
+        etag = feed_etag(timetable_id, version)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            cache = current_app.extensions['ics_feed_cache']
+            body = cache.get((timetable_id, version))
+            if body is None:
+                timetable = Timetable.query.filter_by(id=timetable_id, user_id=user_id).first()
+                if not timetable:
+                    return jsonify({'error': 'Stundenplan nicht gefunden'}), 404
+
+                courses = Course.query.filter_by(timetable_id=timetable.id, is_active=True) \
+                    .order_by(Course.day_of_week, Course.start_time).all()
+                sessions_by_course = {}
+                if courses:
+                    for session in CourseSession.query.filter(
+                            CourseSession.course_id.in_([course.id for course in courses])
+                    ).order_by(CourseSession.session_date):
+                        sessions_by_course.setdefault(session.course_id, []).append(session)
+
+                body = render_calendar(timetable, courses, sessions_by_course)
+                cache.put((timetable_id, version), body)
+
+            response = Response(body, mimetype='text/calendar')
+            response.headers['Content-Disposition'] = f'inline; filename="stundenplan-{timetable_id}.ics"'
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': f'Kalender-Feed konnte nicht geladen werden: {str(e)}'}), 500
+
+
+# =================== TERMINE ===================
+
+@timetable_bp.route('/<int:timetable_id>/calendar', methods=['GET'])
+@jwt_required()
+def get_calendar(timetable_id):
+    """Datierte Termine eines Stundenplans im Bereich ?from=&to= (Standard: vier Wochen ab heute)"""
+    try:
+        current_user_id = int(get_jwt_identity())
+
+        try:
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') else date.today()
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else start + timedelta(days=27)
+        except ValueError:
+            return jsonify({'error': 'Ungültiges Datum, erwartet JJJJ-MM-TT'}), 400
+        if end < start:
+            return jsonify({'error': '"to" liegt vor "from"'}), 400
+        if (end - start).days >= current_app.config['CALENDAR_MAX_DAYS']:
+            return jsonify({'error': f"Zeitraum zu lang (maximal {current_app.config['CALENDAR_MAX_DAYS']} Tage)"}), 400
+
+        # Version zuerst: bei unveränderten Daten weder Stundenplan noch Kurse laden
+        version = timetable_version(db.session, current_user_id)
+        lecture_free = current_app.extensions['lecture_free_periods']
+        periods = periods_digest(lecture_free)
+        etag = f'calendar-{timetable_id}-{version}-{periods}-{start.isoformat()}-{end.isoformat()}'
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        # Schlüssel enthält den Benutzer: ein Plan wird nur an seinen Besitzer ausgeliefert
+        cache = current_app.extensions['occurrence_cache']
+        key = (timetable_id, (current_user_id, version, periods))
+        plan = cache.get(key)
+        if plan is None:
+            timetable = Timetable.query.filter_by(id=timetable_id, user_id=current_user_id).first()
+            if not timetable:
+                return jsonify({'error': 'Stundenplan nicht gefunden'}), 404
+            plan = build_plan(version, timetable, lecture_free)
+            cache.put(key, plan)
+
+        occurrences = plan.expand(start, end)
+        response = jsonify({
+            'timetable_id': timetable_id,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'occurrences': occurrences,
+            'count': len(occurrences)
+        })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': f'Termine konnten nicht geladen werden: {str(e)}'}), 500
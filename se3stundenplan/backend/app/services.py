@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func
 from app.models import Course, Conflict, Schedule
 from datetime import datetime, time
 from typing import List
@@ -326,33 +326,35 @@ def get_schedule_statistics(db: Session, schedule_id: int, user_id: int) -> dict
     if not schedule:
         return None
     
-    courses = db.query(Course).filter(Course.schedule_id == schedule_id).all()
-    conflicts = db.query(Conflict).filter(
+    # Aggregate in SQL: one row per (type, day, mandatory) group instead of every course
+    groups = db.query(
+        Course.course_type, Course.day_of_week, Course.is_mandatory,
+        func.count(Course.id), func.sum(Course.credits)
+    ).filter(Course.schedule_id == schedule_id).group_by(
+        Course.course_type, Course.day_of_week, Course.is_mandatory
+    ).all()
+    total_conflicts = db.query(func.count(Conflict.id)).filter(
         Conflict.schedule_id == schedule_id,
         Conflict.resolved == False
-    ).all()
-    
-    # Calculate total credits
-    total_credits = sum(course.credits or 0 for course in courses)
+    ).scalar()
     
-    # Count by course type
     course_types = {}
-    for course in courses:
-        course_type = course.course_type
-        course_types[course_type] = course_types.get(course_type, 0) + 1
-    
-    # Count by day
     days_count = {}
-    for course in courses:
-        day = course.day_of_week
-        days_count[day] = days_count.get(day, 0) + 1
+    total_courses = total_credits = mandatory = 0
+    for course_type, day, is_mandatory, count, credits in groups:
+        course_types[course_type] = course_types.get(course_type, 0) + count
+        days_count[day] = days_count.get(day, 0) + count
+        total_courses += count
+        total_credits += credits or 0
+        if is_mandatory:
+            mandatory += count
     
     return {
-        "total_courses": len(courses),
+        "total_courses": total_courses,
         "total_credits": total_credits,
-        "total_conflicts": len(conflicts),
+        "total_conflicts": total_conflicts,
         "course_types": course_types,
         "days_distribution": days_count,
-        "mandatory_courses": len([c for c in courses if c.is_mandatory]),
-        "optional_courses": len([c for c in courses if not c.is_mandatory])
+        "mandatory_courses": mandatory,
+        "optional_courses": total_courses - mandatory
     }
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Single-Flight für identische, heiße Leseabfragen
+
+Gleichzeitige Anfragen mit derselben normalisierten Abfrage-Signatur teilen
+sich innerhalb eines Worker-Prozesses eine einzige Ausführung: die erste
+Anfrage (Leader) fragt die Datenbank ab und serialisiert das Ergebnis, alle
+weiteren warten darauf und bekommen dieselben Bytes. Gehalten wird nur die
+laufende Ausführung; wiederholte Anfragen bedient der Cache-Layer
+(app/cache.py), der Einträge über Tag-Versionen invalidiert.
+"""
+import os
+import threading
+
+
+class _Call:
+    """Eine laufende bzw. abgeschlossene Ausführung"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Koalesziert gleichzeitige Aufrufe mit gleichem Schlüssel (thread-sicher)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._calls = {}
+            self.requests = 0
+            self.coalesced = 0
+            self.executions = 0
+            self.errors = 0
+
+    def do(self, key, fn, wait_timeout=None):
+        """
+        fn() für key ausführen oder auf die laufende Ausführung warten.
+
+        Fehler werden an alle Wartenden weitergereicht.
+        """
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            if call.done.wait(wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            # Leader hängt: selbst ausführen statt endlos zu warten
+            return fn()
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def snapshot(self):
+        with self._lock:
+            requests = self.requests
+            return {
+                'pid': os.getpid(),
+                'requests': requests,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'coalesce_ratio': round(self.coalesced / requests, 4) if requests else 0.0,
+                'in_flight': len(self._calls),
+            }
+
+
+def register_single_flight(app):
+    """Ein Single-Flight-Layer pro App (und damit pro Worker-Prozess)"""
+    app.extensions['single_flight'] = SingleFlight()
+
+
+def query_signature(name, **params):
+    """Normalisierte Signatur: leere Parameter weglassen, Reihenfolge egal"""
+    parts = [f'{key}={params[key]}' for key in sorted(params) if params[key] not in (None, '')]
+    return f"{name}?{'&'.join(parts)}"
@@ -0,0 +1,108 @@
+"""
+Globale Zähler für Status- und Dashboard-Endpoints
+
+COUNT(*) über ganze Tabellen wird mit der Tabellengröße teurer. Die Zähler
+werden deshalb pro Worker gehalten und höchstens alle STATUS_COUNTERS_TTL
+Sekunden neu ermittelt: die erste Anfrage wartet, danach liefern Anfragen
+sofort den letzten Stand und stoßen bei Bedarf eine Aktualisierung im
+Hintergrund an (stale-while-revalidate).
+
+STATUS_COUNTERS_MODE='estimate' liest auf MySQL die Zeilenzahlen aus
+information_schema (InnoDB-Statistik, ungefähr, aber konstant schnell);
+andere Datenbanken zählen exakt.
+"""
+import os
+import threading
+import time as clock
+
+from sqlalchemy import bindparam, func, select, text
+
+COUNTED_TABLES = ('users', 'timetables', 'courses', 'notifications')
+
+ESTIMATE_QUERY = text(
+    'SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES '
+    'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :tables'
+).bindparams(bindparam('tables', expanding=True))
+
+
+def exact_counts(session):
+    """Ein Statement mit einer skalaren Unterabfrage pro Tabelle"""
+    from app.models import User, Timetable, Course, Notification
+    models = {'users': User, 'timetables': Timetable, 'courses': Course, 'notifications': Notification}
+    row = session.execute(select(*(
+        select(func.count()).select_from(models[table]).scalar_subquery().label(table) for table in COUNTED_TABLES
+    ))).one()
+    return dict(row._mapping)
+
+
+def estimated_counts(session):
+    rows = dict(session.execute(ESTIMATE_QUERY, {'tables': list(COUNTED_TABLES)}).all())
+    return {table: int(rows.get(table) or 0) for table in COUNTED_TABLES}
+
+
+class StatusCounters:
+    """Zähler eines Workers mit Zeitstempel, Aktualisierung höchstens einmal gleichzeitig"""
+
+    def __init__(self, app, ttl, mode):
+        self.app = app
+        self.ttl = ttl
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.values = None
+        self.refreshed_at = 0.0
+        self.exact = True
+        self.refreshes = 0
+
+    def _count(self, session):
+        if self.mode == 'estimate' and session.get_bind().dialect.name == 'mysql':
+            return estimated_counts(session), False
+        return exact_counts(session), True
+
+    def refresh(self, session):
+        values, exact = self._count(session)
+        with self._lock:
+            self.values, self.exact = values, exact
+            self.refreshed_at = clock.time()
+            self.refreshes += 1
+            self._refreshing = False
+        return values
+
+    def _refresh_in_background(self):
+        from app import db
+        try:
+            with self.app.app_context():
+                self.refresh(db.session)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self, session):
+        """(Zähler, Alter in Sekunden, exakt?); blockiert nur, solange es noch keine Werte gibt"""
+        with self._lock:
+            values, age = self.values, clock.time() - self.refreshed_at
+            start_refresh = values is not None and age >= self.ttl and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+        if values is None:
+            values, age = self.refresh(session), 0.0
+        elif start_refresh:
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        return values, age, self.exact
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'mode': self.mode,
+                'exact': self.exact,
+                'refreshes': self.refreshes,
+                'age_seconds': round(clock.time() - self.refreshed_at, 1) if self.values is not None else None
+            }
+
+
+def register_status_counters(app):
+    """Ein Zählerstand pro App (und damit pro Worker-Prozess)"""
+    app.extensions['status_counters'] = StatusCounters(
+        app, app.config['STATUS_COUNTERS_TTL'], app.config['STATUS_COUNTERS_MODE']
+    )
@@ -0,0 +1,63 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+# Backend-Verzeichnis in den Pfad aufnehmen, damit "import app" und "import config"
+# auch beim Aufruf aus dem Projekt-Root (make test-backend) funktionieren
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def app_factory(tmp_path):
+    """create_app mit eigener SQLite-Datei unter tmp_path; Config-Werte als Keyword-Argumente überschreiben"""
+    from app import create_app
+    from config import Config
+
+    numbers = itertools.count(1)
+
+    def factory(**overrides):
+        settings = {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / f'app{next(numbers)}.db'}",
+            'SQLALCHEMY_REPLICA_URIS': [],
+            'SQLALCHEMY_ENGINE_OPTIONS': {},
+            'CREATE_TABLES_ON_STARTUP': True,
+            'EXPORT_CACHE_DIR': str(tmp_path / 'exports'),
+            **overrides
+        }
+        return create_app(type('TestConfig', (Config,), settings))
+
+    return factory
+
+
+@pytest.fixture
+def user_factory():
+    """Benutzer mit einem Stundenplan anlegen (im App-Kontext, ohne Commit) -> (user, timetable)"""
+    from app import db
+    from app.models import User, Timetable
+
+    def factory(username, full_name=None, **timetable):
+        user = User(username=username, email=f'{username}@example.com', full_name=full_name or username.title())
+        user.set_password('geheim')
+        db.session.add(user)
+        db.session.flush()
+        timetable = Timetable(user_id=user.id, **{'name': 'WS', **timetable})
+        db.session.add(timetable)
+        db.session.flush()
+        return user, timetable
+
+    return factory
+
+
+@pytest.fixture
+def auth_headers():
+    """Authorization-Header für einen Benutzer (im App-Kontext aufrufen)"""
+    from flask_jwt_extended import create_access_token
+
+    def headers(user_id):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+    return headers
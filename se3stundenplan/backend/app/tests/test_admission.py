@@ -0,0 +1,159 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.admission import upgrade_schema
+from app.models import User, Course, EnrolledCourse, Notification
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make(students, capacity):
+        app = app_factory(SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 16, 'max_overflow': 16},
+                          REQUEST_LOG_ENABLED=False, ADMISSION_WAIT_SECONDS=60)
+        with app.app_context():
+            owner, timetable = user_factory('owner', 'Owner', name='Katalog')
+            course = Course(timetable_id=timetable.id, name='Beliebt', day_of_week=0, capacity=capacity,
+                            start_time=time(8), end_time=time(10))
+            db.session.add(course)
+            db.session.execute(User.__table__.insert(), [
+                {'username': f's{i}', 'email': f's{i}@example.com', 'full_name': f'S {i}', 'password_hash': 'x'}
+                for i in range(students)
+            ])
+            db.session.commit()
+            user_ids = db.session.scalars(select(User.id).where(User.id != owner.id).order_by(User.id)).all()
+            headers = {user_id: auth_headers(user_id) for user_id in user_ids}
+            course_id = course.id
+        return app, headers, course_id
+    return make
+
+
+def counts(app, course_id):
+    with app.app_context():
+        by_status = dict(db.session.execute(
+            select(EnrolledCourse.status, func.count()).where(EnrolledCourse.course_id == course_id)
+            .group_by(EnrolledCourse.status)
+        ).all())
+        return by_status, db.session.get(Course, course_id).enrolled_count
+
+
+def test_rush_on_single_course_never_overbooks(make_client):
+    students, capacity = 600, 100
+    app, headers, course_id = make_client(students, capacity)
+
+    def enroll(user_id):
+        client = app.test_client()
+        response = client.post(f'/api/courses/{course_id}/enroll', json={}, headers=headers[user_id])
+        return response.status_code
+
+    # Jeder Benutzer schickt zwei gleichzeitige Anfragen
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        statuses = list(pool.map(enroll, list(headers) * 2))
+
+    assert statuses.count(201) == capacity
+    assert statuses.count(202) == students - capacity
+    assert statuses.count(409) == students
+    by_status, enrolled_count = counts(app, course_id)
+    assert by_status == {'active': capacity, 'waitlisted': students - capacity}
+    assert enrolled_count == capacity
+    assert app.extensions['admission_queue'].snapshot()['admitted'] == 2 * students
+
+
+def test_freed_seat_promotes_waitlist_in_order(make_client):
+    app, headers, course_id = make_client(4, 2)
+    client = app.test_client()
+    first, second, third, fourth = headers
+
+    for user_id in headers:
+        client.post(f'/api/courses/{course_id}/enroll', json={}, headers=headers[user_id])
+    waiting = client.post(f'/api/courses/{course_id}/enroll', json={}, headers=headers[fourth])
+    assert waiting.status_code == 409
+    full = client.post(f'/api/courses/{course_id}/enroll', json={'waitlist': False}, headers=headers[third])
+    assert full.status_code == 409
+
+    response = client.post(f'/api/courses/{course_id}/unenroll', json={}, headers=headers[first])
+    assert response.get_json()['promoted'] == 1
+    with app.app_context():
+        active = set(db.session.scalars(select(EnrolledCourse.user_id).where(
+            EnrolledCourse.course_id == course_id, EnrolledCourse.status == 'active')))
+        assert active == {second, third}
+        assert db.session.scalar(select(Notification.user_id)) == third
+
+    # Wartende verlassen die Liste ohne Platz freizugeben; Wiedereinschreibung stellt sich hinten an
+    assert client.post(f'/api/courses/{course_id}/unenroll', json={}, headers=headers[fourth]).get_json()['promoted'] == 0
+    again = client.post(f'/api/courses/{course_id}/enroll', json={}, headers=headers[first])
+    assert (again.status_code, again.get_json()['waitlist_position']) == (202, 1)
+    assert counts(app, course_id) == ({'active': 2, 'waitlisted': 1, 'dropped': 1}, 2)
+
+
+def test_capacity_is_validated_and_never_drops_below_enrolled(app_factory, user_factory, auth_headers):
+    app = app_factory()
+    with app.app_context():
+        user, timetable = user_factory('planer')
+        headers = auth_headers(user.id)
+        timetable_id = timetable.id
+        db.session.commit()
+    client = app.test_client()
+
+    course = {'timetable_id': timetable_id, 'name': 'Seminar', 'day_of_week': 0,
+              'start_time': '08:00', 'end_time': '10:00'}
+    assert client.post('/api/courses/', json={**course, 'capacity': -1}, headers=headers).status_code == 400
+    created = client.post('/api/courses/', json={**course, 'capacity': 5}, headers=headers)
+    assert created.status_code == 201
+    course_id = created.get_json()['course']['id']
+    with app.app_context():
+        db.session.get(Course, course_id).enrolled_count = 3
+        db.session.commit()
+
+    assert client.put(f'/api/courses/{course_id}', json={'capacity': 2}, headers=headers).status_code == 400
+    assert client.put(f'/api/courses/{course_id}', json={'capacity': True}, headers=headers).status_code == 400
+    response = client.put('/api/courses/batch', json={'updates': [{'id': course_id, 'capacity': 'viel'}]},
+                          headers=headers)
+    assert response.get_json()['results'][0]['status'] == 'invalid'
+    response = client.put(f'/api/courses/{course_id}', json={'capacity': 3}, headers=headers)
+    assert response.get_json()['course']['capacity'] == 3
+
+    response = client.post('/api/course-catalog/admin/courses', json={'name': 'Katalogkurs', 'code': 'KAT1',
+                                                                      'capacity': 'x'}, headers=headers)
+    assert response.status_code == 400
+
+    # Import-Abgleich: Kapazität unter den belegten Plätzen wird nicht übernommen
+    content = 'Name,Day,Start Time,End Time,Type,Capacity\nSeminar,Montag,08:00,10:00,,{}\n'
+    def upload(capacity):
+        return client.post(f'/api/data/import/{timetable_id}', headers=headers, data={
+            'file': (io.BytesIO(content.format(capacity).encode('utf-8')), 'kurse.csv'), 'mode': 'sync'
+        }, content_type='multipart/form-data').get_json()
+
+    assert upload(1)['diff']['updated'] == []
+    assert upload(8)['diff']['updated'] == [course_id]
+    with app.app_context():
+        assert db.session.get(Course, course_id).capacity == 8
+
+
+def test_upgrade_schema_adds_seat_columns_and_constraint(app_factory):
+    app = app_factory()
+    with app.app_context():
+        # Schema wie vor der Platzvergabe
+        for statement in ['ALTER TABLE courses DROP COLUMN capacity',
+                          'ALTER TABLE courses DROP COLUMN enrolled_count',
+                          'DROP TABLE enrolled_courses',
+                          'CREATE TABLE enrolled_courses (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, '
+                          'course_id INTEGER NOT NULL, enrollment_date DATETIME NOT NULL, '
+                          'status VARCHAR(20) NOT NULL, grade FLOAT, notes TEXT, created_at DATETIME, '
+                          'updated_at DATETIME)']:
+            db.session.execute(text(statement))
+        db.session.commit()
+
+        assert len(upgrade_schema(db.session)) == 4
+        db.session.commit()
+        assert upgrade_schema(db.session) == []
+        db.session.execute(text('INSERT INTO enrolled_courses (user_id, course_id, enrollment_date, status) '
+                                "VALUES (1, 1, '2024-10-14', 'active')"))
+        with pytest.raises(IntegrityError):
+            db.session.execute(text('INSERT INTO enrolled_courses (user_id, course_id, enrollment_date, status) '
+                                    "VALUES (1, 1, '2024-10-14', 'active')"))
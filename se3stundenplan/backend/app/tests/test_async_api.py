@@ -0,0 +1,86 @@
+from datetime import date, datetime, time, timedelta
+
+import jwt as pyjwt
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.async_api import async_lifespan, init_async_engine, register_async_api
+from app.models import Course, CourseSession, Notification
+from config import Config
+
+
+@pytest.fixture
+def make_clients(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory()
+        with app.app_context():
+            user, timetable = user_factory('async', 'Async Test', is_active=True)
+            other, _ = user_factory('andere', is_active=True)
+            for name, code in [('Mathe', 'M1'), ('Algorithmen', 'A1'), ('Mathe', 'M2')]:
+                course = Course(timetable_id=timetable.id, name=name, code=code, day_of_week=0,
+                                start_time=time(8), end_time=time(10))
+                db.session.add(course)
+                db.session.flush()
+                db.session.add(CourseSession(course_id=course.id, session_date=date(2024, 10, 14),
+                                             start_time=time(8), end_time=time(10)))
+            soon = datetime.now() + timedelta(hours=2)
+            db.session.add_all([
+                Notification(user_id=user.id, title='Bald', message='m', notify_time=soon),
+                Notification(user_id=user.id, title='Gelesen', message='m', notify_time=soon, is_read=True),
+                Notification(user_id=other.id, title='Fremd', message='m', notify_time=soon),
+            ])
+            db.session.commit()
+            headers = {'user': auth_headers(user.id), 'other': auth_headers(other.id),
+                       'expired': {'Authorization': 'Bearer ' + create_access_token(
+                           identity=str(user.id), expires_delta=timedelta(seconds=-1))}}
+
+        init_async_engine(type('TestConfig', (Config,), {
+            'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'SQLALCHEMY_ASYNC_DATABASE_URI': None
+        }))
+        api = FastAPI(lifespan=async_lifespan)
+        register_async_api(api)
+        return app.test_client(), TestClient(api), headers
+    return make
+
+
+PATHS = ['/api/timetable/active', '/api/course-catalog/courses', '/api/course-catalog/courses?search=Mathe',
+         '/api/notifications/', '/api/notifications/?unread_only=true', '/api/notifications/upcoming']
+
+
+def test_async_responses_match_flask(make_clients):
+    flask_client, asgi, headers = make_clients()
+    with asgi as async_client:
+        for path in PATHS:
+            expected = flask_client.get(path, headers=headers['user'])
+            response = async_client.get(path, headers=headers['user'])
+            assert (response.status_code, response.json()) == (expected.status_code, expected.get_json()), path
+
+        catalog = async_client.get('/api/course-catalog/courses', headers=headers['user']).json()
+        assert [c['code'] for c in catalog['courses']] == ['A1', 'M1', 'M2']
+        assert all(len(c['sessions']) == 1 for c in catalog['courses'])
+
+
+def test_async_auth_failures_match_flask(make_clients):
+    flask_client, asgi, headers = make_clients()
+    foreign_key = pyjwt.encode({'sub': '1', 'type': 'access', 'exp': datetime.utcnow() + timedelta(hours=1)},
+                               'anderer-schluessel', algorithm='HS256')
+    cases = {
+        'fehlt': {},
+        'kein Bearer': {'Authorization': 'Token abc'},
+        'abgelaufen': headers['expired'],
+        'fremder Schlüssel': {'Authorization': f'Bearer {foreign_key}'},
+    }
+    with asgi as async_client:
+        for name, case in cases.items():
+            expected = flask_client.get('/api/notifications/', headers=case)
+            response = async_client.get('/api/notifications/', headers=case)
+            assert expected.status_code in (401, 422), name
+            assert (response.status_code, response.json()) == (expected.status_code, expected.get_json()), name
+
+        # Token eines anderen Benutzers sieht nur dessen Daten
+        other = async_client.get('/api/notifications/', headers=headers['other']).json()
+        assert [n['title'] for n in other['notifications']] == ['Fremd']
+        assert async_client.get('/api/timetable/active', headers=headers['other']).json()['timetable']['courses'] == []
@@ -0,0 +1,118 @@
+from datetime import datetime, time
+
+import pytest
+
+from app import db
+from app.batch import parse_id_list
+from app.models import ChangeLog, Course, Notification
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory(BATCH_MAX_ITEMS=5, SYNC_SETTLE_SECONDS=0)
+        with app.app_context():
+            user, timetable = user_factory('batch', 'Batch Test')
+            stranger, foreign_timetable = user_factory('fremd')
+            courses = [Course(timetable_id=timetable.id, name=name, day_of_week=0, start_time=start, end_time=end)
+                       for name, start, end in [('Mathe', time(8), time(10)), ('Physik', time(10), time(12))]]
+            foreign = Course(timetable_id=foreign_timetable.id, name='Fremd', day_of_week=0,
+                             start_time=time(8), end_time=time(10))
+            notifications = [Notification(user_id=owner.id, title=title, message='m', notify_time=datetime.now())
+                             for owner, title in [(user, 'A'), (user, 'B'), (user, 'C'), (stranger, 'Fremd')]]
+            db.session.add_all(courses + [foreign] + notifications)
+            db.session.commit()
+            ids = {
+                'courses': [course.id for course in courses], 'foreign_course': foreign.id,
+                'notifications': [notification.id for notification in notifications[:3]],
+                'foreign_notification': notifications[3].id
+            }
+            headers = auth_headers(user.id)
+        return app, app.test_client(), headers, ids
+    return make
+
+
+def test_parse_id_list(app_factory):
+    with app_factory(BATCH_MAX_ITEMS=4).app_context():
+        assert parse_id_list('3, 1,3,,2') == ([3, 1, 2], None)
+        assert parse_id_list([1, '2']) == ([1, 2], None)
+        assert parse_id_list(None) == (None, 'ids ist erforderlich')
+        assert parse_id_list([]) == (None, 'ids muss eine nicht-leere Liste sein')
+        assert parse_id_list('1,x') == (None, 'Ungültige ID: x')
+        assert parse_id_list([1, 2, 3, 4, 5]) == (None, 'Maximal 4 Einträge pro Batch erlaubt')
+
+
+def test_get_courses_batch_skips_foreign_ids(make_client):
+    app, client, headers, ids = make_client()
+    mathe, physik = ids['courses']
+
+    response = client.get(f"/api/courses/batch?ids={physik},{ids['foreign_course']},{mathe}", headers=headers)
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [(r['id'], r['status']) for r in results] == [(physik, 'ok'), (ids['foreign_course'], 'not_found'),
+                                                         (mathe, 'ok')]
+    assert 'course' not in results[1]
+    assert client.get('/api/courses/batch?ids=1,2,3,4,5,6', headers=headers).status_code == 400
+
+
+def test_put_courses_batch_is_all_or_nothing(make_client):
+    app, client, headers, ids = make_client()
+    mathe, physik = ids['courses']
+
+    def put(updates):
+        return client.put('/api/courses/batch', json={'updates': updates}, headers=headers)
+
+    # Fremder Kurs: ganzer Batch abgelehnt, eigener Kurs unverändert
+    response = put([{'id': mathe, 'room': 'A1'}, {'id': ids['foreign_course'], 'room': 'A1'}])
+    assert response.status_code == 404
+    assert [r['status'] for r in response.get_json()['results']] == ['skipped', 'not_found']
+
+    response = put([{'id': mathe, 'start_time': '25:00'}, {'id': physik, 'room': 'B2'}])
+    assert response.status_code == 400
+    assert [r['status'] for r in response.get_json()['results']] == ['invalid', 'skipped']
+
+    assert put([{'id': mathe}, {'id': mathe}]).status_code == 400
+    assert put([{'id': mathe, 'start_time': '09:00', 'end_time': '11:00'}]).status_code == 409
+    with app.app_context():
+        assert [(c.room, c.start_time) for c in Course.query.order_by(Course.id).all()[:2]] == \
+            [(None, time(8)), (None, time(10))]
+
+    # Tausch zweier Termine ist erst nach allen Änderungen konfliktfrei
+    response = put([{'id': mathe, 'start_time': '10:00', 'end_time': '12:00', 'room': 'A1'},
+                    {'id': physik, 'start_time': '08:00', 'end_time': '10:00'}])
+    assert response.status_code == 200
+    with app.app_context():
+        assert [(c.room, c.start_time) for c in Course.query.order_by(Course.id).all()[:2]] == \
+            [('A1', time(10)), (None, time(8))]
+
+
+def test_notifications_batch_updates_and_deletes_with_tombstones(make_client):
+    app, client, headers, ids = make_client()
+    first, second, third = ids['notifications']
+    cursor = client.get('/api/sync', headers=headers).get_json()['cursor']
+
+    def batch(action, notification_ids):
+        return client.post('/api/notifications/batch', json={'action': action, 'ids': notification_ids},
+                           headers=headers)
+
+    assert batch('archive', [first]).status_code == 400
+    assert batch('read', []).status_code == 400
+
+    response = batch('read', [first, second, ids['foreign_notification']])
+    assert response.status_code == 200
+    assert response.get_json()['processed'] == 2
+    assert [r['status'] for r in response.get_json()['results']] == ['ok', 'ok', 'not_found']
+
+    response = batch('delete', [third, ids['foreign_notification']])
+    assert response.get_json()['processed'] == 1
+
+    with app.app_context():
+        assert {n.title: n.is_read for n in Notification.query.all()} == {'A': True, 'B': True, 'Fremd': False}
+        logged = [(row.entity_id, row.op) for row in ChangeLog.query.filter_by(entity='notification')]
+    assert {(first, 'upsert'), (second, 'upsert'), (third, 'delete')} <= set(logged)
+    assert [entry for entry in logged if entry[0] == ids['foreign_notification']] == \
+        [(ids['foreign_notification'], 'upsert')]  # nur das Anlegen, keine Batch-Änderung
+
+    delta = client.get(f'/api/sync?since={cursor}', headers=headers).get_json()
+    assert sorted(n['title'] for n in delta['notifications']) == ['A', 'B']
+    assert delta['deleted']['notifications'] == [third]
@@ -0,0 +1,105 @@
+from datetime import date, datetime, time
+
+import pytest
+from sqlalchemy import event, select
+
+from app import db
+from app.broadcast import CANCELLED, broadcast_session_change, latest_broadcast_key
+from app.models import User, Course, CourseSession, EnrolledCourse, Notification, ChangeLog
+
+STUDENTS = 3000
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory()
+        with app.app_context():
+            owner, timetable = user_factory('dozent', 'Dozent', is_active=True)
+            course = Course(timetable_id=timetable.id, name='Analysis I', day_of_week=0,
+                            start_time=time(8), end_time=time(10))
+            db.session.add(course)
+            db.session.flush()
+            lecture = CourseSession(course_id=course.id, session_date=date(2025, 11, 3), start_time=time(8),
+                                    end_time=time(10), room='H1')
+            db.session.add(lecture)
+            db.session.flush()
+
+            # Jeder 10. Student hat Benachrichtigungen aus, jeder 15. hat den Kurs abgewählt
+            db.session.execute(User.__table__.insert(), [
+                {'id': owner.id + 1 + i, 'username': f's{i}', 'email': f's{i}@example.com', 'password_hash': 'x',
+                 'full_name': f'S {i}', 'notification_enabled': i % 10 != 0} for i in range(STUDENTS)
+            ])
+            db.session.execute(EnrolledCourse.__table__.insert(), [
+                {'user_id': owner.id + 1 + i, 'course_id': course.id, 'enrollment_date': datetime.utcnow(),
+                 'status': 'dropped' if i % 15 == 0 else 'active'} for i in range(STUDENTS)
+            ])
+            db.session.commit()
+            expected = sum(1 for i in range(STUDENTS) if i % 10 != 0 and i % 15 != 0)
+            headers = {user_id: auth_headers(user_id) for user_id in (owner.id, owner.id + 1)}
+            ids = (course.id, lecture.id, owner.id + 1)
+        return app, app.test_client(), headers[owner.id], headers[owner.id + 1], ids, expected
+    return make
+
+
+def test_cancelling_a_session_notifies_enrolled_students_once(make_client):
+    app, client, headers, foreign, (course_id, session_id, first_student), expected = make_client()
+    url = f'/api/courses/{course_id}/sessions/{session_id}'
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    response = client.put(url, json={'is_cancelled': True}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['notified'] == expected
+    assert sum(sql.startswith('INSERT INTO notifications') for sql in statements) == 1
+
+    # Erneut speichern (gleicher Zustand) benachrichtigt niemanden doppelt
+    assert client.put(url, json={'is_cancelled': True, 'description': 'x'}, headers=headers) \
+        .get_json()['notified'] == 0
+
+    # Wieder ansetzen in anderem Raum ist ein neues Ereignis
+    restored = client.put(url, json={'is_cancelled': False, 'room': 'H2'}, headers=headers).get_json()
+    assert (restored['notified'], restored['broadcasts'][0]['kind']) == (expected, 'restored')
+
+    with app.app_context():
+        kinds = db.session.execute(
+            select(Notification.notification_type, db.func.count())
+            .where(Notification.course_id == course_id).group_by(Notification.notification_type)
+        ).all()
+        assert dict(kinds) == {'warning': expected, 'info': expected}
+        silenced = db.session.scalar(select(db.func.count()).select_from(Notification)
+                                     .where(Notification.user_id == first_student))
+        assert silenced == 0
+
+    assert client.put(url, json={'room': 'H3'}, headers=foreign).status_code == 404
+
+
+def test_repeated_transitions_notify_again(make_client):
+    app, client, headers, _, (course_id, session_id, _), expected = make_client()
+    url = f'/api/courses/{course_id}/sessions/{session_id}'
+
+    # Absagen -> ansetzen -> absagen: jeder Übergang ist eine eigene Meldung
+    reached = [client.put(url, json={'is_cancelled': cancelled}, headers=headers).get_json()['notified']
+               for cancelled in (True, False, True)]
+    assert reached == [expected] * 3
+
+    # Raum H2 -> H1 -> H2 ebenso
+    client.put(url, json={'is_cancelled': False}, headers=headers)
+    reached = [client.put(url, json={'room': room}, headers=headers).get_json()['notified']
+               for room in ('H2', 'H1', 'H2')]
+    assert reached == [expected] * 3
+
+    with app.app_context():
+        # Jede Meldung genau einmal im Änderungsprotokoll, auch bei wiederholtem Schlüssel
+        logged = db.session.scalar(select(db.func.count()).select_from(ChangeLog)
+                                   .where(ChangeLog.entity == 'notification'))
+        assert logged == db.session.scalar(select(db.func.count()).select_from(Notification)) == 7 * expected
+        assert latest_broadcast_key(db.session, session_id).endswith('|H2')
+        # Derselbe Übergang zweimal (z.B. doppelt abgeschickt) meldet nur einmal
+        lecture = db.session.get(CourseSession, session_id)
+        lecture.is_cancelled = True
+        db.session.flush()
+        assert db.session.info['broadcasts'][0]['recipients'] == expected
+        assert broadcast_session_change(db.session, lecture, CANCELLED) == 0
+        db.session.rollback()
@@ -0,0 +1,101 @@
+from datetime import time
+
+import pytest
+from sqlalchemy import event, select, text
+
+from app import db
+from app.models import User, Course, EnrolledCourse, ChangeLog
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make(students=6):
+        app = app_factory()
+        with app.app_context():
+            admin, timetable = user_factory('admin', 'Admin', name='Katalog WS')
+            for index in range(students):
+                student = User(username=f's{index}', email=f's{index}@example.com', full_name=f'Student {index}',
+                               student_id=f'2024{index:04d}', password_hash='x')
+                db.session.add(student)
+            courses = {}
+            for name, day, start, end in [('Analysis', 0, 8, 10), ('Algorithmen', 1, 10, 12),
+                                          ('Sport', 0, 9, 11), ('Alt', 3, 8, 10)]:
+                course = Course(timetable_id=timetable.id, name=name, day_of_week=day,
+                                start_time=time(start), end_time=time(end))
+                db.session.add(course)
+                courses[name] = course
+            db.session.flush()
+            first, second, third = (User.query.filter_by(username=f's{index}').one() for index in range(3))
+            # s0 belegt Sport (Konflikt mit Analysis), s1 hat Analysis abgemeldet, s2 ist schon aktiv
+            db.session.add_all([
+                EnrolledCourse(user_id=first.id, course_id=courses['Sport'].id, status='active'),
+                EnrolledCourse(user_id=second.id, course_id=courses['Analysis'].id, status='dropped'),
+                EnrolledCourse(user_id=third.id, course_id=courses['Analysis'].id, status='active'),
+            ])
+            db.session.commit()
+            headers = auth_headers(admin.id)
+            ids = {name: course.id for name, course in courses.items()}
+            ids.update(s0=first.id, s1=second.id, s2=third.id)
+        return app, app.test_client(), headers, ids
+    return make
+
+
+def test_bulk_enrollment_reports_conflicts_and_upserts(make_client):
+    app, client, headers, ids = make_client()
+    body = {'selector': {'student_id_prefix': '2024'}, 'course_ids': [ids['Analysis'], ids['Algorithmen'], 999]}
+
+    dry = client.post('/api/course-catalog/admin/enrollments/bulk', json={**body, 'dry_run': True}, headers=headers)
+    assert dry.status_code == 200
+    with app.app_context():
+        assert db.session.scalar(select(db.func.count()).select_from(EnrolledCourse)) == 3
+
+    statements = []
+    with app.app_context():
+        # Wie DATETIME(0) auf MySQL: gespeicherte Zeitstempel verlieren die Mikrosekunden
+        db.session.execute(text(
+            "CREATE TRIGGER round_created_at AFTER INSERT ON enrolled_courses BEGIN "
+            "UPDATE enrolled_courses SET created_at = substr(created_at, 1, 19) WHERE id = NEW.id; END"
+        ))
+        db.session.commit()
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    report = client.post('/api/course-catalog/admin/enrollments/bulk', json=body, headers=headers).get_json()
+    assert report['users'] == 6
+    assert report['unknown_courses'] == [999]
+    assert report['skipped_users'] == [ids['s0']]
+    assert report['conflicts'] == [{'user_id': ids['s0'], 'course_id': ids['Analysis'],
+                                    'conflicts_with': ids['Sport']}]
+    assert (report['enrolled'], report['reactivated'], report['already_enrolled']) == (8, 1, 1)
+    assert report['skipped_conflict'] == 2
+    # Kein Statement pro Benutzer oder Kurs
+    assert len([sql for sql in statements if 'enrolled_courses' in sql]) <= 6
+    assert dry.get_json()['enrolled'] == report['enrolled']
+
+    with app.app_context():
+        active = set(db.session.execute(
+            select(EnrolledCourse.user_id, EnrolledCourse.course_id).where(EnrolledCourse.status == 'active')
+        ).all())
+        assert (ids['s1'], ids['Analysis']) in active
+        assert (ids['s0'], ids['Analysis']) not in active
+        # 8 neue + 1 reaktivierte Belegung, dazu die beiden Kurse mit geändertem Platzzähler
+        enrolled = set(db.session.scalars(select(EnrolledCourse.id).where(
+            EnrolledCourse.status == 'active', EnrolledCourse.course_id.in_([ids['Analysis'], ids['Algorithmen']]),
+            ~((EnrolledCourse.user_id == ids['s2']) & (EnrolledCourse.course_id == ids['Analysis'])))))
+        logged = set(db.session.execute(select(ChangeLog.entity, ChangeLog.entity_id)).all())
+        assert len(enrolled) == 9
+        assert {('enrollment', enrollment_id) for enrollment_id in enrolled} <= logged
+        assert {('course', ids['Analysis']), ('course', ids['Algorithmen'])} <= logged
+
+    again = client.post('/api/course-catalog/admin/enrollments/bulk', json=body, headers=headers).get_json()
+    assert (again['enrolled'], again['reactivated'], again['already_enrolled']) == (0, 0, 10)
+
+
+def test_bulk_enrollment_skip_course_and_validation(make_client):
+    app, client, headers, ids = make_client()
+    url = '/api/course-catalog/admin/enrollments/bulk'
+    report = client.post(url, json={'selector': {'user_ids': [ids['s0']]}, 'on_conflict': 'skip_course',
+                                    'course_ids': [ids['Analysis'], ids['Algorithmen']]}, headers=headers).get_json()
+    assert (report['enrolled'], report['skipped_conflict'], report['skipped_users']) == (1, 1, [])
+
+    assert client.post(url, json={'selector': {}, 'course_ids': [ids['Analysis']]}, headers=headers).status_code == 400
+    assert client.post(url, json={'selector': {'user_ids': [ids['s0']]}, 'course_ids': [999]},
+                       headers=headers).status_code == 400
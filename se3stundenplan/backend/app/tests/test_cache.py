@@ -0,0 +1,154 @@
+import threading
+import time
+from datetime import date, time as clock_time
+
+import pytest
+
+from app import db
+from app.cache import Cache, RedisBackend, SharedMemoryBackend, Uncacheable
+from app.models import Course, CourseSession
+
+
+def counting(value):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return value
+    return build, calls
+
+
+def test_local_cache_invalidates_by_tag():
+    cache = Cache()
+    build, calls = counting(b'plan')
+    assert cache.get_or_set('k', build, tags=('user:1', 'timetable:2')) == b'plan'
+    assert cache.get_or_set('k', build, tags=('timetable:2', 'user:1')) == b'plan'
+    cache.invalidate('user:2')
+    assert cache.get_or_set('k', build, tags=('user:1', 'timetable:2')) == b'plan'
+    assert len(calls) == 1
+
+    cache.invalidate('timetable:2')
+    cache.get_or_set('k', build, tags=('user:1', 'timetable:2'))
+    assert len(calls) == 2
+
+    def not_found():
+        raise Uncacheable((b'{}', 404))
+    assert cache.get_or_set('missing', not_found) == (b'{}', 404)
+    assert cache.get('missing') is None
+
+
+def test_workers_share_entries_and_invalidations(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    worker_a = Cache(SharedMemoryBackend(path, 100), poll_seconds=0)
+    worker_b = Cache(SharedMemoryBackend(path, 100), poll_seconds=0)
+
+    build, calls = counting(b'katalog')
+    assert worker_a.get_or_set('catalog', build, tags=('catalog',)) == b'katalog'
+    assert worker_b.get_or_set('catalog', build, tags=('catalog',)) == b'katalog'
+    assert len(calls) == 1
+    assert worker_b.snapshot()['shared_hits'] == 1
+
+    # B hat den Eintrag jetzt auch im L1; die Invalidierung von A muss ihn trotzdem verdrängen
+    worker_a.invalidate('catalog')
+    assert worker_b.get('catalog', tags=('catalog',)) is None
+
+
+def test_stampede_builds_once_across_workers(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    workers = [Cache(SharedMemoryBackend(path, 100), poll_seconds=0) for _ in range(3)]
+    calls = []
+
+    def slow_build():
+        calls.append(1)
+        time.sleep(0.2)
+        return b'teuer'
+
+    results = []
+    threads = [threading.Thread(target=lambda cache=cache: results.append(cache.get_or_set('k', slow_build)))
+               for cache in workers for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b'teuer'] * 9
+    assert len(calls) == 1
+
+
+def test_redis_backend_with_local_stand_in():
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    worker_a = Cache(RedisBackend(fakeredis.FakeRedis(server=server)), poll_seconds=0)
+    worker_b = Cache(RedisBackend(fakeredis.FakeRedis(server=server)), poll_seconds=0)
+
+    build, calls = counting(b'benachrichtigungen')
+    worker_a.get_or_set('n', build, tags=('user:1',))
+    worker_b.get_or_set('n', build, tags=('user:1',))
+    assert len(calls) == 1
+
+    worker_a.invalidate('user:1')
+    assert worker_b.get('n', tags=('user:1',)) is None
+
+
+def test_timetable_read_path_is_invalidated_by_commits(app_factory, user_factory, auth_headers, tmp_path):
+    app = app_factory(CACHE_BACKEND='shm', CACHE_SHM_PATH=str(tmp_path / 'shared.sqlite'))
+    with app.app_context():
+        user, timetable = user_factory('cache', 'Cache Test')
+        course = Course(timetable_id=timetable.id, name='Analysis', day_of_week=0, room='H1',
+                        start_time=clock_time(8), end_time=clock_time(10))
+        db.session.add(course)
+        db.session.commit()
+        headers = auth_headers(user.id)
+        timetable_id, course_id = timetable.id, course.id
+
+    client = app.test_client()
+    url = f'/api/timetable/{timetable_id}'
+    assert client.get(url, headers=headers).get_json()['timetable']['courses'][0]['room'] == 'H1'
+    assert client.get(url, headers=headers).get_json()['timetable']['courses'][0]['room'] == 'H1'
+    assert app.extensions['cache'].snapshot()['local_hits'] == 1
+
+    client.put(f'/api/courses/{course_id}', json={'room': 'H2'}, headers=headers)
+    assert client.get(url, headers=headers).get_json()['timetable']['courses'][0]['room'] == 'H2'
+    assert client.get(f'/api/timetable/{timetable_id + 1}', headers=headers).status_code == 404
+
+
+def test_enrollments_keep_catalog_entries_and_update_seats(app_factory, user_factory, auth_headers):
+    app = app_factory(CACHE_BACKEND='local')
+    with app.app_context():
+        owner, timetable = user_factory('dozent', 'Dozent')
+        student, _ = user_factory('student', 'Student')
+        courses = [Course(timetable_id=timetable.id, name=name, day_of_week=0, capacity=10,
+                          start_time=clock_time(8), end_time=clock_time(10)) for name in ('Analysis', 'Algebra')]
+        db.session.add_all(courses)
+        db.session.flush()
+        lecture = CourseSession(course_id=courses[0].id, session_date=date(2025, 11, 3),
+                                start_time=clock_time(8), end_time=clock_time(10), room='H1')
+        db.session.add(lecture)
+        db.session.commit()
+        owner_headers, student_headers = auth_headers(owner.id), auth_headers(student.id)
+        analysis, algebra, session_id = courses[0].id, courses[1].id, lecture.id
+
+    client = app.test_client()
+    cache = app.extensions['cache']
+    detail = lambda course_id: client.get(f'/api/course-catalog/courses/{course_id}', headers=student_headers)
+    seats = lambda: {course['id']: (course['enrollment_count'], course['available'])
+                     for course in client.get('/api/courses/catalog', headers=student_headers).get_json()['courses']}
+
+    assert seats() == {analysis: (0, True), algebra: (0, True)}
+    detail(analysis)
+    detail(algebra)
+    client.post(f'/api/courses/{analysis}/enroll', json={}, headers=student_headers)
+
+    # Einschreibung: Einträge bleiben gültig, die Platzzahl ist trotzdem aktuell
+    hits = cache.snapshot()['local_hits']
+    assert seats() == {analysis: (1, True), algebra: (0, True)}
+    assert detail(analysis).get_json()['course']['enrolled_count'] == 1
+    assert cache.snapshot()['local_hits'] == hits + 2
+
+    # Terminänderung betrifft nur die Details dieses Kurses
+    client.put(f'/api/courses/{analysis}/sessions/{session_id}', json={'room': 'H2'}, headers=owner_headers)
+    assert detail(analysis).get_json()['course']['sessions'][0]['room'] == 'H2'
+    hits = cache.snapshot()['local_hits']
+    detail(algebra)
+    seats()
+    assert cache.snapshot()['local_hits'] == hits + 2
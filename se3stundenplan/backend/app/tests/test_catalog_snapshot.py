@@ -0,0 +1,66 @@
+from datetime import date, time
+
+import pytest
+
+from app import db
+from app.models import Course, CourseSession
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory(CATALOG_SNAPSHOT_CHECK_SECONDS=3600)
+        with app.app_context():
+            user, timetable = user_factory('snap', 'Snapshot Test')
+            courses = [
+                Course(timetable_id=timetable.id, name='Analysis', code='MA1', instructor='Dr. Meier',
+                       course_type='Vorlesung', day_of_week=0, start_time=time(8), end_time=time(10), credits=5),
+                Course(timetable_id=timetable.id, name='Datenbanken', code='DB1', instructor='Prof. Schulz',
+                       course_type='Übung', day_of_week=2, start_time=time(14), end_time=time(16), credits=5),
+                Course(timetable_id=timetable.id, name='Algorithmen', code='ALG', instructor='Dr. Meier',
+                       course_type='Vorlesung', day_of_week=2, start_time=time(10), end_time=time(12), credits=8,
+                       description='Sortieren und Suchen'),
+            ]
+            db.session.add_all(courses)
+            db.session.flush()
+            db.session.add(CourseSession(course_id=courses[1].id, session_date=date(2024, 10, 18),
+                                         start_time=time(8), end_time=time(10)))
+            db.session.commit()
+            headers = auth_headers(user.id)
+            timetable_id = timetable.id
+        return app, app.test_client(), headers, timetable_id
+    return make
+
+
+def search(client, headers, search='', **filters):
+    response = client.post('/api/courses/search', json={'search': search, 'filters': filters}, headers=headers)
+    return [course['name'] for course in response.get_json()['courses']]
+
+
+def test_filters_are_evaluated_on_snapshot(make_client):
+    app, client, headers, _ = make_client()
+
+    assert search(client, headers, 'meier') == ['Analysis', 'Algorithmen']
+    assert search(client, headers, 'suchen') == ['Algorithmen']
+    assert search(client, headers, course_type='Vorlesung', day_of_week=2) == ['Algorithmen']
+    assert search(client, headers, time_range={'start': '09:00', 'end': '17:00'}) == ['Datenbanken', 'Algorithmen']
+    assert search(client, headers, credits=5, instructor='schulz') == ['Datenbanken']
+
+    response = client.post('/api/course-catalog/courses/search', json={
+        'instructors': ['Dr. Meier', 'Prof. Schulz'], 'day_of_week': [4]
+    }, headers=headers)
+    assert [course['name'] for course in response.get_json()['courses']] == ['Datenbanken']
+    assert app.extensions['catalog_snapshot'].rebuilds == 1
+
+
+def test_snapshot_is_rebuilt_after_catalog_change(make_client):
+    app, client, headers, timetable_id = make_client()
+    assert search(client, headers, 'graph') == []
+
+    client.post('/api/courses/', json={
+        'timetable_id': timetable_id, 'name': 'Graphentheorie', 'day_of_week': 3,
+        'start_time': '12:00', 'end_time': '14:00'
+    }, headers=headers)
+
+    assert search(client, headers, 'graph') == ['Graphentheorie']
+    assert app.extensions['catalog_snapshot'].rebuilds == 2
@@ -0,0 +1,67 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Course, CourseSession, CourseComment, EnrolledCourse
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make(comment_count):
+        app = app_factory()
+        with app.app_context():
+            user, timetable = user_factory('detail', 'Detail Test')
+            course = Course(timetable_id=timetable.id, name='Analysis', day_of_week=0,
+                            start_time=time(8), end_time=time(10))
+            db.session.add(course)
+            db.session.flush()
+            for day in (date(2024, 10, 21), date(2024, 10, 14)):
+                db.session.add(CourseSession(course_id=course.id, session_date=day, start_time=time(8), end_time=time(10)))
+            created = datetime(2024, 10, 1)
+            for i in range(comment_count):
+                db.session.add(CourseComment(course_id=course.id, user_id=user.id, comment=f'Notiz {i}',
+                                             created_at=created + timedelta(minutes=i)))
+            db.session.add(EnrolledCourse(user_id=user.id, course_id=course.id, status='active'))
+            db.session.commit()
+            headers = auth_headers(user.id)
+            course_id = course.id
+        return app, app.test_client(), headers, course_id
+    return make
+
+
+def count_statements(app):
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_detail_uses_two_queries_and_pages_comments(make_client):
+    app, client, headers, course_id = make_client(45)
+    statements = count_statements(app)
+
+    response = client.get(f'/api/courses/{course_id}?comments_page=3', headers=headers)
+    assert response.status_code == 200
+    assert len(statements) == 2
+
+    course = response.get_json()['course']
+    assert [s['session_date'] for s in course['sessions']] == ['2024-10-14', '2024-10-21']
+    assert [c['comment'] for c in course['comments']] == [f'Notiz {i}' for i in range(4, -1, -1)]
+    assert course['comments_pagination'] == {
+        'page': 3, 'per_page': 20, 'total': 45, 'pages': 3, 'has_next': False, 'has_prev': True
+    }
+    assert course['is_enrolled'] is True
+    assert course['enrollment_status'] == 'active'
+
+
+def test_detail_without_comments_or_access(make_client):
+    app, client, headers, course_id = make_client(0)
+    course = client.get(f'/api/courses/{course_id}', headers=headers).get_json()['course']
+    assert course['comments'] == []
+    assert course['comments_pagination']['total'] == 0
+
+    assert client.get(f'/api/courses/{course_id + 1}', headers=headers).status_code == 404
+    page = client.get(f'/api/courses/{course_id}/comments?page=2&per_page=10', headers=headers).get_json()
+    assert page['comments'] == [] and page['count'] == 0
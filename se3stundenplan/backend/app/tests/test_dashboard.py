@@ -0,0 +1,90 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Course, Notification
+from app.routes.dashboard import REMINDER_LIMIT, finish_dashboard
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory(CACHE_BACKEND='local')
+        today = date.today()
+        with app.app_context():
+            user, timetable = user_factory('dash', 'Dash Board', is_active=True)
+            for name, day, credits in [('Heute', today.weekday(), 5), ('Morgen', (today.weekday() + 1) % 7, 3)]:
+                db.session.add(Course(timetable_id=timetable.id, name=name, day_of_week=day, credits=credits,
+                                      start_time=time(8), end_time=time(10)))
+            in_an_hour = datetime.now() + timedelta(hours=1)
+            db.session.add_all([
+                Notification(user_id=user.id, title='Bald', message='m', notify_time=in_an_hour),
+                Notification(user_id=user.id, title='Später', message='m', notify_time=in_an_hour + timedelta(days=3)),
+            ])
+            db.session.commit()
+            headers = auth_headers(user.id)
+        return app, app.test_client(), headers
+    return make
+
+
+def test_dashboard_aggregates_start_page_and_hits_cache(make_client):
+    app, client, headers = make_client()
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    response = client.get('/api/dashboard', headers=headers)
+    assert response.status_code == 200
+    assert 'dashboard;dur=' in response.headers['Server-Timing']
+    data = response.get_json()
+    assert data['user']['full_name'] == 'Dash Board'
+    assert (data['timetable']['name'], data['timetable']['course_count'], data['timetable']['total_credits']) \
+        == ('WS', 2, 8)
+    assert [item['name'] for item in data['today']['occurrences']] == ['Heute']
+    assert [item['name'] for item in data['tomorrow']['occurrences']] == ['Morgen']
+    assert data['unread_count'] == 2
+    assert [item['title'] for item in data['upcoming_reminders']] == ['Bald']
+    assert len(statements) <= 6
+
+    statements.clear()
+    assert client.get('/api/dashboard', headers=headers).get_json()['unread_count'] == 2
+    assert statements == []
+
+    # Lesen einer Benachrichtigung invalidiert über das Änderungsprotokoll
+    client.post('/api/notifications/mark-all-read', json={}, headers=headers)
+    assert client.get('/api/dashboard', headers=headers).get_json()['unread_count'] == 0
+    client.put('/api/auth/profile', json={'full_name': 'Neu'}, headers=headers)
+    assert client.get('/api/dashboard', headers=headers).get_json()['user']['full_name'] == 'Neu'
+
+
+def test_overdue_reminders_do_not_hide_upcoming_ones(make_client):
+    app, client, headers = make_client()
+    with app.app_context():
+        user_id = db.session.scalar(db.select(Notification.user_id).limit(1))
+        now, midnight = datetime.now(), datetime.combine(date.today(), time.min)
+        db.session.execute(Notification.__table__.insert(), [
+            {'user_id': user_id, 'title': f'Überfällig {i}', 'message': 'm', 'notification_type': 'reminder',
+             'notify_time': max(midnight, now - timedelta(seconds=i + 1)), 'is_sent': False, 'is_read': True,
+             'created_at': now}
+            for i in range(REMINDER_LIMIT + 20)
+        ])
+        db.session.commit()
+
+    data = client.get('/api/dashboard', headers=headers).get_json()
+    assert [item['title'] for item in data['upcoming_reminders']] == ['Bald']
+
+
+def test_next_course_skips_finished_and_cancelled_occurrences():
+    occurrence = {'start_time': '08:00', 'end_time': '10:00', 'status': 'scheduled', 'name': 'A'}
+    data = {
+        'today': {'occurrences': [occurrence, {**occurrence, 'start_time': '12:00', 'end_time': '14:00',
+                                               'status': 'cancelled', 'name': 'B'}]},
+        'tomorrow': {'occurrences': [{**occurrence, 'name': 'C'}]},
+        'reminders': []
+    }
+    running = finish_dashboard({**data, 'reminders': []}, datetime.combine(date.today(), time(9)))
+    assert (running['next_course']['name'], running['next_course']['in_progress']) == ('A', True)
+    later = finish_dashboard({**data, 'reminders': []}, datetime.combine(date.today(), time(11)))
+    assert (later['next_course']['name'], later['next_course']['in_progress']) == ('C', False)
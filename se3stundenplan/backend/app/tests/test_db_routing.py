@@ -0,0 +1,76 @@
+from app import db
+from app.models import User, Timetable
+
+
+def seed_user(session):
+    user = User(username='replica', email='replica@example.com', full_name='Replica Test')
+    user.set_password('geheim')
+    session.add(user)
+    session.flush()
+    return user.id
+
+
+def test_reads_go_to_replica_until_user_writes(app_factory, auth_headers, tmp_path):
+    app = app_factory(SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path / 'replica.db'}"], DB_STICKY_SECONDS=60)
+
+    with app.app_context():
+        # Replica hinkt hinterher: Benutzer vorhanden, Stundenplan noch nicht repliziert
+        replica = db.engines['replica_0']
+        db.metadata.create_all(replica)
+        user_id = seed_user(db.session)
+        db.session.add(Timetable(user_id=user_id, name='Nur auf dem Primary'))
+        db.session.commit()
+        with replica.begin() as conn:
+            conn.execute(User.__table__.insert(), [{
+                'id': user_id, 'username': 'replica', 'email': 'replica@example.com',
+                'password_hash': 'x', 'full_name': 'Replica Test'
+            }])
+        headers = auth_headers(user_id)
+
+    client = app.test_client()
+    assert client.get('/api/timetable/active', headers=headers).status_code == 404
+
+    response = client.post('/api/timetable/', json={'name': 'Neu'}, headers=headers)
+    assert response.status_code == 201
+    assert 'db_primary_until' in response.headers.get('Set-Cookie', '')
+
+    # Read-your-writes: direkt danach vom Primary lesen
+    assert client.get('/api/timetable/active', headers=headers).status_code == 200
+
+
+def test_cached_responses_are_built_from_primary(app_factory, auth_headers, tmp_path):
+    app = app_factory(SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path / 'replica.db'}"], DB_STICKY_SECONDS=60,
+                      CACHE_BACKEND='local')
+
+    with app.app_context():
+        # Replica hinkt hinterher, der Benutzer hat selbst nichts geschrieben (kein Sticky-Cookie)
+        db.metadata.create_all(db.engines['replica_0'])
+        user_id = seed_user(db.session)
+        db.session.add(Timetable(user_id=user_id, name='Nur auf dem Primary'))
+        db.session.commit()
+        headers = auth_headers(user_id)
+
+    client = app.test_client()
+    # Der Eintrag gilt für alle Leser, er darf nicht den Stand der Replica festhalten
+    assert client.get('/api/timetable/', headers=headers).get_json()['count'] == 1
+    assert client.get('/api/timetable/', headers=headers).get_json()['count'] == 1
+    assert app.extensions['cache'].snapshot()['local_hits'] == 1
+
+
+def test_unreachable_replica_is_ejected(app_factory, auth_headers, tmp_path):
+    app = app_factory(SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path / 'fehlt' / 'replica.db'}"],
+                      DB_STICKY_SECONDS=60)
+
+    with app.app_context():
+        user_id = seed_user(db.session)
+        db.session.commit()
+        headers = auth_headers(user_id)
+
+    client = app.test_client()
+    client.get('/api/timetable/active', headers=headers)
+    assert app.extensions['db_router'].status()['replica_0']['healthy'] is False
+
+    # Ausgefallene Replica: Antwort kommt vom Primary statt als 500
+    response = client.get('/api/timetable/active', headers=headers)
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Kein Stundenplan gefunden'}
@@ -0,0 +1,81 @@
+import json
+import os
+from datetime import time
+
+import pytest
+
+from app import db
+from app.models import User, Timetable, Course
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make(max_bytes=10 * 1024 * 1024):
+        app = app_factory(EXPORT_CACHE_MAX_BYTES=max_bytes)
+        with app.app_context():
+            user = User(username='export', email='export@example.com', full_name='Export Test')
+            user.set_password('geheim')
+            db.session.add(user)
+            db.session.flush()
+            timetables = [Timetable(user_id=user.id, name=name) for name in ('WS', 'SS')]
+            db.session.add_all(timetables)
+            db.session.flush()
+            course = Course(timetable_id=timetables[0].id, name='Mathe', day_of_week=0,
+                            start_time=time(8), end_time=time(10))
+            db.session.add(course)
+            db.session.commit()
+            headers = auth_headers(user.id)
+            ids = [timetable.id for timetable in timetables], course.id
+        return app, app.test_client(), headers, ids
+    return make
+
+
+def cached_files(app):
+    directory = app.extensions['export_cache'].directory
+    return sorted(entry.name for entry in os.scandir(directory) if entry.is_file())
+
+
+def test_unchanged_timetable_is_served_from_cache(make_client):
+    app, client, headers, ([timetable_id, _], course_id) = make_client()
+
+    first = client.get(f'/api/data/export/{timetable_id}/csv', headers=headers)
+    assert 'Mathe' in first.get_data(as_text=True)
+    assert client.get(f'/api/data/export/{timetable_id}/csv?locale=en', headers=headers) \
+        .get_data(as_text=True).count('Monday') == 1
+    assert client.get(f'/api/data/export/{timetable_id}/csv', headers=headers).get_data() == first.get_data()
+    stats = app.extensions['export_cache'].stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+    # Neue Version ersetzt die alten Dateien dieses Stundenplans
+    client.put(f'/api/courses/{course_id}', json={'name': 'Analysis'}, headers=headers)
+    assert 'Analysis' in client.get(f'/api/data/export/{timetable_id}/csv', headers=headers).get_data(as_text=True)
+    assert len(cached_files(app)) == 1
+
+
+def test_cache_size_is_bounded(make_client):
+    app, client, headers, (timetable_ids, _) = make_client(max_bytes=1)
+    for timetable_id in timetable_ids:
+        assert client.get(f'/api/data/export/{timetable_id}/json', headers=headers).status_code == 200
+    assert cached_files(app) == [f'{timetable_ids[1]}-{cached_files(app)[0].split("-")[1]}-de.json']
+
+
+def test_templates_are_prebuilt(make_client):
+    app, client, headers, _ = make_client()
+    assert os.path.exists(app.extensions['export_cache'].template_path('xlsx'))
+    response = client.get('/api/data/template/csv', headers=headers)
+    assert response.get_data(as_text=True).startswith('Name,Code,Instructor')
+
+
+def test_cached_exports_carry_no_export_time(make_client):
+    app, client, headers, ([timetable_id, _], _) = make_client()
+    response = client.get(f'/api/data/export/{timetable_id}/json', headers=headers)
+    assert 'export_date' not in json.loads(response.get_data())
+    assert response.headers['Last-Modified']
+
+
+def test_relative_cache_dir_is_anchored_to_backend(app_factory, tmp_path, monkeypatch):
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    relative = os.path.relpath(tmp_path / 'anchored', backend_dir)
+    monkeypatch.chdir(tmp_path / '..')
+    app = app_factory(EXPORT_CACHE_DIR=relative)
+    assert os.path.samefile(app.extensions['export_cache'].directory, tmp_path / 'anchored')
@@ -0,0 +1,70 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Course, CourseSession
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory()
+        with app.app_context():
+            user, timetable = user_factory('feed', 'Feed Test', name='WS 24/25', semester='WS24')
+            course = Course(timetable_id=timetable.id, name='Analysis, Teil 1', room='H1', day_of_week=0,
+                            start_time=time(8), end_time=time(10), reminder_minutes=30)
+            db.session.add(course)
+            db.session.flush()
+            db.session.add_all([
+                CourseSession(course_id=course.id, session_date=date(2024, 10, 14), start_time=time(8),
+                              end_time=time(10), is_cancelled=True),
+                CourseSession(course_id=course.id, session_date=date(2024, 10, 21), start_time=time(9),
+                              end_time=time(11), room='H2'),
+                CourseSession(course_id=course.id, session_date=date(2025, 2, 12), start_time=time(10),
+                              end_time=time(12), session_type='exam', title='Klausur'),
+            ])
+            db.session.commit()
+            headers = auth_headers(user.id)
+            ids = timetable.id, course.id
+        return app, app.test_client(), headers, ids
+    return make
+
+
+def test_feed_renders_series_with_exceptions(make_client):
+    app, client, headers, (timetable_id, course_id) = make_client()
+
+    assert client.get(f'/api/timetable/{timetable_id}/calendar.ics?token=falsch').status_code == 403
+    url = client.get(f'/api/timetable/{timetable_id}/calendar-feed', headers=headers).get_json()['url']
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/calendar'
+    body = response.get_data(as_text=True)
+    assert 'SUMMARY:Analysis\\, Teil 1\r\n' in body
+    assert 'DTSTART;TZID=Europe/Berlin:20241007T080000' in body
+    assert 'RRULE:FREQ=WEEKLY;BYDAY=MO;UNTIL=20250331T235959Z' in body
+    assert 'EXDATE;TZID=Europe/Berlin:20241014T080000' in body
+    assert 'RECURRENCE-ID;TZID=Europe/Berlin:20241021T080000' in body
+    assert 'SUMMARY:Analysis\\, Teil 1: Klausur' in body
+    assert 'TRIGGER:-PT30M' in body
+
+
+def test_repeat_polls_skip_the_orm(make_client):
+    app, client, headers, (timetable_id, course_id) = make_client()
+    url = client.get(f'/api/timetable/{timetable_id}/calendar-feed', headers=headers).get_json()['url']
+    etag = client.get(url).headers['ETag']
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get(url).headers['ETag'] == etag
+    assert len(statements) == 2
+
+    client.put(f'/api/courses/{course_id}', json={'room': 'H3'}, headers=headers)
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'LOCATION:H3' in response.get_data(as_text=True)
@@ -0,0 +1,108 @@
+import io
+from datetime import time
+
+import pandas as pd
+import pytest
+
+from app import db
+from app.models import Course, ChangeLog
+from app.routes.export_import import EXCEL_COLUMNS, parse_course_frame, parse_time_flexible
+
+
+def test_time_parser_accepts_known_formats():
+    assert parse_time_flexible('8:15') == time(8, 15)
+    assert parse_time_flexible(' 08.15 ') == time(8, 15)
+    assert parse_time_flexible('08,15') == time(8, 15)
+    assert parse_time_flexible('08:15:30') == time(8, 15, 30)
+    assert parse_time_flexible(time(9, 45)) == time(9, 45)
+    assert parse_time_flexible('24:00') is None
+    assert parse_time_flexible('8 Uhr') is None
+
+
+def test_frame_is_validated_with_masks():
+    df = pd.DataFrame({
+        'Name': ['Mathe', None, 'Physik', 'Chemie', 'Bio'],
+        'Startzeit': ['08:00', '08:00', '25:00', '10:00', None],
+        'Start Time': [None, None, None, None, '12:00'],
+        'Endzeit': ['09:30', '09:30', '11:00', '11:30', '13:00'],
+        'Wochentag': ['Montag', 'Di', 'Mi', 'Holiday', 'FR'],
+        'ECTS': [5.0, None, 3.0, 2.5, 4.0],
+    })
+    courses, errors = parse_course_frame(df, EXCEL_COLUMNS)
+
+    assert errors == ['Zeile 3: Name fehlt', 'Zeile 4: Ungültige Zeitangaben', 'Zeile 5: Ungültiger Wochentag']
+    assert [(c['name'], c['day_of_week'], c['start_time'], c['credits']) for c in courses] == [
+        ('Mathe', 0, time(8), 5),
+        ('Bio', 4, time(12), 4),
+    ]
+    assert courses[0]['course_type'] == 'Vorlesung'
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory()
+        with app.app_context():
+            user, timetable = user_factory('import', 'Import Test')
+            db.session.commit()
+            headers = auth_headers(user.id)
+            timetable_id = timetable.id
+
+        client = app.test_client()
+
+        def upload(content, **form):
+            return client.post(f'/api/data/import/{timetable_id}', headers=headers, data={
+                'file': (io.BytesIO(content.encode('utf-8')), 'kurse.csv'), **form
+            }, content_type='multipart/form-data')
+
+        return app, upload, timetable_id
+    return make
+
+
+def test_csv_import(make_client):
+    app, upload, timetable_id = make_client()
+    content = 'Name,Day,Start Time,End Time,Credits,Type\nMathe,Montag,08:00,09:30,5,\n,Dienstag,08:00,09:30,,\n'
+    response = upload(content)
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()['errors'] == ['Zeile 3: Name fehlt']
+
+    with app.app_context():
+        course = Course.query.filter_by(timetable_id=timetable_id).one()
+        assert (course.name, course.credits, course.course_type) == ('Mathe', 5, 'Vorlesung')
+
+
+def test_sync_import_writes_only_differences(make_client):
+    app, upload, timetable_id = make_client()
+    header = 'Name,Code,Day,Start Time,End Time,Room,Type\n'
+    first = header + ('Mathe,M1,Montag,08:00,09:30,A1,Vorlesung\n'
+                      'Mathe,M1,Dienstag,10:00,11:30,B2,Übung\n'
+                      'Physik,,Mittwoch,12:00,13:30,C3,Vorlesung\n')
+    assert upload(first).status_code == 201
+    assert upload(first).status_code == 201  # append: Duplikate wie bisher
+
+    with app.app_context():
+        log_size = ChangeLog.query.count()
+
+    response = upload(first, mode='sync')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['diff'] == {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': 3, 'duplicates': 0}
+    with app.app_context():
+        assert ChangeLog.query.count() == log_size  # keine Schreibzugriffe
+
+    edited = header + ('Mathe,M1,Montag,08:00,09:45,A1,Vorlesung\n'
+                       'Physik,,Mittwoch,12:00,13:30,C3,Vorlesung\n'
+                       'Chemie,CH,Freitag,08:00,09:30,D4,Praktikum\n')
+    data = upload(edited, mode='sync', delete_missing='true').get_json()
+    assert len(data['diff']['inserted']) == 1
+    assert len(data['diff']['updated']) == 1
+    assert len(data['diff']['deleted']) == 4  # Übung + Duplikate aus dem zweiten Append
+    assert data['diff']['unchanged'] == 1
+
+    with app.app_context():
+        courses = Course.query.filter_by(timetable_id=timetable_id).order_by(Course.name).all()
+        assert [(c.name, c.end_time) for c in courses] == [
+            ('Chemie', time(9, 30)), ('Mathe', time(9, 45)), ('Physik', time(13, 30))
+        ]
+
+    assert upload(edited, mode='merge').status_code == 400
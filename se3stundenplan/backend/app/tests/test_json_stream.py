@@ -0,0 +1,65 @@
+import gzip
+import json
+from datetime import date, time
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Course, CourseSession
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make(count):
+        app = app_factory(JSON_STREAM_CHUNK_SIZE=512, JSON_STREAM_YIELD_PER=7)
+        with app.app_context():
+            user, timetable = user_factory('stream', 'Stream Test')
+            for i in range(count):
+                course = Course(timetable_id=timetable.id, name=f'Kurs {i:03d}', day_of_week=i % 5,
+                                start_time=time(8), end_time=time(10))
+                db.session.add(course)
+                db.session.flush()
+                db.session.add(CourseSession(course_id=course.id, session_date=date(2024, 10, 14),
+                                             start_time=time(8), end_time=time(10)))
+            db.session.commit()
+            headers = auth_headers(user.id)
+        return app.test_client(), headers
+    return make
+
+
+def test_small_catalog_is_sent_uncompressed(make_client):
+    client, headers = make_client(1)
+    response = client.get('/api/course-catalog/courses', headers={**headers, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['count'] == 1
+
+
+def test_large_catalog_is_streamed_with_gzip(make_client):
+    client, headers = make_client(40)
+    response = client.get('/api/course-catalog/courses', headers={**headers, 'Accept-Encoding': 'gzip'})
+    assert response.is_streamed
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    data = json.loads(gzip.decompress(response.get_data()))
+    assert data['count'] == 40
+    assert [c['name'] for c in data['courses']] == [f'Kurs {i:03d}' for i in range(40)]
+    assert all(len(c['sessions']) == 1 for c in data['courses'])
+
+
+def test_catalog_keeps_no_cursor_open_between_blocks(make_client):
+    client, headers = make_client(40)
+    app = client.application
+    executions = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, parameters, context, many:
+                     executions.append((statement, context.execution_options.get('stream_results', False))))
+
+    data = client.get('/api/course-catalog/courses', headers=headers).get_json()
+    assert data['count'] == 40  # mehr Zeilen als JSON_STREAM_YIELD_PER
+    assert len({c['id'] for c in data['courses']}) == 40
+    # Auf MySQL würde jede Abfrage neben einem offenen Server-Side-Cursor dessen Rest verwerfen
+    assert not any(streamed for _, streamed in executions)
+    assert sum(statement.startswith('SELECT course_sessions.') for statement, _ in executions) == 6
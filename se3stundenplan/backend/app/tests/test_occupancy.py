@@ -0,0 +1,102 @@
+from datetime import date, time
+
+from app.occupancy import OccupancyIndex
+
+
+def course(course_id, code, room, instructor, day, start, end):
+    return {
+        'id': course_id, 'name': code, 'offering': code.lower(), 'room': room, 'instructor': instructor,
+        'is_active': True, 'day_of_week': day,
+        'start': start.hour * 60 + start.minute, 'end': end.hour * 60 + end.minute,
+        'start_time': start.strftime('%H:%M'), 'end_time': end.strftime('%H:%M')
+    }
+
+
+def session(session_id, course_id, session_date, room, start, end):
+    return {
+        'id': session_id, 'course_id': course_id, 'session_date': session_date, 'room': room,
+        'is_cancelled': False,
+        'start': start.hour * 60 + start.minute, 'end': end.hour * 60 + end.minute,
+        'start_time': start.strftime('%H:%M'), 'end_time': end.strftime('%H:%M')
+    }
+
+
+def build_index():
+    index = OccupancyIndex()
+    index.build(
+        [
+            course(1, 'MATH101', 'A1', 'Prof. Schmidt', 0, time(8, 0), time(9, 30)),
+            # Kopie desselben Kurses in einem anderen Stundenplan
+            course(2, 'MATH101', 'A1', 'Prof. Schmidt', 0, time(8, 0), time(9, 30)),
+            course(3, 'CS101', 'B2', 'Prof. Schmidt', 0, time(9, 0), time(10, 30)),
+        ],
+        [session(10, 3, date(2024, 10, 14), 'A1', time(8, 30), time(9, 0))]
+    )
+    return index
+
+
+def test_find_clashes_by_room_and_instructor():
+    index = build_index()
+
+    room_clashes = index.find_clashes(time(8, 45), time(10, 0), room='a1 ', day_of_week=0, code='DB101')
+    assert {c['booking']['course_id'] for c in room_clashes} == {1, 2, 3}
+
+    same_offering = index.find_clashes(time(8, 0), time(9, 0), room='A1', day_of_week=0, code='MATH101')
+    assert [c['booking']['type'] for c in same_offering] == ['session']
+
+    free = index.find_clashes(time(9, 30), time(11, 0), room='A1', day_of_week=0)
+    assert free == []
+
+
+def test_report_finds_instructor_double_booking_and_dated_room_clash():
+    clashes = build_index().report()
+
+    instructor = [c for c in clashes if c['resource'] == 'instructor' and 'day_of_week' in c]
+    assert len(instructor) == 2  # CS101 überschneidet sich mit beiden MATH101-Kopien
+
+    dated_room = [c for c in clashes if c['resource'] == 'room' and 'session_date' in c]
+    assert {b['course_id'] for c in dated_room for b in c['bookings']} == {1, 2, 3}
+
+
+def test_apply_moves_and_deletes_bookings():
+    index = build_index()
+    index.apply([
+        ('course', 'upsert', course(3, 'CS101', 'B2', 'Dr. Weber', 2, time(9, 0), time(10, 30))),
+        ('session', 'delete', {'id': 10}),
+    ])
+
+    assert index.find_clashes(time(9, 0), time(10, 0), instructor='Prof. Schmidt', day_of_week=0, code='X') != []
+    assert index.find_clashes(time(9, 0), time(10, 0), instructor='Dr. Weber', day_of_week=0) == []
+    assert index.find_clashes(time(9, 0), time(10, 0), instructor='Dr. Weber', day_of_week=2) != []
+    assert index.report() == []
+
+
+def test_index_rebuilds_after_writes_bypassing_session_events(app_factory, user_factory, auth_headers):
+    from app import db
+    from app.change_log import record_bulk_changes
+    from app.models import Course
+
+    app = app_factory(OCCUPANCY_CHECK_SECONDS=0)
+    with app.app_context():
+        user, timetable = user_factory('belegung')
+        db.session.add(Course(timetable_id=timetable.id, name='Analysis', code='MATH101', room='A1',
+                              day_of_week=0, start_time=time(8), end_time=time(10)))
+        db.session.commit()
+        headers = auth_headers(user.id)
+
+    client = app.test_client()
+    query = '/api/course-catalog/admin/occupancy/clashes?start_time=09:00&end_time=11:00&day_of_week=0&room='
+    assert client.get(query + 'A1', headers=headers).get_json()['count'] == 1
+    assert client.get(query + 'B2', headers=headers).get_json()['count'] == 0
+    rebuilds = app.extensions['occupancy_index'].rebuilds
+
+    # Wie ein anderer Worker bzw. ein Bulk-Statement: Core-UPDATE ohne Session-Events, nur Änderungsprotokoll
+    with app.app_context():
+        db.session.execute(Course.__table__.update().values(room='B2'))
+        record_bulk_changes(db.session, Course, Course.id.isnot(None))
+        db.session.commit()
+
+    assert client.get(query + 'B2', headers=headers).get_json()['count'] == 1
+    assert client.get(query + 'A1', headers=headers).get_json()['count'] == 0
+    report = client.get('/api/course-catalog/admin/occupancy/report', headers=headers).get_json()
+    assert report['index']['rebuilds'] == rebuilds + 1
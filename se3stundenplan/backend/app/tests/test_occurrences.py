@@ -0,0 +1,77 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.occurrences import parse_periods
+from app.models import Course, CourseSession
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory(LECTURE_FREE_PERIODS='2024-12-23:2025-01-05')
+        with app.app_context():
+            user, timetable = user_factory('calendar', 'Kalender Test', name='WS', semester='WS24')
+            course = Course(timetable_id=timetable.id, name='Analysis', day_of_week=0, room='H1',
+                            start_time=time(8), end_time=time(10))
+            db.session.add(course)
+            db.session.flush()
+            db.session.add_all([
+                CourseSession(course_id=course.id, session_date=date(2024, 10, 14), start_time=time(8),
+                              end_time=time(10), session_type='cancelled'),
+                CourseSession(course_id=course.id, session_date=date(2024, 10, 21), start_time=time(9),
+                              end_time=time(11), room='H2', session_type='makeup'),
+                CourseSession(course_id=course.id, session_date=date(2024, 10, 25), start_time=time(14),
+                              end_time=time(16), session_type='exam', title='Klausur'),
+            ])
+            db.session.commit()
+            headers = auth_headers(user.id)
+            ids = timetable.id, course.id
+        return app, app.test_client(), headers, ids
+    return make
+
+
+def test_expansion_applies_sessions_and_semester(make_client):
+    app, client, headers, (timetable_id, course_id) = make_client()
+    response = client.get(f'/api/timetable/{timetable_id}/calendar?from=2024-09-28&to=2024-10-27', headers=headers)
+    assert response.status_code == 200
+
+    occurrences = [(o['date'], o['start_time'], o['room'], o['kind'], o['status'])
+                   for o in response.get_json()['occurrences']]
+    assert occurrences == [
+        ('2024-10-07', '08:00', 'H1', 'regular', 'scheduled'),  # Semesterbeginn 1.10.
+        ('2024-10-14', '08:00', 'H1', 'regular', 'cancelled'),
+        ('2024-10-21', '09:00', 'H2', 'makeup', 'scheduled'),
+        ('2024-10-25', '14:00', 'H1', 'exam', 'scheduled'),
+    ]
+
+
+def test_lecture_free_period_and_version_cache(make_client):
+    app, client, headers, (timetable_id, course_id) = make_client()
+    url = f'/api/timetable/{timetable_id}/calendar?from=2024-12-16&to=2025-01-12'
+    dates = [o['date'] for o in client.get(url, headers=headers).get_json()['occurrences']]
+    assert dates == ['2024-12-16', '2025-01-06']
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    november = f'/api/timetable/{timetable_id}/calendar?from=2024-11-01&to=2024-11-30'
+    response = client.get(november, headers=headers)
+    assert response.get_json()['count'] == 4
+    assert len(statements) == 1  # nur die Versionsabfrage
+    assert client.get(november, headers={**headers, 'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    # Geänderte vorlesungsfreie Zeiten machen ETag und kompilierten Plan ungültig
+    app.extensions['lecture_free_periods'] = parse_periods('2024-11-01:2024-11-10')
+    changed = client.get(november, headers={**headers, 'If-None-Match': response.headers['ETag']})
+    assert changed.status_code == 200 and changed.get_json()['count'] == 3
+    app.extensions['lecture_free_periods'] = parse_periods('2024-12-23:2025-01-05')
+
+    client.put(f'/api/courses/{course_id}', json={'room': 'H3'}, headers=headers)
+    rooms = {o['room'] for o in client.get(url, headers=headers).get_json()['occurrences']}
+    assert rooms == {'H3'}
+
+    assert client.get(f'/api/timetable/{timetable_id}/calendar?from=2025-01-01&to=2024-01-01',
+                      headers=headers).status_code == 400
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.pool_metrics import InstrumentedQueuePool, compute_pool_settings, pool_metrics
+
+
+def test_compute_pool_settings_respects_max_connections():
+    # 4 Worker x 8 Threads passen in 151 - 10 Verbindungen
+    assert compute_pool_settings(4, 8, 151) == {'pool_size': 8, 'max_overflow': 8}
+
+    # 8 Worker x 32 Threads: Budget pro Worker begrenzt, kein Overflow mehr
+    sizing = compute_pool_settings(8, 32, 100)
+    assert sizing == {'pool_size': 11, 'max_overflow': 0}
+    assert 8 * (sizing['pool_size'] + sizing['max_overflow']) <= 100 - 10
+
+
+def test_instrumented_pool_counts_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    pool_metrics.reset()
+
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = pool_metrics.snapshot()
+    assert stats['checkouts'] == 1
+    assert stats['timeouts'] == 1
+    assert stats['checkout_wait_ms']['max'] >= 40
+    assert stats['checked_out_ms']['max'] > 0
+    engine.dispose()
+
+
+def test_stats_endpoints_require_token(app_factory, user_factory, auth_headers):
+    from app import db
+    from app.api_routes import STATS_ROUTES
+
+    app = app_factory()
+    with app.app_context():
+        user, _ = user_factory('monitor')
+        db.session.commit()
+        headers = auth_headers(user.id)
+
+    client = app.test_client()
+    for path in STATS_ROUTES:
+        assert client.get(f'/api/{path}').status_code == 401, path
+        response = client.get(f'/api/{path}', headers=headers)
+        assert response.status_code == 200, path
+    assert 'checked_out' in client.get('/api/pool-stats', headers=headers).get_json()['pool']
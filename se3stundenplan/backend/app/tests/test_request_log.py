@@ -0,0 +1,52 @@
+import io
+import json
+import threading
+
+from app.request_log import RequestLog
+
+
+def entry(status=200, duration_ms=5.0, path='/api/health'):
+    return {'method': 'GET', 'path': path, 'status': status, 'duration_ms': duration_ms}
+
+
+def test_errors_and_slow_requests_bypass_sampling():
+    stream = io.StringIO()
+    log = RequestLog(stream=stream, sample_rate=0.0, slow_ms=100, flush_seconds=0.01)
+
+    assert log.record(entry()) is False
+    assert log.record(entry(status=500)) is True
+    assert log.record(entry(duration_ms=250)) is True
+    log.flush()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(line['status'], line['duration_ms']) for line in lines] == [(500, 5.0), (200, 250)]
+    assert log.snapshot()['sampled_out'] == 1
+
+
+class BlockingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.release.wait(5)
+        return super().write(text)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    stream = BlockingStream()
+    log = RequestLog(stream=stream, queue_size=2, batch_size=1, flush_seconds=0.01)
+
+    results = [log.record(entry(path=f'/api/{i}')) for i in range(10)]
+    assert results.count(True) >= 2 and results.count(False) >= 5
+
+    stream.release.set()
+    log.flush()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    dropped = [line for line in lines if line.get('event') == 'request_log_dropped']
+    assert sum(line['count'] for line in dropped) == results.count(False)
+
+    # Statistik zählt kumulativ weiter, auch nachdem die Verwürfe im Log gemeldet wurden
+    stats = log.snapshot()
+    assert stats['dropped'] == results.count(False)
+    assert stats['written'] == len(lines)
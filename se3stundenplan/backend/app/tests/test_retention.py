@@ -0,0 +1,80 @@
+import gzip
+import json
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, select
+
+from app import db
+from app.models import User, Notification, ChangeLog
+from app.retention import (NotificationArchive, parse_retention, partition_definitions, purge_change_log,
+                           purge_notifications)
+
+
+def test_purge_deletes_due_notifications_in_batches_and_archives(app_factory, tmp_path):
+    app = app_factory()
+    now = datetime(2025, 6, 1, 12)
+    with app.app_context():
+        user = User(username='r', email='r@example.com', full_name='R', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        rows = []
+        for days_ago in range(0, 200, 2):  # 100 Benachrichtigungen über 200 Tage
+            for kind in ('reminder', 'warning'):
+                rows.append({'user_id': user.id, 'title': f'{kind} {days_ago}', 'message': 'm',
+                             'notification_type': kind, 'notify_time': now - timedelta(days=days_ago),
+                             'is_sent': days_ago % 4 == 0, 'is_read': False, 'created_at': now})
+        db.session.execute(Notification.__table__.insert(), rows)
+        db.session.commit()
+
+        policy = parse_retention('reminder:30,warning:180')
+        due = lambda kind, limit: sum(1 for row in rows if row['notification_type'] == kind and row['is_sent']
+                                      and row['notify_time'] < now - timedelta(days=limit))
+        expected = due('reminder', 30) + due('warning', 180)
+
+        dry = purge_notifications(db.session, policy, now=now, batch_size=25, dry_run=True)
+        assert dry['deleted'] == expected
+        assert db.session.scalar(select(db.func.count()).select_from(Notification)) == len(rows)
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        archive = NotificationArchive(str(tmp_path / 'archive'), started=now)
+        stats = purge_notifications(db.session, policy, now=now, batch_size=25, archive=archive)
+        archive.close()
+
+        assert stats['deleted'] == expected
+        assert stats['batches'] == -(-stats['scanned'] // 25)
+        assert sum(sql.startswith('DELETE FROM notifications') for sql in statements) <= stats['batches']
+        remaining = db.session.execute(select(Notification.notification_type, Notification.notify_time,
+                                              Notification.is_sent)).all()
+        assert len(remaining) == len(rows) - expected
+        assert all(not is_sent or notify_time >= now - timedelta(days=30 if kind == 'reminder' else 180)
+                   for kind, notify_time, is_sent in remaining)
+
+        with gzip.open(archive.path, 'rt', encoding='utf-8') as archived:
+            lines = [json.loads(line) for line in archived]
+        assert len(lines) == expected and all(line['is_sent'] for line in lines)
+        tombstones = db.session.scalar(select(db.func.count()).select_from(ChangeLog)
+                                       .where(ChangeLog.entity == 'notification', ChangeLog.op == 'delete'))
+        assert tombstones == expected
+
+        # Im selben Lauf: Protokoll kürzen, die frischen Tombstones bleiben
+        old = now - timedelta(days=100)
+        db.session.execute(ChangeLog.__table__.insert(), [
+            {'user_id': user.id, 'entity': 'notification', 'entity_id': i, 'op': 'upsert', 'changed_at': old}
+            for i in range(60)
+        ])
+        db.session.execute(ChangeLog.__table__.update().where(ChangeLog.op == 'delete').values(changed_at=now))
+        db.session.commit()
+        pruned = purge_change_log(db.session, 90, now=now, batch_size=25)
+        assert pruned == {'deleted': 60, 'batches': 3}
+        assert db.session.scalar(select(db.func.count()).select_from(ChangeLog)) == tombstones
+
+
+def test_partition_definitions_cover_months_and_maxvalue():
+    definitions = partition_definitions(date(2024, 11, 15), date(2025, 1, 1))
+    assert definitions == [
+        "PARTITION p202411 VALUES LESS THAN ('2024-12-01')",
+        "PARTITION p202412 VALUES LESS THAN ('2025-01-01')",
+        "PARTITION p202501 VALUES LESS THAN ('2025-02-01')",
+        'PARTITION pmax VALUES LESS THAN (MAXVALUE)',
+    ]
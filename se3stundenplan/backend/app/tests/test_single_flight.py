@@ -0,0 +1,57 @@
+import threading
+import time
+
+from app.single_flight import SingleFlight, query_signature
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_query():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b'[]', 200
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('k', slow_query)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('k', slow_query)))
+                 for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    while flight.snapshot()['coalesced'] < 5:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [(b'[]', 200)] * 6
+
+    # Abgeschlossene Ausführungen werden nicht gehalten (Caching: app/cache.py)
+    assert flight.do('k', slow_query) == (b'[]', 200)
+    stats = flight.snapshot()
+    assert (stats['executions'], stats['coalesced'], stats['in_flight']) == (2, 5, 0)
+
+
+def test_errors_are_not_kept():
+    flight = SingleFlight()
+
+    def failing():
+        raise RuntimeError('db down')
+
+    try:
+        flight.do('k', failing)
+    except RuntimeError:
+        pass
+    assert flight.do('k', lambda: 1) == 1
+    assert flight.snapshot()['executions'] == 2
+
+
+def test_query_signature_ignores_order_and_empty_params():
+    assert query_signature('q', b=2, a='x', c='') == query_signature('q', a='x', b=2, c=None)
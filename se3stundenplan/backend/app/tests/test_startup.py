@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Misst create_app() in einem frischen Interpreter, wie beim Booten eines Workers
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app, db
+app = create_app()
+elapsed = time.perf_counter() - started
+with app.app_context():
+    tables = db.inspect(db.engine).get_table_names()
+print(json.dumps({'elapsed': elapsed, 'pandas': 'pandas' in sys.modules, 'tables': tables}))
+"""
+
+# Großzügige Obergrenze, damit der Test auch auf langsamen CI-Maschinen stabil bleibt
+STARTUP_BUDGET_SECONDS = 5.0
+
+
+def run_startup(tmp_path, **env):
+    environment = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}", **env)
+    output = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT],
+        cwd=BACKEND_DIR, env=environment, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_production_startup_is_fast_and_runs_no_ddl(tmp_path):
+    result = run_startup(tmp_path, FLASK_ENV='production', CREATE_TABLES_ON_STARTUP='false')
+
+    print(f"create_app(): {result['elapsed'] * 1000:.0f}ms")
+    assert result['elapsed'] < STARTUP_BUDGET_SECONDS
+    assert result['pandas'] is False
+    assert result['tables'] == []
+
+
+def test_development_startup_creates_schema(tmp_path):
+    result = run_startup(tmp_path, CREATE_TABLES_ON_STARTUP='true')
+
+    assert 'timetables' in result['tables']
@@ -0,0 +1,53 @@
+from datetime import time
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Timetable, Course
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory(STATUS_COUNTERS_MODE='estimate')  # SQLite: fällt auf exakte Zählung zurück
+        with app.app_context():
+            user, timetable = user_factory('stats', 'Statistik Test')
+            empty = Timetable(user_id=user.id, name='SS')
+            db.session.add(empty)
+            db.session.flush()
+            for name, course_type, day, credits in [('Analysis', 'Vorlesung', 0, 5), ('Analysis Ü', 'Übung', 0, None),
+                                                    ('Physik', 'Vorlesung', 2, 6), ('Chemie', 'Vorlesung', 2, 4)]:
+                db.session.add(Course(timetable_id=timetable.id, name=name, course_type=course_type, day_of_week=day,
+                                      credits=credits, start_time=time(8), end_time=time(10)))
+            db.session.commit()
+            headers = auth_headers(user.id)
+            ids = timetable.id, empty.id
+        return app, app.test_client(), headers, ids
+    return make
+
+
+def test_timetable_statistics_are_grouped_in_sql(make_client):
+    app, client, headers, (timetable_id, empty_id) = make_client()
+    data = client.get(f'/api/timetable/{timetable_id}/statistics', headers=headers).get_json()
+    assert data['total_courses'] == 4
+    assert data['total_credits'] == 15
+    assert data['course_types'] == {'Vorlesung': 3, 'Übung': 1}
+    assert data['days_distribution'] == {'0': 2, '2': 2}
+
+    empty = client.get(f'/api/timetable/{empty_id}/statistics', headers=headers).get_json()
+    assert (empty['total_courses'], empty['course_types']) == (0, {})
+    assert client.get(f'/api/timetable/{empty_id + 1}/statistics', headers=headers).status_code == 404
+
+
+def test_status_counters_are_not_recounted_per_request(make_client):
+    app, client, headers, _ = make_client()
+    first = client.get('/api/status').get_json()
+    assert first['statistics'] == {'users': 1, 'timetables': 2, 'courses': 4, 'notifications': 0}
+    assert first['statistics_exact'] is True
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    assert client.get('/api/status').get_json()['statistics']['courses'] == 4
+    assert statements == []
@@ -0,0 +1,74 @@
+from datetime import time
+
+import pytest
+
+from app import db
+from app.models import Course
+
+
+@pytest.fixture
+def make_client(app_factory, user_factory, auth_headers):
+    def make():
+        app = app_factory(SYNC_SETTLE_SECONDS=0)
+        with app.app_context():
+            user, timetable = user_factory('sync', 'Sync Test')
+            db.session.add(Course(timetable_id=timetable.id, name='Mathe', day_of_week=0,
+                                  start_time=time(8), end_time=time(10)))
+            db.session.commit()
+            headers = auth_headers(user.id)
+            timetable_id = timetable.id
+        return app.test_client(), headers, timetable_id
+    return make
+
+
+def test_delta_sync_returns_changes_and_tombstones(make_client):
+    client, headers, timetable_id = make_client()
+
+    full = client.get('/api/sync', headers=headers).get_json()
+    assert full['full'] is True
+    assert [c['name'] for c in full['courses']] == ['Mathe']
+
+    cursor = full['cursor']
+    assert client.get(f'/api/sync?since={cursor}', headers=headers).get_json()['courses'] == []
+
+    client.put('/api/timetable/%d' % timetable_id, json={'name': 'WS 24/25'}, headers=headers)
+    delta = client.get(f'/api/sync?since={cursor}', headers=headers).get_json()
+    assert [t['name'] for t in delta['timetables']] == ['WS 24/25']
+    assert delta['courses'] == []
+
+    # Cascade-Löschung erzeugt Tombstones für Stundenplan und Kurse
+    client.post('/api/timetable/', json={'name': 'SS'}, headers=headers)
+    client.delete('/api/timetable/%d' % timetable_id, headers=headers)
+    delta = client.get(f"/api/sync?since={delta['cursor']}", headers=headers).get_json()
+    assert delta['deleted']['timetables'] == [timetable_id]
+    assert len(delta['deleted']['courses']) == 1
+    assert [t['name'] for t in delta['timetables']] == ['SS']
+
+
+def test_cursor_before_pruned_log_gets_full_sync(make_client):
+    from datetime import datetime, timedelta
+
+    from app.change_log import prune_change_log
+    from app.models import ChangeLog
+
+    client, headers, timetable_id = make_client()
+    cursor = client.get('/api/sync', headers=headers).get_json()['cursor']
+    client.put('/api/timetable/%d' % timetable_id, json={'name': 'A'}, headers=headers)
+    client.put('/api/timetable/%d' % timetable_id, json={'name': 'B'}, headers=headers)
+
+    app = client.application
+    with app.app_context():
+        newest = db.session.query(db.func.max(ChangeLog.seq)).scalar()
+        db.session.query(ChangeLog).filter(ChangeLog.seq < newest).update(
+            {'changed_at': datetime.utcnow() - timedelta(days=app.config['CHANGE_LOG_RETENTION_DAYS'] + 1)})
+        assert prune_change_log(db.session, app.config['CHANGE_LOG_RETENTION_DAYS']) > 0
+        db.session.commit()
+
+    pruned = client.get(f'/api/sync?since={cursor}', headers=headers).get_json()
+    assert pruned['full'] is True
+    assert [t['name'] for t in pruned['timetables']] == ['B']
+
+    # Cursor direkt vor dem ältesten verbliebenen Eintrag bekommt weiter ein Delta
+    delta = client.get(f'/api/sync?since={newest - 1}', headers=headers).get_json()
+    assert delta['full'] is False
+    assert [t['name'] for t in delta['timetables']] == ['B']
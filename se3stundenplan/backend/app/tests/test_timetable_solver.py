@@ -0,0 +1,116 @@
+from datetime import date, time
+from types import SimpleNamespace
+
+from app import timetable_solver
+from app.timetable_solver import build_components, blocked_mask, interval_mask, solve
+
+
+def make_session(session_id, weekday, start, end, session_type='regular', room=None):
+    # 2024-10-07 ist ein Montag
+    return SimpleNamespace(
+        id=session_id,
+        session_date=date(2024, 10, 7 + weekday),
+        start_time=start,
+        end_time=end,
+        session_type=session_type,
+        room=room,
+        is_cancelled=False
+    )
+
+
+def make_course(course_id, name, sessions, day_of_week=0, start=time(8, 0), end=time(9, 30)):
+    return SimpleNamespace(
+        id=course_id,
+        name=name,
+        course_type='Vorlesung',
+        day_of_week=day_of_week,
+        start_time=start,
+        end_time=end,
+        room=None,
+        course_sessions=sessions
+    )
+
+
+def test_interval_mask_overlap():
+    monday_morning = interval_mask(0, 8 * 60, 9 * 60 + 30)
+    monday_overlap = interval_mask(0, 9 * 60, 10 * 60)
+    monday_after = interval_mask(0, 9 * 60 + 30, 11 * 60)
+    tuesday = interval_mask(1, 8 * 60, 9 * 60 + 30)
+
+    assert monday_morning & monday_overlap
+    assert not monday_morning & monday_after
+    assert not monday_morning & tuesday
+
+
+def test_solver_avoids_conflicts_and_prefers_late_compact_days():
+    math = make_course(1, 'Mathematik', [
+        make_session(10, 0, time(10, 0), time(12, 0)),
+        make_session(11, 1, time(8, 0), time(10, 0), session_type='Übung'),
+        make_session(12, 0, time(12, 0), time(14, 0), session_type='Übung'),
+        make_session(13, 2, time(10, 0), time(12, 0), session_type='Übung'),
+    ])
+    programming = make_course(2, 'Programmieren', [
+        make_session(20, 0, time(12, 0), time(14, 0)),
+        make_session(21, 3, time(12, 0), time(14, 0)),
+    ])
+
+    components = build_components(math) + build_components(programming)
+    result = solve(components, top_k=3, time_budget=5)
+
+    assert result['complete']
+    assert result['schedules']
+    for schedule in result['schedules']:
+        slots = [
+            (component['day_of_week'], component['start_time'], component['end_time'])
+            for course in schedule['courses'] for component in course['components']
+        ]
+        assert len(slots) == len(set(slots))
+
+    best = result['schedules'][0]
+    penalties = [schedule['penalty'] for schedule in result['schedules']]
+    assert penalties == sorted(penalties)
+    # Übung am Montag 12-14 kollidiert mit Programmieren am Montag -> Programmieren am Donnerstag
+    assert 11 not in best['selected_sessions']
+
+
+def test_solver_reports_unsatisfiable_component():
+    course = make_course(1, 'Mathematik', [make_session(10, 0, time(10, 0), time(12, 0))])
+    blocked = blocked_mask([make_course(99, 'Belegt', [], day_of_week=0, start=time(11, 0), end=time(13, 0))])
+
+    result = solve(build_components(course), used=blocked)
+
+    assert result['schedules'] == []
+    assert result['unsatisfiable'] == [{'course_id': 1, 'component': 'Vorlesung'}]
+
+
+def test_parallel_search_matches_sequential():
+    courses = []
+    for course_id in range(1, 6):
+        sessions = [
+            make_session(course_id * 100 + slot, slot % 5, time(8 + 2 * (slot // 5), 0), time(9 + 2 * (slot // 5), 30))
+            for slot in range(10)
+        ]
+        courses.append(make_course(course_id, f'Kurs {course_id}', sessions))
+
+    components = [component for course in courses for component in build_components(course)]
+    sequential = solve(components, top_k=3, time_budget=10, parallel_threshold=10 ** 9)
+    parallel = solve(components, top_k=3, time_budget=10, parallel_threshold=1, max_workers=2)
+
+    assert sequential['complete'] and parallel['complete']
+    assert [s['penalty'] for s in sequential['schedules']] == [s['penalty'] for s in parallel['schedules']]
+
+
+def test_parallel_split_uses_largest_component_without_fork(monkeypatch):
+    # Kurs 1 hat nur einen Termin und wird zuerst sortiert, verteilt wird über Kurs 2
+    single = make_course(1, 'Fix', [make_session(100, 0, time(8, 0), time(9, 30))])
+    many = make_course(2, 'Viele', [make_session(200 + slot, slot % 5, time(10 + slot // 5, 0),
+                                                 time(10 + slot // 5, 45)) for slot in range(10)])
+    components = [component for course in (single, many) for component in build_components(course)]
+
+    calls = []
+    original = timetable_solver._solve_parallel
+    monkeypatch.setattr(timetable_solver, '_solve_parallel', lambda *args: calls.append(args) or original(*args))
+    result = solve(components, top_k=3, time_budget=10, parallel_threshold=1, max_workers=2)
+
+    assert len(calls) == 1 and result['complete'] and len(result['schedules']) == 3
+    assert timetable_solver._get_executor(2)._mp_context.get_start_method() != 'fork'
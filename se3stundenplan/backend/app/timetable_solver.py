@@ -0,0 +1,361 @@
+"""
+Stundenplan-Generator
+
+Sucht für eine Liste gewünschter Kurse konfliktfreie Kombinationen aus den
+angebotenen Terminen (Vorlesung, Übungsgruppen, ...). Jede Woche wird als
+Bitmaske aus 15-Minuten-Slots dargestellt, sodass ein Konflikttest ein
+einzelnes bitweises UND ist.
+"""
+
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import time as time_module
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+SLOT_MINUTES = 15
+MINUTES_PER_DAY = 24 * 60
+
+# Einmalige Termine sind keine Alternativen für den Wochenplan
+NON_WEEKLY_SESSION_TYPES = {'exam', 'makeup', 'cancelled'}
+
+DEFAULT_PREFERENCES = {
+    'earliest_start': 9 * 60,    # Minuten nach Mitternacht
+    'avoid_early': True,
+    'compact_days': True,
+    'early_weight': 1.0,         # Strafpunkte pro Stunde vor earliest_start
+    'gap_weight': 0.5,           # Strafpunkte pro Stunde Leerlauf zwischen Terminen
+    'day_weight': 2.0,           # Strafpunkte pro genutztem Wochentag
+}
+
+_executor = None
+
+
+def to_minutes(value):
+    """time-Objekt zu Minuten nach Mitternacht"""
+    return value.hour * 60 + value.minute
+
+
+def interval_mask(day_of_week, start_minute, end_minute):
+    """Bitmaske der 15-Minuten-Slots, die ein Termin in der Woche belegt"""
+    offset = day_of_week * MINUTES_PER_DAY
+    first = (offset + start_minute) // SLOT_MINUTES
+    last = int(math.ceil((offset + end_minute) / SLOT_MINUTES))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def build_components(course):
+    """Termin-Alternativen eines Kurses nach Veranstaltungsart gruppieren
+
+    Liefert eine Liste von Komponenten (z.B. Vorlesung, Übung). Für jede
+    Komponente muss genau eine Option gewählt werden. Datierte Sessions mit
+    gleichem Wochentag und gleicher Uhrzeit bilden zusammen eine Option.
+    """
+    groups = {}
+    for session in course.course_sessions:
+        if session.is_cancelled or session.session_type in NON_WEEKLY_SESSION_TYPES:
+            continue
+
+        component = course.course_type if session.session_type == 'regular' else session.session_type
+        slot = (session.session_date.weekday(), to_minutes(session.start_time), to_minutes(session.end_time))
+
+        options = groups.setdefault(component or 'Vorlesung', {})
+        option = options.setdefault(slot, {'session_ids': [], 'rooms': set()})
+        option['session_ids'].append(session.id)
+        if session.room:
+            option['rooms'].add(session.room)
+
+    # Kurse ohne wöchentliche Sessions haben genau einen festen Termin
+    if not groups:
+        slot = (course.day_of_week, to_minutes(course.start_time), to_minutes(course.end_time))
+        groups[course.course_type or 'Vorlesung'] = {
+            slot: {'session_ids': [], 'rooms': {course.room} if course.room else set()}
+        }
+
+    components = []
+    for component, options in groups.items():
+        components.append({
+            'course_id': course.id,
+            'course_name': course.name,
+            'component': component,
+            'options': [
+                {
+                    'day_of_week': day,
+                    'start': start,
+                    'end': end,
+                    'mask': interval_mask(day, start, end),
+                    'session_ids': sorted(option['session_ids']),
+                    'rooms': sorted(option['rooms'])
+                }
+                for (day, start, end), option in sorted(options.items())
+            ]
+        })
+    return components
+
+
+def blocked_mask(courses):
+    """Bitmaske aller bereits belegten Zeiten (z.B. bestehender Stundenplan)"""
+    mask = 0
+    for course in courses:
+        mask |= interval_mask(course.day_of_week, to_minutes(course.start_time), to_minutes(course.end_time))
+    return mask
+
+
+def normalize_preferences(preferences):
+    """Präferenzen aus dem Request mit Standardwerten zusammenführen"""
+    result = dict(DEFAULT_PREFERENCES)
+    for key, value in (preferences or {}).items():
+        if key not in result or value is None:
+            continue
+        if key == 'earliest_start' and isinstance(value, str):
+            hours, minutes = value.split(':')[:2]
+            value = int(hours) * 60 + int(minutes)
+        result[key] = value
+    return result
+
+
+# =================== SCORING ===================
+
+def _lower_bound(chosen, preferences):
+    """Untere Schranke der Strafpunkte einer Teillösung (monoton steigend)"""
+    penalty = 0.0
+    if preferences['avoid_early']:
+        earliest = preferences['earliest_start']
+        for _, day, start, end in chosen:
+            if start < earliest:
+                penalty += (earliest - start) / 60 * preferences['early_weight']
+    if preferences['compact_days']:
+        penalty += len({day for _, day, _, _ in chosen}) * preferences['day_weight']
+    return penalty
+
+
+def score_schedule(chosen, preferences):
+    """Strafpunkte einer vollständigen Kombination (niedriger ist besser)
+
+    chosen: Liste von (option_index, day_of_week, start, end)
+    """
+    penalty = _lower_bound(chosen, preferences)
+    if preferences['compact_days']:
+        by_day = {}
+        for _, day, start, end in chosen:
+            by_day.setdefault(day, []).append((start, end))
+        for intervals in by_day.values():
+            intervals.sort()
+            gap = 0
+            for (_, prev_end), (next_start, _) in zip(intervals, intervals[1:]):
+                gap += max(0, next_start - prev_end)
+            penalty += gap / 60 * preferences['gap_weight']
+    return round(penalty, 3)
+
+
+# =================== SEARCH ===================
+
+def _search(components, used, preferences, top_k, deadline, prefix=()):
+    """Tiefensuche mit Bitmasken-Pruning und Branch-and-Bound
+
+    components: Liste von Optionslisten, bereits nach "most constrained first"
+    sortiert. Jede Option ist ein Tupel (index, mask, day, start, end).
+    Liefert (Top-k-Liste, untersuchte Knoten, vollständig durchsucht?).
+    """
+    heap = []  # Max-Heap über Strafpunkte (negiert), enthält die besten top_k
+    counter = itertools.count()
+    explored = 0
+    complete = True
+    remaining_masks = [0] * (len(components) + 1)
+
+    # Vereinigung aller Optionen der restlichen Komponenten für schnelles Forward-Checking
+    union = 0
+    for i in range(len(components) - 1, -1, -1):
+        for option in components[i]:
+            union |= option[1]
+        remaining_masks[i] = union
+
+    def forward_check(depth, mask):
+        # Jede noch offene Komponente braucht mindestens eine freie Option
+        for options in components[depth:]:
+            if not any(not (option[1] & mask) for option in options):
+                return False
+        return True
+
+    chosen = [(option[0], option[2], option[3], option[4]) for option in prefix]
+
+    def dfs(depth, mask):
+        nonlocal explored, complete
+        explored += 1
+        if explored & 0x3FF == 0 and time_module.time() > deadline:
+            complete = False
+            raise TimeoutError
+
+        if len(heap) >= top_k and _lower_bound(chosen, preferences) >= -heap[0][0]:
+            return
+
+        if depth == len(components):
+            penalty = score_schedule(chosen, preferences)
+            entry = (-penalty, next(counter), [choice[0] for choice in chosen])
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif penalty < -heap[0][0]:
+                heapq.heapreplace(heap, entry)
+            return
+
+        for option in components[depth]:
+            if option[1] & mask:
+                continue
+            new_mask = mask | option[1]
+            # Forward-Checking nur, wenn sich die neue Belegung mit offenen Optionen überschneidet
+            if remaining_masks[depth + 1] & new_mask and not forward_check(depth + 1, new_mask):
+                continue
+            chosen.append((option[0], option[2], option[3], option[4]))
+            dfs(depth + 1, new_mask)
+            chosen.pop()
+
+    try:
+        dfs(0, used)
+    except TimeoutError:
+        pass
+
+    results = sorted(((-neg_penalty, indices) for neg_penalty, _, indices in heap), key=lambda item: item[0])
+    return results, explored, complete
+
+
+def _search_subtree(args):
+    """Einstiegspunkt für Worker-Prozesse: Teilbaum mit fester erster Wahl durchsuchen"""
+    first_option, components, used, preferences, top_k, deadline = args
+    results, explored, complete = _search(
+        components, used | first_option[1], preferences, top_k, deadline, prefix=(first_option,)
+    )
+    return [(penalty, [first_option[0]] + indices) for penalty, indices in results], explored, complete
+
+
+def _get_executor(max_workers):
+    """Prozess-Pool einmal pro Worker anlegen und wiederverwenden
+
+    Kein fork(): der Web-Worker ist multithreaded (Request-Log, Admission,
+    Pool-Threads), ein Fork könnte gehaltene Locks kopieren und löst den
+    Fork-Handler der App aus. Die Prozesse kommen aus einem Forkserver
+    (bzw. per spawn, wo es keinen gibt).
+    """
+    global _executor
+    if _executor is None:
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+    return _executor
+
+
+def solve(components, used=0, preferences=None, top_k=5, time_budget=2.0,
+          parallel_threshold=20000, max_workers=None):
+    """Top-k konfliktfreie Kombinationen für die gegebenen Komponenten suchen
+
+    Liefert ein Dict mit 'schedules' (sortiert nach Strafpunkten),
+    'explored', 'complete' und 'unsatisfiable' (Komponenten ohne freie Option).
+    """
+    preferences = normalize_preferences(preferences)
+    deadline = time_module.time() + time_budget
+
+    # Optionen, die mit dem bestehenden Stundenplan kollidieren, sofort verwerfen
+    indexed = []
+    unsatisfiable = []
+    global_index = 0
+    flat_options = []
+    for component in components:
+        options = []
+        for option in component['options']:
+            flat_options.append((component, option))
+            if not option['mask'] & used:
+                options.append((global_index, option['mask'], option['day_of_week'], option['start'], option['end']))
+            global_index += 1
+        if not options:
+            unsatisfiable.append({'course_id': component['course_id'], 'component': component['component']})
+        indexed.append(options)
+
+    if unsatisfiable:
+        return {'schedules': [], 'explored': 0, 'complete': True, 'unsatisfiable': unsatisfiable}
+
+    # Most constrained first: Komponenten mit wenigen Optionen zuerst festlegen
+    indexed.sort(key=len)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    space = 1
+    for options in indexed:
+        space *= len(options)
+
+    # Verteilt wird über die Komponente mit den meisten Optionen (siehe _solve_parallel)
+    if space > parallel_threshold and max_workers > 1 and len(indexed[-1]) > 1:
+        results, explored, complete = _solve_parallel(indexed, used, preferences, top_k, deadline, max_workers)
+    else:
+        results, explored, complete = _search(indexed, used, preferences, top_k, deadline)
+
+    schedules = []
+    for rank, (penalty, indices) in enumerate(results, start=1):
+        schedules.append(_describe_schedule(rank, penalty, [flat_options[i] for i in indices]))
+
+    return {'schedules': schedules, 'explored': explored, 'complete': complete, 'unsatisfiable': []}
+
+
+def _solve_parallel(indexed, used, preferences, top_k, deadline, max_workers):
+    """Suche auf den Prozess-Pool verteilen (ein Teilbaum pro Option der größten Komponente)"""
+    # Die Komponente mit den meisten Optionen verteilt die Arbeit am besten
+    split = max(range(len(indexed)), key=lambda i: len(indexed[i]))
+    first, rest = indexed[split], indexed[:split] + indexed[split + 1:]
+
+    executor = _get_executor(max_workers)
+    futures = {
+        executor.submit(_search_subtree, (option, rest, used, preferences, top_k, deadline))
+        for option in first
+        if not option[1] & used
+    }
+
+    merged = []
+    explored = 0
+    complete = True
+    pending = futures
+    while pending:
+        timeout = deadline - time_module.time()
+        if timeout <= 0:
+            complete = False
+            break
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            results, sub_explored, sub_complete = future.result()
+            merged.extend(results)
+            explored += sub_explored
+            complete = complete and sub_complete
+
+    for future in pending:
+        future.cancel()
+
+    merged.sort(key=lambda item: item[0])
+    return merged[:top_k], explored, complete
+
+
+def _describe_schedule(rank, penalty, picked):
+    """Gewählte Optionen zu einer JSON-fähigen Beschreibung zusammenfassen"""
+    courses = {}
+    days = set()
+    for component, option in picked:
+        entry = courses.setdefault(component['course_id'], {
+            'course_id': component['course_id'],
+            'course_name': component['course_name'],
+            'components': []
+        })
+        entry['components'].append({
+            'component': component['component'],
+            'day_of_week': option['day_of_week'],
+            'start_time': f"{option['start'] // 60:02d}:{option['start'] % 60:02d}",
+            'end_time': f"{option['end'] // 60:02d}:{option['end'] % 60:02d}",
+            'session_ids': option['session_ids'],
+            'rooms': option['rooms']
+        })
+        days.add(option['day_of_week'])
+
+    return {
+        'rank': rank,
+        'penalty': penalty,
+        'days_used': sorted(days),
+        'courses': list(courses.values()),
+        'selected_sessions': sorted(sid for _, option in picked for sid in option['session_ids'])
+    }
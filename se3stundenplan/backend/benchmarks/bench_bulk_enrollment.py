@@ -0,0 +1,100 @@
+"""
+Benchmark: Sammel-Einschreibung einer Kohorte
+
+Legt eine temporäre SQLite-Datenbank mit --students Studierenden (jede/r mit
+--existing bestehenden Belegungen) an und schreibt alle per
+/api/course-catalog/admin/enrollments/bulk in --courses Kurse ein.
+
+    python benchmarks/bench_bulk_enrollment.py --students 10000 --courses 6
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import time as clock
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Timetable, Course, EnrolledCourse  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def build_app(path, students, courses, existing):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLALCHEMY_REPLICA_URIS = []
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        CREATE_TABLES_ON_STARTUP = True
+        REQUEST_LOG_ENABLED = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        admin = User(username='bench', email='bench@example.com', full_name='Bench')
+        admin.set_password('geheim')
+        db.session.add(admin)
+        db.session.flush()
+        timetable = Timetable(user_id=admin.id, name='Katalog')
+        db.session.add(timetable)
+        db.session.flush()
+        db.session.execute(User.__table__.insert(), [
+            {'username': f's{i}', 'email': f's{i}@example.com', 'full_name': f'Student {i}',
+             'password_hash': 'x', 'student_id': f'2024{i:06d}'}
+            for i in range(students)
+        ])
+        # Pflichtkurse Mo-Sa 8-10 Uhr, Wahlkurse (bestehende Belegungen) nachmittags, einer kollidiert
+        db.session.execute(Course.__table__.insert(), [
+            {'timetable_id': timetable.id, 'name': f'Pflicht {i}', 'day_of_week': i % 6,
+             'start_time': clock(8), 'end_time': clock(10)} for i in range(courses)
+        ] + [
+            {'timetable_id': timetable.id, 'name': f'Wahl {i}', 'day_of_week': i % 5,
+             'start_time': clock(9 if i == 0 else 14), 'end_time': clock(11 if i == 0 else 16)}
+            for i in range(existing * 4)
+        ])
+        course_ids = [row.id for row in db.session.execute(db.select(Course.id, Course.name)) if
+                      row.name.startswith('Pflicht')]
+        elective_ids = [row.id for row in db.session.execute(db.select(Course.id, Course.name)) if
+                        row.name.startswith('Wahl')]
+        user_ids = db.session.scalars(db.select(User.id).where(User.student_id.is_not(None))).all()
+        db.session.execute(EnrolledCourse.__table__.insert(), [
+            {'user_id': user_id, 'course_id': elective_ids[(user_id + k * 4) % len(elective_ids)], 'status': 'active'}
+            for user_id in user_ids for k in range(existing) if elective_ids
+        ])
+        db.session.commit()
+        token = create_access_token(identity=str(admin.id))
+    return app, {'Authorization': f'Bearer {token}'}, course_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--courses', type=int, default=6)
+    parser.add_argument('--existing', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, headers, course_ids = build_app(os.path.join(tmp, 'bench.db'), args.students, args.courses,
+                                             args.existing)
+        client = app.test_client()
+        statements = []
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+        body = {'selector': {'student_id_prefix': '2024'}, 'course_ids': course_ids}
+        for label, extra in (('dry_run', {'dry_run': True}), ('schreiben', {}), ('wiederholt', {})):
+            statements.clear()
+            started = time.perf_counter()
+            report = client.post('/api/course-catalog/admin/enrollments/bulk', json={**body, **extra},
+                                 headers=headers).get_json()
+            elapsed = time.perf_counter() - started
+            print(f'{label:<11} {elapsed * 1000:>7.0f}ms  {len(statements):>3} Statements  '
+                  f'neu={report["enrolled"]} aktiv={report["already_enrolled"]} '
+                  f'übersprungen={report["skipped_user_count"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: Kurskatalog als jsonify-Liste vs. gestreamte JSON-Antwort
+
+Legt eine temporäre SQLite-Datenbank mit --courses Kursen an und misst für
+beide Varianten Zeit bis zum ersten Byte, Gesamtzeit und Speicher-Spitze.
+
+    python benchmarks/bench_catalog_stream.py --courses 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import time as clock
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token, jwt_required
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Timetable, Course  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def build_app(path, count):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SQLALCHEMY_REPLICA_URIS = []
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        CREATE_TABLES_ON_STARTUP = True
+
+    app = create_app(BenchConfig)
+
+    # Referenz: komplette Liste im Speicher aufbauen (bisherige Implementierung)
+    @app.route('/bench/catalog-jsonify')
+    @jwt_required()
+    def catalog_jsonify():
+        courses = Course.query.filter_by(is_active=True).order_by(Course.name).all()
+        data = [course.to_dict(include_sessions=True) for course in courses]
+        return jsonify({'courses': data, 'count': len(data)})
+
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com', full_name='Bench')
+        user.set_password('geheim')
+        db.session.add(user)
+        db.session.flush()
+        timetable = Timetable(user_id=user.id, name='Bench')
+        db.session.add(timetable)
+        db.session.flush()
+        db.session.execute(Course.__table__.insert(), [
+            {'timetable_id': timetable.id, 'name': f'Kurs {i:06d}', 'day_of_week': i % 5,
+             'start_time': clock(8 + i % 8), 'end_time': clock(9 + i % 8),
+             'room': f'R{i % 300}', 'instructor': f'Dozent {i % 50}', 'course_type': 'lecture'}
+            for i in range(count)
+        ])
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+    return app, {'Authorization': f'Bearer {token}'}
+
+
+def measure(client, path, headers):
+    """Zeit bis zum ersten Byte, Gesamtzeit, Größe und Speicher-Spitze einer Antwort"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(path, headers=headers, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    response.close()
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, total, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--courses', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app, headers = build_app(os.path.join(tmp, 'bench.db'), args.courses)
+        client = app.test_client()
+
+        print(f'{"Variante":<12} {"TTFB":>9} {"Gesamt":>9} {"Bytes":>11} {"Peak-RAM":>10}')
+        for name, path in (('jsonify', '/bench/catalog-jsonify'), ('stream', '/api/course-catalog/courses')):
+            first_byte, total, size, peak = measure(client, path, headers)
+            print(f'{name:<12} {first_byte * 1000:>7.0f}ms {total * 1000:>7.0f}ms '
+                  f'{size:>11} {peak / 2 ** 20:>8.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: Flask (gunicorn sync) vs. Async Read-Path (ASGI)
+
+Schickt dieselben GET-Anfragen mit hoher Parallelität an beide Deployments
+und gibt Durchsatz sowie Latenz-Perzentile aus.
+
+    python benchmarks/bench_read_path.py --token <JWT> \
+        --flask http://localhost:5001 --asgi http://localhost:5002 \
+        --concurrency 500 --requests 5000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+ENDPOINTS = [
+    '/api/timetable/active',
+    '/api/course-catalog/courses',
+    '/api/notifications/',
+    '/api/notifications/upcoming',
+]
+
+
+def percentile(values, p):
+    """p-Perzentil einer sortierten Liste"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run(base_url, path, token, concurrency, total, timeout):
+    """total Anfragen mit concurrency gleichzeitigen Verbindungen ausführen"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=timeout) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'mean': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'errors': errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Flask vs. ASGI Read-Path Benchmark')
+    parser.add_argument('--token', required=True, help='JWT Access Token')
+    parser.add_argument('--flask', default='http://localhost:5001', help='Basis-URL der Flask-App')
+    parser.add_argument('--asgi', default='http://localhost:5002', help='Basis-URL der ASGI-App')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--endpoint', action='append', help='Nur diese Endpoints messen')
+    args = parser.parse_args()
+
+    print(f"{'Endpoint':32} {'Backend':6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'Fehler':>7}")
+    for path in args.endpoint or ENDPOINTS:
+        for name, base_url in (('flask', args.flask), ('asgi', args.asgi)):
+            result = await run(base_url, path, args.token, args.concurrency, args.requests, args.timeout)
+            print(f"{path:32} {name:6} {result['rps']:9.1f} {result['p50']:9.1f} "
+                  f"{result['p99']:9.1f} {result['errors']:7d}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -18,8 +18,16 @@ class Config:
     MYSQL_DB = os.environ.get('MYSQL_DB', 'stundenplan_db')
     
     # SQLAlchemy Configuration
-    SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}?charset=utf8mb4'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+        f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}?charset=utf8mb4'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Schema beim Start anlegen (Development). In Produktion übernimmt das create_tables.py einmal pro
+    # Deployment, damit nicht jeder Worker DDL ausführt und auf Metadata-Locks wartet
+    CREATE_TABLES_ON_STARTUP = os.environ.get(
+        'CREATE_TABLES_ON_STARTUP',
+        'false' if os.environ.get('FLASK_ENV') == 'production' else 'true'
+    ).lower() == 'true'
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
         'pool_recycle': 300,
@@ -27,6 +35,26 @@ class Config:
         'max_overflow': 0,
     }
     
+    # Read-Replicas (kommagetrennt). Lesende Requests gehen per Round-Robin dorthin,
+    # nach einem Schreibzugriff liest der Benutzer DB_STICKY_SECONDS lang vom Primary
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri.strip()]
+    DB_STICKY_SECONDS = float(os.environ.get('DB_STICKY_SECONDS', 5))
+    DB_REPLICA_RETRY_SECONDS = float(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))
+    
+    # Connection-Pool: 'static' nutzt SQLALCHEMY_ENGINE_OPTIONS, 'auto' leitet pool_size/max_overflow
+    # aus Worker-/Threadzahl und max_connections der Datenbank ab
+    POOL_SIZING = os.environ.get('POOL_SIZING', 'static')
+    WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 4))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 1))
+    DB_MAX_CONNECTIONS = int(os.environ['DB_MAX_CONNECTIONS']) if os.environ.get('DB_MAX_CONNECTIONS') else None
+    DB_RESERVED_CONNECTIONS = int(os.environ.get('DB_RESERVED_CONNECTIONS', 10))
+    POOL_WAIT_WARN_MS = float(os.environ.get('POOL_WAIT_WARN_MS', 50))
+    
+    # Async Read-Path (ASGI, aiomysql/aiosqlite). Ohne Angabe aus SQLALCHEMY_DATABASE_URI abgeleitet
+    SQLALCHEMY_ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+    ASYNC_POOL_SIZE = int(os.environ.get('ASYNC_POOL_SIZE', 20))
+    ASYNC_MAX_OVERFLOW = int(os.environ.get('ASYNC_MAX_OVERFLOW', 10))
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-jwt-secret-key-change-in-production-please')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
@@ -44,8 +72,95 @@ class Config:
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
+    # Antwort-Kompression (gzip/Brotli) und gestreamte JSON-Listen
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # Bytes
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    JSON_STREAM_CHUNK_SIZE = 16 * 1024  # Bytes pro gesendetem Block
+    JSON_STREAM_YIELD_PER = 500  # Kurse pro IN-Block beim Streamen des Katalogs
+    
+    # Single-Flight: gleichzeitige identische Abfragen pro Worker zusammenfassen (gecacht wird im Cache-Layer)
+    SINGLE_FLIGHT_WAIT_SECONDS = 10.0  # Danach führen Wartende die Abfrage selbst aus
+    
+    # Cache-Layer (app/cache.py): 'local' (nur pro Prozess), 'shm' (alle Worker eines Hosts über /dev/shm)
+    # oder 'redis' (CACHE_REDIS_URL, braucht das Paket redis)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'shm' if os.environ.get('FLASK_ENV') == 'production' else 'local')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_SHM_PATH = os.environ.get('CACHE_SHM_PATH')  # Standard: /dev/shm/stundenplan-cache.sqlite
+    CACHE_DEFAULT_TTL = float(os.environ.get('CACHE_DEFAULT_TTL', 300))  # Sekunden, Invalidierung per Tag
+    CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', 2048))
+    CACHE_SHARED_MAX_ENTRIES = int(os.environ.get('CACHE_SHARED_MAX_ENTRIES', 50000))
+    CACHE_LOCK_SECONDS = 5.0  # Stampede-Sperre: so lange warten andere Worker auf den Ersteller
+    CACHE_POLL_SECONDS = 0.2  # so oft übernimmt ein Worker Invalidierungen der anderen
+    
+    # Katalog-Snapshot: so oft wird pro Worker geprüft, ob sich der Katalog geändert hat
+    CATALOG_SNAPSHOT_CHECK_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_CHECK_SECONDS', 2.0))
+    
+    # Belegungsindex (app/occupancy.py): ebenso, für Änderungen anderer Worker und Bulk-Statements
+    OCCUPANCY_CHECK_SECONDS = float(os.environ.get('OCCUPANCY_CHECK_SECONDS', 2.0))
+    
+    # iCalendar-Feed: gerenderte Feeds pro Worker (Schlüssel: Stundenplan + Version)
+    ICS_CACHE_SIZE = int(os.environ.get('ICS_CACHE_SIZE', 512))
+    
+    # Termin-Expansion (/calendar): kompilierte Pläne pro Worker, vorlesungsfreie Zeiten als
+    # 'JJJJ-MM-TT:JJJJ-MM-TT' (kommagetrennt), maximale Bereichslänge einer Abfrage
+    OCCURRENCE_CACHE_SIZE = int(os.environ.get('OCCURRENCE_CACHE_SIZE', 256))
+    LECTURE_FREE_PERIODS = os.environ.get('LECTURE_FREE_PERIODS', '')
+    CALENDAR_MAX_DAYS = 366
+    
+    # Export-Cache auf der Festplatte (Schlüssel: Stundenplan, Version, Format, Sprache), relativ zum Backend-Verzeichnis
+    EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR', 'cache/exports')
+    EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    
+    # Globale Zähler für /api/status: Alter in Sekunden, 'exact' (COUNT) oder 'estimate' (MySQL-Tabellenstatistik)
+    STATUS_COUNTERS_TTL = float(os.environ.get('STATUS_COUNTERS_TTL', 60))
+    STATUS_COUNTERS_MODE = os.environ.get('STATUS_COUNTERS_MODE', 'exact')
+    
+    # Request-Logging (app/request_log.py): JSON-Zeilen gebündelt aus einem Hintergrund-Thread.
+    # Fehler und langsame Anfragen immer, erfolgreiche nur mit SAMPLE_RATE; volle Queue verwirft
+    REQUEST_LOG_ENABLED = os.environ.get('REQUEST_LOG_ENABLED', 'true').lower() == 'true'
+    REQUEST_LOG_SAMPLE_RATE = float(os.environ.get(
+        'REQUEST_LOG_SAMPLE_RATE', 0.1 if os.environ.get('FLASK_ENV') == 'production' else 1.0
+    ))
+    REQUEST_LOG_SLOW_MS = float(os.environ.get('REQUEST_LOG_SLOW_MS', 500))
+    REQUEST_LOG_QUEUE_SIZE = 10000
+    REQUEST_LOG_BATCH_SIZE = 200
+    REQUEST_LOG_FLUSH_SECONDS = 1.0
+    
+    # Aufbewahrung von Benachrichtigungen (app/retention.py, purge_notifications.py): Tage pro Typ,
+    # 'default' für alle übrigen; gelöscht werden nur gesendete oder gelesene, blockweise per Keyset-Walk.
+    # Archiv (gzip-JSONL) nur mit NOTIFICATION_ARCHIVE_DIR; Monatspartitionen nur auf MySQL
+    NOTIFICATION_RETENTION = os.environ.get(
+        'NOTIFICATION_RETENTION', 'reminder:30,course_start:30,info:90,warning:180,default:90'
+    )
+    NOTIFICATION_PURGE_BATCH_SIZE = int(os.environ.get('NOTIFICATION_PURGE_BATCH_SIZE', 500))
+    NOTIFICATION_PURGE_PAUSE_SECONDS = float(os.environ.get('NOTIFICATION_PURGE_PAUSE_SECONDS', 0.05))
+    NOTIFICATION_ARCHIVE_DIR = os.environ.get('NOTIFICATION_ARCHIVE_DIR')
+    NOTIFICATION_PARTITIONING = os.environ.get('NOTIFICATION_PARTITIONING', 'false').lower() == 'true'
+    NOTIFICATION_PARTITION_MONTHS_AHEAD = 3
+    
+    # Einschreibung (app/admission.py): Schreiber pro Kurs und Worker einreihen; wer länger als
+    # WAIT_SECONDS warten müsste oder hinter MAX_WAITING anderen steht, bekommt 503 + Retry-After
+    ADMISSION_WAIT_SECONDS = float(os.environ.get('ADMISSION_WAIT_SECONDS', 5))
+    ADMISSION_MAX_WAITING = int(os.environ.get('ADMISSION_MAX_WAITING', 500))
+    
     # Pagination
     ITEMS_PER_PAGE = 20
     
+    # Delta-Sync: Änderungen pro Antwort und Wartezeit, bevor der Cursor über neue Einträge vorrückt
+    SYNC_MAX_CHANGES = int(os.environ.get('SYNC_MAX_CHANGES', 5000))
+    SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', 5))
+    # Protokollzeilen älter als das werden gelöscht (purge_notifications.py); ältere Cursor -> Voll-Sync
+    CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 90))
+    
+    # Batch-Endpoints: maximale Anzahl IDs/Einträge pro Anfrage
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 200))
+
+    # Stundenplan-Generator
+    SOLVER_MAX_RESULTS = 10
+    SOLVER_TIME_BUDGET = float(os.environ.get('SOLVER_TIME_BUDGET', 2.0))  # Sekunden
+    SOLVER_PARALLEL_THRESHOLD = 20000  # Ab dieser Suchraumgröße wird der Prozess-Pool genutzt
+    SOLVER_MAX_WORKERS = int(os.environ.get('SOLVER_MAX_WORKERS', os.cpu_count() or 1))
+    
     # Timezone
     TIMEZONE = 'Europe/Berlin'
\ No newline at end of file
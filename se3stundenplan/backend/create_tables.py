@@ -4,5 +4,16 @@ from app.models import *  # Import all models/entities
 app = create_app()
 
 with app.app_context():
-    db.create_all()
-    print("Tables were created :)")
\ No newline at end of file
+    db.create_all(bind_key=None)  # nur Primary, nicht die Read-Replicas
+    print("Tables were created :)")
+
+    # create_all ergänzt keine Spalten/Constraints in bestehenden Tabellen: Platzvergabe nachrüsten
+    # und Platzzähler der Kurse mit den aktiven Belegungen abgleichen (app/admission.py)
+    from app.admission import recount_enrollments, upgrade_schema
+    for statement in upgrade_schema(db.session):
+        print(statement)
+    recount_enrollments(db.session)
+    db.session.commit()
+
+# Import-Templates einmal pro Deployment vorbauen (Worker laden dafür kein pandas)
+app.extensions['export_cache'].prebuild_templates()
\ No newline at end of file
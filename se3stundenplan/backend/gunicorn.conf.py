@@ -0,0 +1,16 @@
+# Gunicorn Konfiguration (Produktion)
+#
+# Mit preload_app lädt der Master die App einmal und die Worker werden per fork()
+# aus dem warmen Prozess erzeugt. Die Datenbank-Pools werden im Kind automatisch
+# verworfen (siehe register_fork_handler in app/__init__.py).
+# Das Schema wird vorher einmal mit "python create_tables.py" angelegt.
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('WEB_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+accesslog = '-'
+errorlog = '-'
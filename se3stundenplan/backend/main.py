@@ -1,10 +1,13 @@
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.async_api import async_lifespan, register_async_api
 
 app = FastAPI(
     title="SPLAN API", 
     description="Stundenplan-Management System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=async_lifespan
 )
 
 # CORS für Frontend
@@ -16,6 +19,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Async Read-Path: aktiver Stundenplan, Kurskatalog, Benachrichtigungen
+register_async_api(app)
+
 @app.get("/")
 def read_root():
     return {"message": "SPLAN Backend läuft!", "status": "OK"}
@@ -51,6 +57,15 @@ def get_schedule(schedule_id: int):
             return schedule
     return {"error": "Stundenplan nicht gefunden"}
 
+# Alle übrigen Routen (Schreibzugriffe, Import/Export, ...) an die Flask-App durchreichen.
+# Muss als letztes registriert werden, damit die Async-Routen Vorrang haben.
+if os.environ.get('MOUNT_FLASK', 'true').lower() == 'true':
+    from a2wsgi import WSGIMiddleware
+    from app import create_app
+
+    flask_app = create_app()
+    app.mount("/", WSGIMiddleware(flask_app, workers=int(os.environ.get('WSGI_THREADS', 10))))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
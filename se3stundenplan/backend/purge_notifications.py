@@ -0,0 +1,67 @@
+"""
+Alte Benachrichtigungen entfernen (z.B. nächtlich per Cron)
+
+    python purge_notifications.py [--dry-run] [--max-batches N] [--partition]
+
+Fristen, Blockgröße und Archiv kommen aus der Config (NOTIFICATION_*), die Frist für das
+Sync-Änderungsprotokoll aus CHANGE_LOG_RETENTION_DAYS.
+--partition stellt die Tabelle auf MySQL einmalig auf Monatspartitionen um.
+"""
+import argparse
+from datetime import date
+
+from app import create_app, db
+from app.retention import (NotificationArchive, drop_expired_partitions, ensure_partitions, parse_retention,
+                           partition_table, purge_change_log, purge_notifications)
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--dry-run', action='store_true', help='nur zählen, nichts löschen')
+parser.add_argument('--max-batches', type=int, default=None)
+parser.add_argument('--partition', action='store_true', help='Tabelle partitionieren (MySQL, einmalig)')
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    config = app.config
+    policy = parse_retention(config['NOTIFICATION_RETENTION'])
+    archive = NotificationArchive(config['NOTIFICATION_ARCHIVE_DIR']) if config['NOTIFICATION_ARCHIVE_DIR'] else None
+    mysql = db.engine.dialect.name == 'mysql'
+    try:
+        if args.partition:
+            if not mysql:
+                raise SystemExit('Partitionierung wird nur auf MySQL unterstützt')
+            for statement in partition_table(db.session, date.today(), config['NOTIFICATION_PARTITION_MONTHS_AHEAD']):
+                print(statement)
+
+        if config['NOTIFICATION_PARTITIONING'] and mysql and not args.dry_run:
+            ensure_partitions(db.session, date.today(), config['NOTIFICATION_PARTITION_MONTHS_AHEAD'])
+            dropped = drop_expired_partitions(db.session, policy, batch_size=config['NOTIFICATION_PURGE_BATCH_SIZE'],
+                                              archive=archive)
+            print(f'Partitionen entfernt: {", ".join(dropped) or "keine"}')
+
+        stats = purge_notifications(
+            db.session, policy,
+            batch_size=config['NOTIFICATION_PURGE_BATCH_SIZE'],
+            archive=archive,
+            pause_seconds=config['NOTIFICATION_PURGE_PAUSE_SECONDS'],
+            max_batches=args.max_batches,
+            dry_run=args.dry_run
+        )
+        print(f"Geprüft: {stats['scanned']}, {'fällig' if args.dry_run else 'gelöscht'}: {stats['deleted']} "
+              f"in {stats['batches']} Blöcken")
+
+        if not args.dry_run:
+            # Sync-Protokoll mitkürzen; Clients mit älterem Cursor bekommen einen Voll-Sync
+            pruned = purge_change_log(
+                db.session, config['CHANGE_LOG_RETENTION_DAYS'],
+                batch_size=config['NOTIFICATION_PURGE_BATCH_SIZE'],
+                pause_seconds=config['NOTIFICATION_PURGE_PAUSE_SECONDS'],
+                max_batches=args.max_batches
+            )
+            print(f"Änderungsprotokoll: {pruned['deleted']} Zeilen entfernt in {pruned['batches']} Blöcken")
+    finally:
+        if archive is not None:
+            archive.close()
+            if archive.rows:
+                print(f'Archiv: {archive.path} ({archive.rows} Zeilen)')